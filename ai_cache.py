@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_cache (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ai_cache_last_used ON ai_cache (last_used);
+"""
+
+# Prune the disk store every this many writes rather than on each one.
+_PRUNE_EVERY = 100
+
+
+def normalize_text(text: str) -> str:
+    """Case-folds and collapses whitespace so trivially different inputs share an entry."""
+    return " ".join(text.casefold().split())
+
+
+class AICache:
+    """In-memory LRU in front of a persistent SQLite store, both with TTL eviction and size limits.
+
+    Values must be JSON-serializable; ``None`` is never cached so it can signal a miss.
+    """
+
+    def __init__(self, path: str, max_memory_entries: int = 1024, max_disk_entries: int = 50_000, ttl_seconds: float = 7 * 24 * 3600):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    @staticmethod
+    def make_key(kind: str, text: str, prompt_version: int, scope: str = "") -> str:
+        """Builds a key from the call kind, normalized input, prompt version and an optional scope (e.g. today's date)."""
+        raw = f"{kind}\x1f{prompt_version}\x1f{scope}\x1f{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Any | None:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return entry[1]
+            if entry: del self._memory[key]
+            row = self._conn.execute("SELECT value, expires_at FROM ai_cache WHERE key = ?", (key,)).fetchone()
+            if row and row[1] > now:
+                value = json.loads(row[0])
+                self._remember(key, row[1], value)
+                with self._conn:
+                    self._conn.execute("UPDATE ai_cache SET last_used = ? WHERE key = ?", (now, key))
+                self._stats["disk_hits"] += 1
+                return value
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        if value is None: return
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, expires_at, value)
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO ai_cache VALUES (?, ?, ?, ?)", (key, json.dumps(value), expires_at, now))
+            self._writes += 1
+            if self._writes % _PRUNE_EVERY == 0: self._prune(now)
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _prune(self, now: float) -> None:
+        """Drops expired rows, then the least recently used rows beyond the disk limit."""
+        with self._conn:
+            self._conn.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (now,))
+            deleted = self._conn.execute(
+                "DELETE FROM ai_cache WHERE key IN (SELECT key FROM ai_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,)).rowcount
+        self._stats["evictions"] += max(deleted, 0)
+
+    def stats(self) -> dict:
+        """Hit/miss counters plus current sizes."""
+        with self._lock:
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {**self._stats, "hits": hits, "hit_rate": hits / lookups if lookups else 0.0,
+                    "memory_entries": len(self._memory), "disk_entries": disk_entries}
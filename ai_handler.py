@@ -1,49 +1,213 @@
-import google.generativeai as genai
+import asyncio
 import config
 import json
 import logging
-from datetime import datetime, timedelta
+import metrics
+import re
+import time
+import threading
+import date_parser
+from ai_cache import AICache
+from datetime import date, datetime
+from typing import AsyncIterator
 
 # Configure the logger for this module
 logger = logging.getLogger(__name__)
 
 # --- AI Configuration ---
-try:
-    genai.configure(api_key=config.GEMINI_API_KEY)
-    generation_config = {"temperature": 0.2, "top_p": 1, "top_k": 1, "max_output_tokens": 2048}
-    model = genai.GenerativeModel(model_name="gemini-1.5-flash", generation_config=generation_config)
-    logger.info("Gemini AI model configured successfully.")
-except Exception as e:
-    logger.error(f"Failed to configure Gemini AI: {e}")
-    model = None
+# The Gemini SDK takes most of a second to import, so the models are built on first use
+# (or by ``warm_up`` in the background) instead of at import time.
+model = json_model = None
+_models_loaded = False
+_models_lock = threading.Lock()
+
+def _load_models() -> None:
+    global model, json_model, _models_loaded
+    with _models_lock:
+        if _models_loaded or json_model is not None: return
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=config.GEMINI_API_KEY)
+            generation_config = {"temperature": 0.2, "top_p": 1, "top_k": 1, "max_output_tokens": 2048}
+            model = genai.GenerativeModel(model_name="gemini-1.5-flash", generation_config=generation_config)
+            # Same model in native JSON response mode, so replies never need ```json fences stripped.
+            json_model = genai.GenerativeModel(model_name="gemini-1.5-flash", generation_config={**generation_config, "response_mime_type": "application/json"})
+            logger.info("Gemini AI model configured successfully.")
+        except Exception as e:
+            logger.error(f"Failed to configure Gemini AI: {e}")
+            model = json_model = None
+        _models_loaded = True
+
+async def _ensure_models() -> bool:
+    """Builds the models off the event loop if that hasn't happened yet; False if Gemini is unavailable."""
+    if not _models_loaded and json_model is None: await asyncio.to_thread(_load_models)
+    return json_model is not None
+
+async def warm_up() -> None:
+    """Loads the Gemini SDK and models ahead of the first AI call."""
+    with metrics.span("startup", "ai_models"):
+        await _ensure_models()
+
+# --- Result Cache ---
+# Bump a prompt's version whenever its wording or output shape changes, so stale answers are not served.
+PROMPT_VERSIONS = {"classify": 1, "task": 2, "breakdown": 1}
+# Sub-tasks beyond this many are dropped from a breakdown.
+MAX_SUBTASKS = 10
+
+cache = AICache(
+    config.AI_CACHE_PATH,
+    max_memory_entries=config.AI_CACHE_MEMORY_ENTRIES,
+    max_disk_entries=config.AI_CACHE_DISK_ENTRIES,
+    ttl_seconds=config.AI_CACHE_TTL_SECONDS,
+)
+
+def _cache_key(kind: str, text: str, scope: str = "") -> str:
+    return AICache.make_key(kind, text, PROMPT_VERSIONS[kind], scope)
+
+async def _generate(generative_model, kind: str, prompt: str, **kwargs):
+    """Calls the model, timed as a "gemini" span named ``kind``."""
+    with metrics.span("gemini", kind):
+        return await generative_model.generate_content_async(prompt, **kwargs)
 
 # --- Core AI Processing Functions ---
-def process_text_with_ai(text: str) -> dict | None:
-    if not model: return None
-    prompt = f"""
-        Analyze the following text and classify it according to the PARA method.
-        Your response MUST be a JSON object with three keys: "category", "title", and "tags".
+CLASSIFICATION_RULES = """
         1.  "category": Classify into "Projects", "Areas", "Resources", or "Archive".
         2.  "title": Create a concise, clear title. IMPORTANT: If the text is a simple task like "Call the plumber" or "Buy milk", the title MUST be the original text. Do not change it. For longer notes, summarize them.
         3.  "tags": Extract 1-3 relevant keywords as a list of strings.
+        4.  "complexity": "complex" if the category is "Projects" and it is a multi-step project, otherwise "simple".
+        5.  "subtasks": If "complexity" is "complex", break the project into 3 to 8 actionable sub-tasks as a list of strings. Otherwise an empty list.
+"""
+
+def _finish_classification(text: str, ai_result) -> dict | None:
+    """Validates and normalizes one classification, then caches it and any proposed breakdown."""
+    if not isinstance(ai_result, dict) or not all(key in ai_result for key in ["category", "title", "tags"]): return None
+    ai_result = {key: ai_result[key] for key in ["category", "title", "tags", "complexity", "subtasks"] if key in ai_result}
+    ai_result["complexity"] = "complex" if ai_result.get("category") == "Projects" and ai_result.get("complexity") == "complex" else "simple"
+    ai_result["subtasks"] = [task for task in ai_result.get("subtasks") or [] if isinstance(task, str)]
+    if ai_result["complexity"] == "complex" and ai_result["subtasks"]:
+        cache.set(_cache_key("breakdown", ai_result["title"]), ai_result["subtasks"])
+    cache.set(_cache_key("classify", text), ai_result)
+    return ai_result
+
+async def _classify_one(text: str) -> dict | None:
+    if not await _ensure_models(): return None
+    prompt = f"""
+        Analyze the following text and classify it according to the PARA method.
+        Your response MUST be a JSON object with the keys "category", "title", "tags", "complexity" and "subtasks".
+        {CLASSIFICATION_RULES}
         Text to analyze: --- {text} ---
-        Provide only the JSON object in your response.
     """
     try:
-        response = model.generate_content(prompt)
-        cleaned_response_text = response.text.strip().replace("```json", "").replace("```", "").strip()
-        ai_result = json.loads(cleaned_response_text)
-        return ai_result if all(key in ai_result for key in ["category", "title", "tags"]) else None
+        response = await _generate(json_model, "classify", prompt)
+        return _finish_classification(text, json.loads(response.text))
     except Exception as e:
         logger.error(f"An unexpected error occurred during AI processing: {e}")
         return None
 
-def extract_task_details(text: str) -> dict | None:
-    """Uses AI to extract the task name and a due date from natural language."""
-    if not model:
-        return None
+async def _classify_many(texts: list[str]) -> list[dict | None]:
+    """Classifies several texts in one prompt, falling back to one call per text if the batch reply is malformed."""
+    if len(texts) == 1: return [await _classify_one(texts[0])]
+    if not await _ensure_models(): return [None] * len(texts)
+    items = "\n".join(f"        Item {i}: --- {text} ---" for i, text in enumerate(texts))
+    prompt = f"""
+        Analyze each of the following {len(texts)} texts and classify it according to the PARA method.
+        Your response MUST be a JSON array with exactly one object per item. Each object has the keys
+        "index" (the item number), "category", "title", "tags", "complexity" and "subtasks".
+        {CLASSIFICATION_RULES}
+{items}
+    """
+    try:
+        response = await _generate(json_model, "classify_batch", prompt)
+        batch = json.loads(response.text)
+        by_index = {entry.get("index"): entry for entry in batch if isinstance(entry, dict)} if isinstance(batch, list) else {}
+        if len(batch) == len(texts) and set(by_index) == set(range(len(texts))):
+            results = [_finish_classification(text, by_index[i]) for i, text in enumerate(texts)]
+            missing = [i for i, result in enumerate(results) if result is None]
+            if missing: logger.warning(f"{len(missing)} of {len(texts)} batch classifications were malformed, retrying them individually.")
+            for i, result in zip(missing, await asyncio.gather(*(_classify_one(texts[i]) for i in missing))):
+                results[i] = result
+            return results
+        logger.warning(f"Malformed batch classification for {len(texts)} items, retrying individually.")
+    except Exception as e:
+        logger.warning(f"Batch classification of {len(texts)} items failed, retrying individually: {e}")
+    return list(await asyncio.gather(*(_classify_one(text) for text in texts)))
+
+
+class ClassificationBatcher:
+    """Collects classification requests for a short window and answers them with one model call.
+
+    A batch is sent when ``window_seconds`` has passed since its first item or when it reaches
+    ``max_items``; each caller gets its own result back.
+    """
+
+    def __init__(self, window_seconds: float, max_items: int):
+        self.window_seconds = window_seconds
+        self.max_items = max_items
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def classify(self, text: str) -> dict | None:
+        if self.window_seconds <= 0 or self.max_items <= 1: return await _classify_one(text)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_items:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch: return
+        task = asyncio.create_task(self._run(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        try:
+            results = await _classify_many([text for text, _ in batch])
+        except Exception as e:
+            logger.error(f"Classification batch failed: {e}")
+            results = [None] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done(): future.set_result(result)
+
+
+batcher = ClassificationBatcher(config.AI_BATCH_WINDOW_MS / 1000, config.AI_BATCH_MAX_ITEMS)
+
+@metrics.traced("ai")
+async def process_text_with_ai(text: str) -> dict | None:
+    """Classifies text and judges project complexity in a single structured-output call.
+
+    Returns "category", "title", "tags" and "complexity" ("simple" or "complex"). Complex
+    projects also carry "subtasks", which are cached for ``stream_breakdown``. Concurrent
+    calls are micro-batched into one model request by ``batcher``.
+    """
+    cached = cache.get(_cache_key("classify", text))
+    if cached: return dict(cached)
+    return await batcher.classify(text)
+
+@metrics.traced("ai")
+async def extract_task_details(text: str) -> dict | None:
+    """Extracts the task name and a due date, asking the AI only when the local parser is unsure."""
+    local_details, confidence = date_parser.parse_task(text, date.today())
+    if confidence >= date_parser.MIN_CONFIDENCE:
+        logger.info(f"Parsed task details locally: {local_details}")
+        return local_details
 
     today_date = datetime.now().strftime("%Y-%m-%d")
+    # Relative dates ("tomorrow") depend on today, so entries are scoped to the current date.
+    key = _cache_key("task", text, scope=today_date)
+    cached = cache.get(key)
+    if cached: return dict(cached)
+    if not await _ensure_models():
+        return None
+
     prompt = f"""
         Analyze the following task description. Extract the core task and a due date if one is mentioned.
         Today's date is {today_date}.
@@ -52,53 +216,94 @@ def extract_task_details(text: str) -> dict | None:
         Your response MUST be a JSON object with two keys: "task_name" and "due_date".
 
         Example outputs:
-        - "Call the plumber tomorrow" -> {{"task_name": "Call the plumber", "due_date": "{(datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')}"}}
-        - "Finish the report by Friday" -> {{"task_name": "Finish the report", "due_date": null}}
-        - "Buy groceries" -> {{"task_name": "Buy groceries", "due_date": null}}
-        - "Schedule meeting for September 5th" -> {{"task_name": "Schedule meeting", "due_date": "{datetime.now().year}-09-05"}}
+{date_parser.prompt_examples(date.today())}
 
         Analyze this task: --- {text} ---
-        Provide only the JSON object in your response.
     """
 
     try:
         logger.info(f"Extracting task details from: '{text}'")
 
         # ✅ Add timeout so it doesn’t hang forever
-        response = model.generate_content(prompt, request_options={"timeout": 20})
+        response = await _generate(json_model, "task", prompt, request_options={"timeout": 20})
 
         raw_text = response.text.strip()
         logger.debug(f"Gemini raw response: {raw_text}")
 
-        # ✅ Clean and parse JSON safely
-        cleaned = raw_text.replace("```json", "").replace("```", "").strip()
         try:
-            task_details = json.loads(cleaned)
+            task_details = json.loads(raw_text)
         except json.JSONDecodeError:
             logger.error(f"Invalid JSON from AI: {raw_text}")
             return None
 
         logger.info(f"Extracted task details: {task_details}")
-        return task_details if "task_name" in task_details else None
+        if "task_name" not in task_details: return None
+        cache.set(key, task_details)
+        return task_details
 
     except Exception as e:
         logger.error(f"Error during task extraction: {e}")
         return None
 
 
-def is_project_complex(project_title: str) -> bool:
-    if not model: return False
-    prompt = f"""Analyze the project title: "{project_title}". Is it a simple, single-step task or a complex, multi-step project? Respond with "simple" or "complex"."""
-    try:
-        response = model.generate_content(prompt)
-        return "complex" in response.text.strip().lower()
-    except Exception: return False
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+def _subtask(line: str) -> str | None:
+    """The sub-task on one line of the model's list, without its bullet or number."""
+    task = _LIST_MARKER.sub("", line).strip().strip("*").strip()
+    return task or None
+
+async def stream_breakdown(project_title: str) -> AsyncIterator[str]:
+    """Yields the project's sub-tasks one by one as the model writes them.
 
-def break_down_project(project_title: str) -> list[str] | None:
-    if not model: return None
-    prompt = f"""Break down the project "{project_title}" into 3 to 8 actionable sub-tasks. Respond with a JSON object: {{"tasks": ["task1", "task2"]}}"""
+    A breakdown proposed during classification (or streamed before) comes from the cache all at
+    once. The full list is cached only when the stream completes; errors propagate to the caller.
+    """
+    key = _cache_key("breakdown", project_title)
+    cached = cache.get(key)
+    if cached:
+        for task in cached: yield task
+        return
+    if not await _ensure_models(): return
+    prompt = f"""Break down the project "{project_title}" into 3 to 8 actionable sub-tasks.
+    Respond with only the sub-tasks, one per line, each starting with "- ". No heading or other text."""
+    tasks, buffer, started = [], "", time.perf_counter()
+
+    def take(line: str) -> str | None:
+        task = _subtask(line)
+        if task and len(tasks) < MAX_SUBTASKS:
+            if not tasks: metrics.registry.observe("gemini", "breakdown_first_task", time.perf_counter() - started, "ok")
+            tasks.append(task)
+            return task
+        return None
+
+    # Only the time spent waiting on the model is recorded, not the caller's work between sub-tasks;
+    # a caller that stops early isn't an error.
+    model_seconds, status = 0.0, "ok"
     try:
-        response = model.generate_content(prompt)
-        cleaned_response_text = response.text.strip().replace("```json", "").replace("```", "").strip()
-        return json.loads(cleaned_response_text).get("tasks")
-    except Exception: return None
\ No newline at end of file
+        waited = time.perf_counter()
+        response = await model.generate_content_async(prompt, stream=True)
+        chunks = aiter(response)
+        model_seconds += time.perf_counter() - waited
+        while True:
+            waited = time.perf_counter()
+            try:
+                chunk = await anext(chunks)
+            except StopAsyncIteration:
+                break
+            finally:
+                model_seconds += time.perf_counter() - waited
+            buffer += chunk.text
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                if task := take(line): yield task
+        if task := take(buffer): yield task
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    except Exception as e:
+        status = metrics.status_of(e)
+        raise
+    finally:
+        metrics.registry.observe("gemini", "breakdown", model_seconds, status)
+    if tasks: cache.set(key, tasks)
@@ -0,0 +1,279 @@
+"""Replays a synthetic message trace through the bot's real handlers against local stand-ins.
+
+    python -m benchmarks.run --messages 500 --rate 20 --notion-latency 150 --notion-throttle 0.05
+
+Handler latencies (p50/p95/p99 and messages/s) are printed and written as JSON to ``--output``.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import math
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from telegram import Update
+
+from benchmarks.stubs import FakeGemini, FakeNotion, FakeTelegram, FakeTelegramSender, FakeWeb, Faults, seed_titles
+
+
+DATABASES = {"Projects": "db-projects", "Areas": "db-areas", "Resources": "db-resources", "Archive": "db-archive", "Tasks": "db-tasks"}
+
+# Share of each message kind in the synthetic trace.
+DEFAULT_MIX = {"text": 0.4, "link": 0.12, "media": 0.05, "task": 0.15, "find": 0.12, "addto": 0.06, "archive": 0.05, "today": 0.03, "queue": 0.02}
+
+_NOTES = ["Read the article about {w} later", "Plan the {w} launch with the team next quarter and assign owners", "Idea: a {w} tracker",
+          "Monthly {w} budget review", "Old {w} notes, finished", "Book recommendation on {w}", "Build a {w} dashboard for the family with reminders and weekly summaries"]
+_TASKS = ["Call the {w} shop tomorrow", "Pay the {w} invoice on Friday", "Email {w} client next week", "Sort out {w} paperwork soon", "Renew {w} subscription in 3 days", "Book {w} appointment"]
+
+
+# --- Traces ---
+def build_trace(messages: int, rate: float, chats: int, mix: dict[str, float], seed: int, unique_ratio: float, web_url: str = "https://example.com") -> list[dict]:
+    """Synthetic messages with Poisson arrivals (``rate`` per second, 0 = all at once); links point at ``web_url``."""
+    rng = random.Random(seed)
+    titles = [title for db_name in ("Projects", "Areas", "Resources") for title in seed_titles(db_name, 20)]
+    kinds, weights = list(mix), list(mix.values())
+    words = [title.split()[0].lower() for title in titles]
+    trace, at, seen, seen_links = [], 0.0, [], []
+    for i in range(messages):
+        if rate > 0: at += rng.expovariate(rate)
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "text":
+            text = rng.choice(seen) if seen and rng.random() > unique_ratio else rng.choice(_NOTES).format(w=f"{rng.choice(words)} {i}")
+            seen.append(text)
+        elif kind == "link":
+            text = rng.choice(seen_links) if seen_links and rng.random() > unique_ratio else f"{web_url}/{rng.choice(words)}/{i}"
+            seen_links.append(text)
+        elif kind == "media": text = f"Photo of the {rng.choice(words)}"
+        elif kind == "task": text = "/task " + rng.choice(_TASKS).format(w=rng.choice(words))
+        elif kind == "find": text = "/find " + rng.choice([rng.choice(words), f"{rng.choice(words)[:4]}", f"{rng.choice(words)} in:projects", f"#{rng.choice(titles).split()[1]}"])
+        elif kind == "addto": text = f"/addto {rng.choice(titles).lower()} - follow-up {i}"
+        elif kind == "archive": text = f"/archive {rng.choice(titles)}"
+        else: text = f"/{kind}"
+        trace.append({"at": at, "kind": kind, "chat_id": 1000 + rng.randrange(chats), "text": text})
+    return trace
+
+
+def _update(update_id: int, event: dict) -> dict:
+    """The Bot API JSON of the update carrying one trace message."""
+    user = {"id": event["chat_id"], "is_bot": False, "first_name": "Bench"}
+    message = {"message_id": update_id, "date": int(time.time()), "chat": {"id": event["chat_id"], "type": "private"}, "from": user}
+    text = event["text"]
+    if event["kind"] == "media":
+        message.update(photo=[{"file_id": f"photo{update_id}", "file_unique_id": f"p{update_id}", "width": 800, "height": 600}], caption=text)
+    else:
+        message["text"] = text
+        if text.startswith("/"): message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        elif text.startswith("http"): message["entities"] = [{"type": "url", "offset": 0, "length": len(text)}]
+    return {"update_id": update_id, "message": message}
+
+
+# --- Reporting ---
+def summarize(samples: list[float], duration: float, errors: int = 0) -> dict:
+    """Latency percentiles in milliseconds (nearest rank) and completed messages per second."""
+    ordered = sorted(samples)
+    def percentile(p: float) -> float:
+        return round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1000, 2) if ordered else 0.0
+    return {"count": len(ordered), "errors": errors, "p50_ms": percentile(50), "p95_ms": percentile(95), "p99_ms": percentile(99),
+            "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0, "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+            "msgs_per_s": round(len(ordered) / duration, 2) if duration > 0 else 0.0}
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _capture_latencies(outbox_path: str) -> tuple[dict[str, list[float]], dict[str, int]]:
+    """Journal-to-Notion times of finished captures, and how many did not finish, per kind."""
+    done, unfinished = defaultdict(list), defaultdict(int)
+    with sqlite3.connect(outbox_path) as conn:
+        for kind, status, created, updated in conn.execute("SELECT kind, status, created_at, updated_at FROM captures"):
+            if status == "done": done[kind].append(updated - created)
+            else: unfinished[kind] += 1
+    return done, unfinished
+
+
+# --- Harness ---
+async def run(args: argparse.Namespace) -> dict:
+    notion = FakeNotion(DATABASES, Faults(args.notion_latency, args.notion_jitter, args.notion_errors, args.notion_throttle, args.notion_rate_limit, args.retry_after), seed_pages=args.seed_pages, seed=args.seed)
+    telegram = FakeTelegram(Faults(args.telegram_latency, args.telegram_jitter, args.telegram_errors, args.telegram_throttle, 0, args.retry_after), seed=args.seed)
+    gemini = FakeGemini(Faults(args.gemini_latency, args.gemini_jitter, args.gemini_errors, args.gemini_throttle), seed=args.seed)
+    web = FakeWeb(Faults(args.web_latency, args.web_jitter, args.web_errors, args.web_throttle), seed=args.seed)
+    notion_url, telegram_url, web_url = await notion.start(), await telegram.start(), await web.start()
+
+    workdir = tempfile.mkdtemp(prefix="para-bench-")
+    os.environ.update({
+        "TELEGRAM_TOKEN": "123456:bench", "TELEGRAM_API_BASE_URL": f"{telegram_url}/bot", "NOTION_API_KEY": "bench", "NOTION_API_BASE_URL": notion_url,
+        "NOTION_PROJECTS_DB_ID": DATABASES["Projects"], "NOTION_AREAS_DB_ID": DATABASES["Areas"], "NOTION_RESOURCES_DB_ID": DATABASES["Resources"],
+        "NOTION_ARCHIVES_DB_ID": DATABASES["Archive"], "NOTION_TASKS_DB_ID": DATABASES["Tasks"], "GEMINI_API_KEY": "bench",
+        "TITLE_INDEX_PATH": os.path.join(workdir, "title_index.db"), "SEARCH_INDEX_PATH": os.path.join(workdir, "search_index.db"),
+        "OUTBOX_PATH": os.path.join(workdir, "outbox.db"), "AI_CACHE_PATH": os.path.join(workdir, "ai_cache.db"),
+        "LINK_DB_PATH": os.path.join(workdir, "links.db"), "PENDING_ACTIONS_PATH": os.path.join(workdir, "pending_actions.db"),
+        "IMPORT_DIR": os.path.join(workdir, "imports"), "UNFURL_ALLOWED_HOSTS": "127.0.0.1",
+    })
+    os.environ.update(dict(item.split("=", 1) for item in args.env))
+    # The bot modules read their configuration at import time.
+    bot = importlib.import_module("main")
+    ai_handler, notion_handler = importlib.import_module("ai_handler"), importlib.import_module("notion_handler")
+    ai_handler.model = ai_handler.json_model = gemini
+    logging.getLogger().setLevel(args.log_level)
+
+    application = bot.build_application()
+    errors: dict[int, int] = defaultdict(int)
+    async def count_error(update, context) -> None:
+        if getattr(update, "update_id", None) is not None: errors[update.update_id] += 1
+    application.add_error_handler(count_error)
+
+    await application.initialize()
+    # Seeding the indexes is setup, not load: it reads at the stand-in's own limit rather than the bot's request budget.
+    bucket, seed_rate = notion_handler.write_queue.bucket, args.notion_rate_limit or 1e6
+    notion_handler.write_queue.bucket = importlib.import_module("write_queue").TokenBucket(seed_rate, seed_rate)
+    sync_started = time.perf_counter()
+    await notion_handler.sync_title_index(full=True)
+    await notion_handler.sync_search_index(full=True)
+    index_sync_seconds = time.perf_counter() - sync_started
+    notion_handler.write_queue.bucket = bucket
+    await bot.on_startup(application)
+    await application.start()
+    sender = None
+    if args.transport == "webhook":
+        webhook = importlib.import_module("webhook")
+        server = await webhook.serve(application, "127.0.0.1", 0, "/telegram", "bench-secret")
+        sender = FakeTelegramSender(f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/telegram", "bench-secret")
+        # Webhook updates reach the handlers through the update queue, so completion is observed at the update processor.
+        completions: dict[int, asyncio.Future] = {}
+        process_update = application.update_processor.process_update
+        async def observed_process_update(update, coroutine) -> None:
+            try:
+                await process_update(update, coroutine)
+            finally:
+                if update.update_id in completions: completions[update.update_id].set_result(None)
+        application.update_processor.process_update = observed_process_update
+
+    trace = build_trace(args.messages, args.rate, args.chats, DEFAULT_MIX, args.seed, args.unique, web_url)
+    latencies: dict[str, list[float]] = defaultdict(list)
+    windows: dict[str, list[float]] = {}
+    handler_errors: dict[str, int] = defaultdict(int)
+    acks: list[float] = []
+
+    async def replay(update_id: int, event: dict, due: float) -> None:
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        data = _update(update_id, event)
+        started = time.perf_counter()
+        if sender:
+            completions[update_id] = asyncio.get_running_loop().create_future()
+            status = await sender.send(data)
+            acks.append(time.perf_counter() - started)
+            if status != 200: raise RuntimeError(f"Webhook answered {status}")
+            await completions[update_id]
+            del completions[update_id]
+        else:
+            update = Update.de_json(data, application.bot)
+            await application.update_processor.process_update(update, application.process_update(update))
+        done = time.perf_counter()
+        latencies[event["kind"]].append(done - started)
+        window = windows.setdefault(event["kind"], [started, done])
+        window[0], window[1] = min(window[0], started), max(window[1], done)
+        if errors.get(update_id): handler_errors[event["kind"]] += 1
+
+    replay_started = time.perf_counter()
+    await asyncio.gather(*(replay(i + 1, event, replay_started + event["at"]) for i, event in enumerate(trace)))
+    replay_seconds = time.perf_counter() - replay_started
+
+    deadline = time.monotonic() + args.drain_timeout
+    while time.monotonic() < deadline:
+        backlog = bot.outbox.backlog()
+        if not backlog["pending"] and not backlog["processing"] and not notion_handler.write_queue.pending(): break
+        await asyncio.sleep(0.1)
+    drain_seconds = time.perf_counter() - replay_started
+    scheduler = application.update_processor.metrics()
+
+    if sender:
+        await sender.aclose()
+        server.close()
+    await application.stop()
+    await application.shutdown()
+    await bot.on_shutdown(application)
+    await notion.stop()
+    await telegram.stop()
+    await web.stop()
+
+    captures, unfinished = _capture_latencies(os.environ["OUTBOX_PATH"])
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "handlers": {kind: summarize(values, windows[kind][1] - windows[kind][0], handler_errors[kind]) for kind, values in sorted(latencies.items())},
+        "captures": {kind: {**summarize(values, drain_seconds), "unfinished": unfinished.get(kind, 0)} for kind, values in sorted(captures.items())},
+        "total": {**summarize(all_latencies, replay_seconds, sum(handler_errors.values())), "replay_s": round(replay_seconds, 3), "drain_s": round(drain_seconds, 3)},
+        **({"webhook_ack": summarize(acks, replay_seconds)} if sender else {}),
+        "index_sync_s": round(index_sync_seconds, 3),
+        "scheduler": {key: value for key, value in scheduler.items() if key != "wait_buckets"},
+        "ai_cache": ai_handler.cache.stats(),
+        "unfurl_cache": bot.unfurler.cache.stats(),
+        "stages": importlib.import_module("metrics").registry.stages(),
+        "stubs": {"notion_requests": dict(notion.requests), "notion_statuses": {str(k): v for k, v in notion.statuses.items()},
+                  "telegram_calls": dict(telegram.calls), "telegram_statuses": {str(k): v for k, v in telegram.statuses.items()},
+                  "gemini_calls": dict(gemini.calls), "gemini_errors": {str(k): v for k, v in gemini.errors.items()},
+                  "web_requests": web.requests, "web_statuses": {str(k): v for k, v in web.statuses.items()}},
+    }
+
+
+def _print_table(report: dict) -> None:
+    print(f"{'handler':<12}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'msgs/s':>9}")
+    for section in ("handlers", "captures"):
+        for kind, stats in report[section].items():
+            name = kind if section == "handlers" else f"{kind} (e2e)"
+            print(f"{name:<12}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['msgs_per_s']:>9}")
+    total = report["total"]
+    print(f"{'total':<12}{total['count']:>7}{total['errors']:>8}{total['p50_ms']:>10}{total['p95_ms']:>10}{total['p99_ms']:>10}{total['msgs_per_s']:>9}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=300, help="messages in the trace")
+    parser.add_argument("--rate", type=float, default=20.0, help="mean arrivals per second (0 sends everything at once)")
+    parser.add_argument("--chats", type=int, default=50, help="distinct chats sending messages")
+    parser.add_argument("--unique", type=float, default=0.8, help="share of free-text and link messages that are not repeats")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--seed-pages", type=int, default=50, help="pages per database in the fake workspace")
+    for service, latency in (("notion", 150.0), ("telegram", 40.0), ("gemini", 600.0), ("web", 200.0)):
+        parser.add_argument(f"--{service}-latency", type=float, default=latency, help=f"{service} response time in ms")
+        parser.add_argument(f"--{service}-jitter", type=float, default=latency / 3, help=f"{service} latency jitter in ms (+/-)")
+        parser.add_argument(f"--{service}-errors", type=float, default=0.0, help=f"share of {service} calls failing with a 5xx")
+        parser.add_argument(f"--{service}-throttle", type=float, default=0.0, help=f"share of {service} calls answered with a 429")
+    parser.add_argument("--notion-rate-limit", type=float, default=0.0, help="requests/s Notion accepts before answering 429 (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--transport", choices=["direct", "webhook"], default="direct", help="hand updates to the processor directly, or POST them to the webhook endpoint")
+    parser.add_argument("--drain-timeout", type=float, default=120.0, help="seconds to wait for queued captures and writes after the replay")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="override a bot setting, e.g. --env NOTION_WRITE_RATE=10")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", default=None, help="JSON results file (default: benchmarks/results/<timestamp>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    output = args.output or os.path.join(os.path.dirname(__file__), "results", datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    _print_table(report)
+    print(f"\nResults written to {output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
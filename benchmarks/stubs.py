@@ -0,0 +1,387 @@
+"""Local stand-ins for the Notion REST API, the Telegram Bot API, Gemini and linked web pages, with injectable faults."""
+import asyncio
+import itertools
+import json
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from urllib.parse import parse_qsl
+
+import httpx
+from google.api_core import exceptions as google_exceptions
+
+import http_server
+from http_server import Request, Response
+
+
+@dataclass
+class Faults:
+    """Latency and failure injection for one stand-in.
+
+    ``error_rate`` and ``throttle_rate`` are per-request probabilities of a 5xx and of a 429;
+    ``rate_limit`` (requests/s, 0 = unlimited) additionally answers 429 once exceeded.
+    """
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    rate_limit: float = 0.0
+    retry_after: float = 1.0
+
+
+class _Injector:
+    def __init__(self, faults: Faults, seed: int):
+        self.faults = faults
+        self._rng = random.Random(seed)
+        self._tokens = faults.rate_limit
+        self._updated = time.monotonic()
+
+    async def delay(self) -> None:
+        seconds = (self.faults.latency_ms + self._rng.uniform(-1, 1) * self.faults.jitter_ms) / 1000
+        if seconds > 0: await asyncio.sleep(seconds)
+
+    def fault(self) -> int | None:
+        """Returns 429 or 500 when this request should fail, otherwise None."""
+        if self.faults.rate_limit > 0:
+            now = time.monotonic()
+            self._tokens = min(self.faults.rate_limit, self._tokens + (now - self._updated) * self.faults.rate_limit)
+            self._updated = now
+            if self._tokens < 1: return 429
+            self._tokens -= 1
+        roll = self._rng.random()
+        if roll < self.faults.throttle_rate: return 429
+        if roll < self.faults.throttle_rate + self.faults.error_rate: return 500
+        return None
+
+
+async def _listen(handler) -> tuple[asyncio.Server, str]:
+    server = await http_server.serve(handler, "127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+
+# --- Seed Data ---
+_WORDS = ["garden", "budget", "kitchen", "travel", "python", "marathon", "reading", "invoice", "podcast", "camera",
+          "website", "tax", "wedding", "course", "research", "recipe", "guitar", "mentor", "client", "launch"]
+_KINDS = ["plan", "notes", "ideas", "checklist", "review", "draft", "log", "goals"]
+
+
+def seed_titles(db_name: str, count: int) -> list[str]:
+    """Deterministic page titles used both to seed the fake workspace and to build traces."""
+    rng = random.Random(db_name)
+    return [f"{rng.choice(_WORDS).capitalize()} {rng.choice(_KINDS)} {i}" for i in range(count)]
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _with_plain_text(properties: dict) -> dict:
+    """Notion fills in ``plain_text`` on every rich-text part it returns."""
+    result = {}
+    for name, value in properties.items():
+        if isinstance(value, dict) and "title" in value:
+            value = {**value, "title": [{**part, "plain_text": part.get("plain_text") or part.get("text", {}).get("content", "")} for part in value["title"]]}
+        result[name] = value
+    return result
+
+
+def _plain_title(page: dict) -> str:
+    for value in page["properties"].values():
+        if isinstance(value, dict) and "title" in value:
+            return "".join(part.get("plain_text", "") for part in value["title"])
+    return ""
+
+
+# --- Notion ---
+class FakeNotion:
+    """In-memory Notion workspace served over HTTP: pages, database queries, search and block children."""
+
+    def __init__(self, databases: dict[str, str], faults: Faults | None = None, seed_pages: int = 100, seed: int = 0):
+        self.databases = databases
+        self.injector = _Injector(faults or Faults(), seed)
+        self.pages: dict[str, dict] = {}
+        self.children: dict[str, list[dict]] = {}
+        self.requests: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self.server: asyncio.Server | None = None
+        self.url = ""
+        for db_name, db_id in databases.items():
+            if db_name == "Tasks": continue
+            for title in seed_titles(db_name, seed_pages):
+                self._create({"parent": {"database_id": db_id}, "properties": {"Name": {"title": [{"text": {"content": title}}]}, "Tags": {"multi_select": [{"name": title.split()[1]}]}},
+                              "children": [{"object": "block", "type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": f"Notes about {title.lower()}."}}]}}]})
+
+    async def start(self) -> str:
+        self.server, self.url = await _listen(self.handle)
+        return self.url
+
+    async def stop(self) -> None:
+        self.server.close()
+
+    def _create(self, payload: dict) -> dict:
+        page_id, now = str(uuid.uuid4()), _now_iso()
+        page = {"object": "page", "id": page_id, "url": f"https://www.notion.so/{page_id.replace('-', '')}", "created_time": now, "last_edited_time": now,
+                "archived": False, "in_trash": False, "parent": payload.get("parent", {}), "properties": _with_plain_text(payload.get("properties", {}))}
+        self.pages[page_id] = page
+        self.children[page_id] = list(payload.get("children", []))
+        return page
+
+    @staticmethod
+    def _matches(page: dict, query_filter: dict | None) -> bool:
+        if not query_filter: return True
+        if "timestamp" in query_filter:
+            bound = query_filter[query_filter["timestamp"]].get("on_or_after", "")
+            return page[query_filter["timestamp"]] >= bound
+        prop = page["properties"].get(query_filter.get("property"), {})
+        if "title" in query_filter: return "".join(part.get("plain_text", "") for part in prop.get("title", [])) == query_filter["title"].get("equals")
+        if "date" in query_filter: return (prop.get("date") or {}).get("start") == query_filter["date"].get("equals")
+        return True
+
+    @staticmethod
+    def _page_of(items: list, start_cursor: str | None, page_size: int) -> dict:
+        start = int(start_cursor or 0)
+        end = start + min(page_size or 100, 100)
+        return {"object": "list", "results": items[start:end], "has_more": end < len(items), "next_cursor": str(end) if end < len(items) else None}
+
+    async def handle(self, request: Request) -> Response:
+        route = re.sub(r"/[0-9a-f-]{36}|/db-[\w-]+", "/{id}", request.path)
+        self.requests[f"{request.method} {route}"] += 1
+        await self.injector.delay()
+        status = self.injector.fault()
+        if status == 429:
+            self.statuses[429] += 1
+            return Response.json({"object": "error", "status": 429, "code": "rate_limited"}, status=429, headers={"Retry-After": str(self.injector.faults.retry_after)})
+        if status:
+            self.statuses[status] += 1
+            return Response.json({"object": "error", "status": status, "code": "internal_server_error"}, status=status)
+        response = self._route(request)
+        self.statuses[response.status] += 1
+        return response
+
+    def _route(self, request: Request) -> Response:
+        path, body = request.path.removeprefix("/v1"), request.json() if request.body else {}
+        if request.method == "POST" and path == "/pages":
+            return Response.json(self._create(body))
+        if match := re.fullmatch(r"/databases/([^/]+)/query", path):
+            pages = [page for page in self.pages.values() if page["parent"].get("database_id") == match.group(1) and not page["archived"] and self._matches(page, body.get("filter"))]
+            for sort in reversed(body.get("sorts", [])):
+                pages.sort(key=lambda page: page[sort.get("timestamp", "last_edited_time")], reverse=sort.get("direction") == "descending")
+            return Response.json(self._page_of(pages, body.get("start_cursor"), body.get("page_size", 100)))
+        if request.method == "POST" and path == "/search":
+            needle = body.get("query", "").casefold()
+            pages = sorted((page for page in self.pages.values() if not page["archived"] and needle in _plain_title(page).casefold()), key=lambda page: page["last_edited_time"], reverse=True)
+            return Response.json(self._page_of(pages, body.get("start_cursor"), body.get("page_size", 100)))
+        if match := re.fullmatch(r"/blocks/([^/]+)/children", path):
+            blocks = self.children.setdefault(match.group(1), [])
+            if request.method == "PATCH":
+                blocks.extend(body.get("children", []))
+                if match.group(1) in self.pages: self.pages[match.group(1)]["last_edited_time"] = _now_iso()
+                return Response.json({"object": "list", "results": body.get("children", []), "has_more": False, "next_cursor": None})
+            return Response.json(self._page_of(blocks, request.query.get("start_cursor"), int(request.query.get("page_size", 100))))
+        if match := re.fullmatch(r"/pages/([^/]+)", path):
+            page = self.pages.get(match.group(1))
+            if page is None: return Response.json({"object": "error", "status": 404, "code": "object_not_found"}, status=404)
+            if request.method == "PATCH":
+                page.update({key: value for key, value in body.items() if key in ("archived", "in_trash")})
+                page["properties"].update(_with_plain_text(body.get("properties", {})))
+                page["last_edited_time"] = _now_iso()
+            return Response.json(page)
+        return Response.json({"object": "error", "status": 400, "code": "invalid_request_url"}, status=400)
+
+
+# --- Web ---
+class FakeWeb:
+    """Web pages for link captures: every path answers HTML with a <title>, OpenGraph tags and a long body.
+
+    Query strings and trailing slashes don't change the page, like on most real sites.
+    """
+
+    def __init__(self, faults: Faults | None = None, seed: int = 0, body_bytes: int = 200_000):
+        self.injector = _Injector(faults or Faults(), seed)
+        self.body_bytes = body_bytes
+        self.requests = 0
+        self.statuses: Counter = Counter()
+        self.server: asyncio.Server | None = None
+        self.url = ""
+
+    async def start(self) -> str:
+        self.server, self.url = await _listen(self.handle)
+        return self.url
+
+    async def stop(self) -> None:
+        self.server.close()
+
+    async def handle(self, request: Request) -> Response:
+        self.requests += 1
+        await self.injector.delay()
+        status = self.injector.fault()
+        if status:
+            self.statuses[status] += 1
+            return Response.text("Unavailable", status=status)
+        self.statuses[200] += 1
+        path = request.path.rstrip("/") or "/"
+        title = " ".join(part.capitalize() for part in path.strip("/").split("/")) or "Home"
+        head = (f"<!doctype html><html><head><meta charset='utf-8'><title>{title} | Bench</title>"
+                f"<meta property='og:title' content='{title}'><meta property='og:site_name' content='Bench'>"
+                f"<meta property='og:description' content='A long read about {title.lower()}, with notes, links and examples for later.'>"
+                f"<link rel='canonical' href='{self.url}{path}'></head><body>")
+        return Response.text(head + "<p>" + "lorem ipsum " * (self.body_bytes // 12) + "</p></body></html>", content_type="text/html; charset=utf-8")
+
+
+# --- Telegram ---
+BOT_USER = {"id": 100000, "is_bot": True, "first_name": "PARA Bench", "username": "para_bench_bot", "can_join_groups": False, "can_read_all_group_messages": False, "supports_inline_queries": False}
+
+
+class FakeTelegram:
+    """Bot API stand-in that accepts every method and answers with plausible objects.
+
+    Point the bot at it with ``base_url=f"{fake.url}/bot"``.
+    """
+
+    def __init__(self, faults: Faults | None = None, seed: int = 0):
+        self.injector = _Injector(faults or Faults(), seed)
+        self.calls: Counter = Counter()
+        self.statuses: Counter = Counter()
+        self._message_ids = itertools.count(1_000_000)
+        self.server: asyncio.Server | None = None
+        self.url = ""
+
+    async def start(self) -> str:
+        self.server, self.url = await _listen(self.handle)
+        return self.url
+
+    async def stop(self) -> None:
+        self.server.close()
+
+    @staticmethod
+    def _params(request: Request) -> dict:
+        if request.headers.get("content-type", "").startswith("application/json"): return request.json() or {}
+        params = {}
+        for name, value in parse_qsl(request.body.decode()):
+            try:
+                params[name] = json.loads(value)
+            except ValueError:
+                params[name] = value
+        return params
+
+    def _message(self, params: dict) -> dict:
+        return {"message_id": params.get("message_id") or next(self._message_ids), "date": int(time.time()), "chat": {"id": params.get("chat_id", 0), "type": "private"},
+                "from": BOT_USER, "text": params.get("text", "")}
+
+    async def handle(self, request: Request) -> Response:
+        method = request.path.rsplit("/", 1)[-1]
+        self.calls[method] += 1
+        await self.injector.delay()
+        status = self.injector.fault()
+        if status == 429:
+            self.statuses[429] += 1
+            retry_after = max(1, round(self.injector.faults.retry_after))
+            return Response.json({"ok": False, "error_code": 429, "description": f"Too Many Requests: retry after {retry_after}", "parameters": {"retry_after": retry_after}}, status=429)
+        if status:
+            self.statuses[status] += 1
+            return Response.json({"ok": False, "error_code": status, "description": "Internal Server Error"}, status=status)
+        self.statuses[200] += 1
+        params = self._params(request)
+        if method == "getMe": result = BOT_USER
+        elif method in ("sendMessage", "editMessageText"): result = self._message(params)
+        elif method == "getFile": result = {"file_id": params.get("file_id"), "file_unique_id": f"u{params.get('file_id')}", "file_size": 1024, "file_path": f"photos/{params.get('file_id')}.jpg"}
+        elif method == "getUpdates": result = []
+        else: result = True
+        return Response.json({"ok": True, "result": result})
+
+
+class FakeTelegramSender:
+    """Telegram's side of a webhook: POSTs update JSON (one update or a list) to the bot's endpoint."""
+
+    def __init__(self, url: str, secret_token: str | None = None):
+        self.url = url
+        self._client = httpx.AsyncClient(headers={"X-Telegram-Bot-Api-Secret-Token": secret_token} if secret_token else {})
+
+    async def send(self, updates: dict | list[dict]) -> int:
+        response = await self._client.post(self.url, content=json.dumps(updates), headers={"Content-Type": "application/json"})
+        return response.status_code
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+# --- Gemini ---
+class _Reply:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StreamedReply:
+    """Async iterator over a reply cut into chunks, like ``generate_content_async(..., stream=True)``."""
+
+    def __init__(self, text: str, injector: "_Injector", chunk_chars: int = 16):
+        self._chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+        self._injector = injector
+
+    async def __aiter__(self):
+        for chunk in self._chunks:
+            await self._injector.delay()
+            yield _Reply(chunk)
+
+
+_CATEGORY_WORDS = {
+    "Projects": ("launch", "build", "plan", "organize", "write", "migrate"),
+    "Areas": ("health", "finance", "budget", "home", "fitness", "career"),
+    "Archive": ("old", "finished", "done", "past"),
+}
+_SECTION = r"--- (.*?) ---"
+
+
+def _classify(text: str) -> dict:
+    words = text.casefold().split()
+    category = next((name for name, keys in _CATEGORY_WORDS.items() if any(key in words for key in keys)), "Resources")
+    complex_project = category == "Projects" and len(words) > 6
+    return {"category": category, "title": text[:80], "tags": [word.strip(".,!?") for word in words[:2]], "complexity": "complex" if complex_project else "simple",
+            "subtasks": [f"Step {i + 1} of {text[:30]}" for i in range(4)] if complex_project else []}
+
+
+class FakeGemini:
+    """In-process stand-in for ``genai.GenerativeModel`` that answers the bot's prompts deterministically.
+
+    Failures raise the same ``google.api_core`` exceptions the real client does.
+    """
+
+    def __init__(self, faults: Faults | None = None, seed: int = 0):
+        self.injector = _Injector(faults or Faults(), seed)
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs) -> _Reply | _StreamedReply:
+        kind, reply = self._answer(prompt)
+        self.calls[kind] += 1
+        await self.injector.delay()
+        status = self.injector.fault()
+        if status == 429:
+            self.errors[429] += 1
+            raise google_exceptions.ResourceExhausted("Resource has been exhausted (e.g. check quota).")
+        if status:
+            self.errors[status] += 1
+            raise google_exceptions.InternalServerError("An internal error has occurred.")
+        if stream:
+            if kind == "breakdown": reply = "\n".join(f"- {task}" for task in json.loads(reply)["tasks"])
+            # Each chunk takes a tenth of the full response time.
+            return _StreamedReply(reply, _Injector(Faults(self.injector.faults.latency_ms / 10, self.injector.faults.jitter_ms / 10), 0))
+        return _Reply(reply)
+
+    @staticmethod
+    def _answer(prompt: str) -> tuple[str, str]:
+        if items := re.findall(r"Item (\d+): " + _SECTION, prompt):
+            return "classify_batch", json.dumps([{"index": int(i), **_classify(text)} for i, text in items])
+        if match := re.search(r"Text to analyze: " + _SECTION, prompt, re.S):
+            return "classify", json.dumps(_classify(match.group(1)))
+        if match := re.search(r"Analyze this task: " + _SECTION, prompt, re.S):
+            text = match.group(1)
+            due = date.today().isoformat() if any(word in text.casefold() for word in ("soon", "asap", "later")) else None
+            return "task", json.dumps({"task_name": text, "due_date": due})
+        if match := re.search(r'Break down the project "(.*?)"', prompt):
+            return "breakdown", json.dumps({"tasks": [f"Step {i + 1} of {match.group(1)[:30]}" for i in range(4)]})
+        return "other", "simple"
@@ -6,14 +6,112 @@ load_dotenv()
 
 # --- Telegram Configuration ---
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+# Bot API endpoint (overridable to point the bot at a local stand-in, e.g. for benchmarks)
+TELEGRAM_API_BASE_URL = os.getenv("TELEGRAM_API_BASE_URL", "https://api.telegram.org/bot")
+
+# How updates arrive: "polling" (default) or "webhook"
+TELEGRAM_MODE = os.getenv("TELEGRAM_MODE", "polling").lower()
+# Webhook mode: the embedded server listens on WEBHOOK_HOST:WEBHOOK_PORT at WEBHOOK_PATH. WEBHOOK_URL is the
+# public address registered with Telegram (leave empty if it's registered elsewhere); requests must carry WEBHOOK_SECRET, which is required.
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# Telegram user ids allowed to use admin commands such as /stats (comma-separated; empty = nobody)
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+
+# Pending inline-keyboard confirmations: kept this long, at most this many, in this file (empty = memory only)
+PENDING_ACTIONS_PATH = os.getenv("PENDING_ACTIONS_PATH", "pending_actions.db")
+PENDING_ACTION_TTL_SECONDS = int(os.getenv("PENDING_ACTION_TTL_SECONDS", str(24 * 3600)))
+PENDING_ACTIONS_MAX = int(os.getenv("PENDING_ACTIONS_MAX", "10000"))
+
+# Update scheduling: chats run concurrently, each chat's updates stay in order; a chat's updates beyond
+# UPDATE_MAX_CHAT_QUEUE wait their turn without holding up other chats
+UPDATE_MAX_CONCURRENCY = int(os.getenv("UPDATE_MAX_CONCURRENCY", "16"))
+UPDATE_MAX_CHAT_QUEUE = int(os.getenv("UPDATE_MAX_CHAT_QUEUE", "20"))
+
+# Outgoing messages per second (Telegram allows about 30 overall)
+TELEGRAM_SEND_RATE = float(os.getenv("TELEGRAM_SEND_RATE", "25"))
+
+# Minimum seconds between edits of a message that is being filled in progressively (e.g. a streamed project breakdown)
+PROGRESSIVE_EDIT_SECONDS = float(os.getenv("PROGRESSIVE_EDIT_SECONDS", "1"))
+
+# How long (seconds) a computed digest is shared between chats
+DIGEST_WINDOW_SECONDS = float(os.getenv("DIGEST_WINDOW_SECONDS", "60"))
 
 # --- Notion Configuration ---
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
+NOTION_API_BASE_URL = os.getenv("NOTION_API_BASE_URL", "https://api.notion.com/v1")
 NOTION_PROJECTS_DB_ID = os.getenv("NOTION_PROJECTS_DB_ID")
 NOTION_AREAS_DB_ID = os.getenv("NOTION_AREAS_DB_ID")
 NOTION_RESOURCES_DB_ID = os.getenv("NOTION_RESOURCES_DB_ID")
 NOTION_ARCHIVES_DB_ID = os.getenv("NOTION_ARCHIVES_DB_ID")
 NOTION_TASKS_DB_ID = os.getenv("NOTION_TASKS_DB_ID")
 
+# Approved project breakdowns become rows of the Tasks database, linked to the project through this
+# relation property, instead of to-do blocks on the project page
+PROJECT_TASKS_AS_ROWS = os.getenv("PROJECT_TASKS_AS_ROWS", "false").lower() in ("1", "true", "yes")
+NOTION_TASK_PROJECT_PROPERTY = os.getenv("NOTION_TASK_PROJECT_PROPERTY", "Project")
+
+# Connection pool and timeouts (seconds) for the shared async Notion client
+NOTION_TIMEOUT = float(os.getenv("NOTION_TIMEOUT", "10"))
+NOTION_CONNECT_TIMEOUT = float(os.getenv("NOTION_CONNECT_TIMEOUT", "5"))
+NOTION_MAX_CONNECTIONS = int(os.getenv("NOTION_MAX_CONNECTIONS", "10"))
+NOTION_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("NOTION_MAX_KEEPALIVE_CONNECTIONS", "5"))
+
+# Write queue: Notion allows about 3 requests/s per integration
+NOTION_WRITE_RATE = float(os.getenv("NOTION_WRITE_RATE", "3"))
+NOTION_WRITE_BURST = float(os.getenv("NOTION_WRITE_BURST", "3"))
+NOTION_WRITE_WORKERS = int(os.getenv("NOTION_WRITE_WORKERS", "3"))
+NOTION_WRITE_MAX_RETRIES = int(os.getenv("NOTION_WRITE_MAX_RETRIES", "5"))
+
+# Local title -> page index used by /archive and /addto
+TITLE_INDEX_PATH = os.getenv("TITLE_INDEX_PATH", "title_index.db")
+TITLE_INDEX_SYNC_SECONDS = int(os.getenv("TITLE_INDEX_SYNC_SECONDS", "300"))
+# Incremental syncs can't see pages being archived or deleted, so the indexes are checked against a full listing this often
+INDEX_RECONCILE_SECONDS = int(os.getenv("INDEX_RECONCILE_SECONDS", "3600"))
+
+# Local full-text index used by /find (synced on the same schedule as the title index)
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "search_index.db")
+
+# --- Link Previews ---
+# Saved links (dedup index) and cached page previews share this file
+LINK_DB_PATH = os.getenv("LINK_DB_PATH", "links.db")
+UNFURL_TIMEOUT = float(os.getenv("UNFURL_TIMEOUT", "3"))
+UNFURL_MAX_BYTES = int(os.getenv("UNFURL_MAX_BYTES", str(32 * 1024)))
+UNFURL_PER_HOST = int(os.getenv("UNFURL_PER_HOST", "2"))
+UNFURL_CACHE_TTL_SECONDS = int(os.getenv("UNFURL_CACHE_TTL_SECONDS", str(24 * 3600)))
+# Previews are only fetched from public addresses; hosts listed here (comma-separated) are exempt, e.g. a local test server
+UNFURL_ALLOWED_HOSTS = [host.strip() for host in os.getenv("UNFURL_ALLOWED_HOSTS", "").split(",") if host.strip()]
+
+# --- Metrics ---
+# Prometheus endpoint (GET /metrics); a port of 0 turns it off
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# --- Capture Outbox ---
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "outbox.db")
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+
+# --- Bulk Import ---
+# Uploaded files and import checkpoints are kept here until an import finishes
+IMPORT_DIR = os.getenv("IMPORT_DIR", "imports")
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", "8"))
+IMPORT_PROGRESS_SECONDS = float(os.getenv("IMPORT_PROGRESS_SECONDS", "3"))
+
 # --- AI Engine (Google Gemini) Configuration ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Cache of AI results: in-memory LRU backed by a SQLite file
+AI_CACHE_PATH = os.getenv("AI_CACHE_PATH", "ai_cache.db")
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+AI_CACHE_MEMORY_ENTRIES = int(os.getenv("AI_CACHE_MEMORY_ENTRIES", "1024"))
+AI_CACHE_DISK_ENTRIES = int(os.getenv("AI_CACHE_DISK_ENTRIES", "50000"))
+
+# Micro-batching of classification requests (a window of 0 disables batching)
+AI_BATCH_WINDOW_MS = int(os.getenv("AI_BATCH_WINDOW_MS", "100"))
+AI_BATCH_MAX_ITEMS = int(os.getenv("AI_BATCH_MAX_ITEMS", "10"))
@@ -0,0 +1,129 @@
+"""Deterministic natural-language due-date extraction for /task.
+
+``parse_task`` handles the common phrasings locally and reports a confidence, so the
+LLM is only consulted for input it cannot read with certainty.
+"""
+import re
+from datetime import date, timedelta
+
+
+# Full names only: abbreviations are also words or parts of words ("sun cream", "mon itor"), so they are left to the LLM.
+WEEKDAYS = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
+WEEKDAY_ABBREVIATIONS = ["mon", "tue", "tues", "wed", "thu", "thur", "thurs", "fri", "sat", "sun"]
+MONTHS = {"january": 1, "jan": 1, "february": 2, "feb": 2, "march": 3, "mar": 3, "april": 4, "apr": 4, "may": 5,
+          "june": 6, "jun": 6, "july": 7, "jul": 7, "august": 8, "aug": 8, "september": 9, "sep": 9, "sept": 9,
+          "october": 10, "oct": 10, "november": 11, "nov": 11, "december": 12, "dec": 12}
+NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+# Confidence reported for a recognised date, for input with no date at all, and for input that
+# mentions time in a way the local rules do not understand.
+CONFIDENT = 0.95
+NO_DATE = 0.9
+UNSURE = 0.3
+
+# Results at or above this confidence are used without asking the LLM.
+MIN_CONFIDENCE = 0.8
+
+_PREP = r"(?:(?:on|by|for|due|before|until|till|from)\s+)?"
+# Weekday names and bare ordinals only count as dates after one of these ("Sunday school", "25th anniversary").
+_DATE_PREP = r"(?:on|by|due|before|until|till)\s+"
+_WEEKDAY = "|".join(sorted(WEEKDAYS, key=len, reverse=True))
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+_NUMBER = r"\d+|" + "|".join(NUMBER_WORDS)
+_DAY = r"(\d{1,2})(?:st|nd|rd|th)?"
+_YEAR = r"(?:,?\s+(\d{4}))?"
+
+_RULES = [
+    ("iso", re.compile(rf"\b{_PREP}(\d{{4}})-(\d{{2}})-(\d{{2}})\b", re.I)),
+    ("day_after_tomorrow", re.compile(rf"\b{_PREP}(?:the\s+)?day\s+after\s+(?:tomorrow|tmrw)\b", re.I)),
+    ("tomorrow", re.compile(rf"\b{_PREP}(?:tomorrow|tmrw|tmr)\b", re.I)),
+    ("today", re.compile(rf"\b{_PREP}(?:today|tonight|this\s+evening)\b", re.I)),
+    ("in_days", re.compile(rf"\bin\s+({_NUMBER})\s+(days?|weeks?|fortnights?)\b", re.I)),
+    ("next_week", re.compile(rf"\b{_PREP}next\s+week\b", re.I)),
+    ("weekday", re.compile(rf"\b(?:{_DATE_PREP}(?:(this|next)\s+)?|(this|next)\s+)({_WEEKDAY})\b\.?", re.I)),
+    ("month_day", re.compile(rf"\b{_PREP}(?:the\s+)?({_MONTH})\.?\s+(?:the\s+)?{_DAY}\b{_YEAR}", re.I)),
+    ("day_month", re.compile(rf"\b{_PREP}(?:the\s+)?{_DAY}\s+(?:of\s+)?({_MONTH})\b\.?{_YEAR}", re.I)),
+    ("ordinal_day", re.compile(rf"\b{_DATE_PREP}(?:the\s+)?(\d{{1,2}})(?:st|nd|rd|th)\b", re.I)),
+]
+
+# Time references the rules above do not resolve; their presence means the LLM should decide.
+_VAGUE = re.compile(r"\b(?:end\s+of|eod|eow|eom|weekend|soon|later|asap|morning|afternoon|evening|noon|midnight|fortnight|"
+                    r"every|each|daily|weekly|monthly|month|year|quarter|" + "|".join(WEEKDAY_ABBREVIATIONS) + "|" + _WEEKDAY + "|" + _MONTH +
+                    r")\b|\b\d{1,2}(?:st|nd|rd|th)\b|\d{1,2}[/.]\d{1,2}|\d{1,2}\s*(?:am|pm)\b", re.I)
+
+_TRAILING_CONNECTOR = re.compile(r"(?:[\s,;:-]+(?:on|by|for|due|before|until|till|from|at))*[\s,;:-]*$", re.I)
+
+
+def _resolve(rule: str, match: re.Match, today: date) -> date | None:
+    if rule == "iso":
+        return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    if rule == "today":
+        return today
+    if rule == "tomorrow":
+        return today + timedelta(days=1)
+    if rule == "day_after_tomorrow":
+        return today + timedelta(days=2)
+    if rule == "in_days":
+        amount = match.group(1).lower()
+        amount = int(amount) if amount.isdigit() else NUMBER_WORDS[amount]
+        unit = match.group(2).lower()
+        return today + timedelta(days=amount * (14 if unit.startswith("fortnight") else 7 if unit.startswith("week") else 1))
+    if rule == "next_week":
+        return today + timedelta(days=7 - today.weekday())
+    if rule == "weekday":
+        qualifier, target = (match.group(1) or match.group(2) or "").lower(), WEEKDAYS[match.group(3).lower()]
+        if qualifier == "next":
+            # "next Friday" is the Friday of next week.
+            return today + timedelta(days=7 - today.weekday() + target)
+        if qualifier == "this":
+            return today + timedelta(days=(target - today.weekday()) % 7)
+        return today + timedelta(days=(target - today.weekday() - 1) % 7 + 1)
+    if rule in ("month_day", "day_month"):
+        month_name, day = (match.group(1), match.group(2)) if rule == "month_day" else (match.group(2), match.group(1))
+        month, day, year = MONTHS[month_name.lower()], int(day), match.group(3)
+        if year: return date(int(year), month, day)
+        candidate = date(today.year, month, day)
+        return candidate if candidate >= today else date(today.year + 1, month, day)
+    if rule == "ordinal_day":
+        # "on the 5th" is the next 5th: this month's, or next month's once it has passed.
+        day = int(match.group(1))
+        if day >= today.day: return today.replace(day=day)
+        return date(today.year + today.month // 12, today.month % 12 + 1, day)
+    return None
+
+
+def parse_task(text: str, today: date) -> tuple[dict, float]:
+    """Splits a task description into {"task_name", "due_date"} and a confidence in [0, 1]."""
+    for rule, pattern in _RULES:
+        match = pattern.search(text)
+        if not match: continue
+        try:
+            due = _resolve(rule, match, today)
+        except ValueError:
+            return {"task_name": text.strip(), "due_date": None}, UNSURE
+        remainder = (text[:match.start()] + " " + text[match.end():]).strip()
+        task_name = _TRAILING_CONNECTOR.sub("", " ".join(remainder.split()))
+        confidence = CONFIDENT if task_name and not _VAGUE.search(remainder) else UNSURE
+        return {"task_name": task_name or text.strip(), "due_date": due.isoformat()}, confidence
+    task_name = " ".join(text.split())
+    return {"task_name": task_name, "due_date": None}, UNSURE if _VAGUE.search(text) else NO_DATE
+
+
+# --- Prompt Examples ---
+# Inputs shown to the model as worked examples (each is also in the test corpus); their answers are rendered by parse_task.
+PROMPT_EXAMPLES = [
+    "Call the plumber tomorrow",
+    "Finish the report by Friday",
+    "Buy groceries",
+    "Schedule meeting for September 5th",
+]
+
+
+def prompt_examples(today: date) -> str:
+    """Renders the prompt's example lines for ``today`` using the local parser."""
+    lines = []
+    for text in PROMPT_EXAMPLES:
+        details, _ = parse_task(text, today)
+        due = f'"{details["due_date"]}"' if details["due_date"] else "null"
+        lines.append(f'- "{text}" -> {{"task_name": "{details["task_name"]}", "due_date": {due}}}')
+    return "\n".join(lines)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from telegram.error import RetryAfter
+
+import metrics
+import notion_handler
+from write_queue import TokenBucket
+
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Shares one in-flight computation per key among concurrent callers and reuses its result for ``ttl`` seconds."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._results: dict[str, tuple[float, Any]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        cached = self._results.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl: return cached[1]
+        if key in self._inflight: return await asyncio.shield(self._inflight[key])
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await factory()
+            now = time.monotonic()
+            self._results = {k: v for k, v in self._results.items() if now - v[0] < self.ttl}
+            self._results[key] = (now, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        finally:
+            del self._inflight[key]
+
+
+class DigestService:
+    """Computes dashboard data once per workspace and window, and rate-limits outgoing messages."""
+
+    def __init__(self, window_seconds: float = 60.0, send_rate: float = 25.0):
+        self._flight = SingleFlight(window_seconds)
+        self._send_bucket = TokenBucket(send_rate, send_rate)
+
+    async def get_summary(self) -> dict:
+        today = datetime.now(timezone.utc).date().isoformat()
+        return await self._flight.do(f"summary:{today}", notion_handler.get_daily_summary)
+
+    async def get_tasks_due_today(self) -> list[str] | None:
+        today = datetime.now(timezone.utc).date().isoformat()
+        return await self._flight.do(f"tasks:{today}", notion_handler.get_tasks_due_today)
+
+    async def send(self, bot, chat_id: int, text: str, **kwargs) -> None:
+        """Sends a message through the rate limiter, waiting out one flood-control response."""
+        await self._send_bucket.acquire()
+        try:
+            await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+            logger.warning(f"Telegram flood control for chat {chat_id}, retrying in {retry_after}s")
+            metrics.registry.retry("telegram", "sendMessage")
+            await asyncio.sleep(retry_after)
+            await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+
+
+# --- Rendering ---
+def render_focus(tasks_today: list[str] | None) -> str:
+    focus_message = "🎯 **Today's Focus**\n\n"
+    if tasks_today:
+        focus_message += "\n".join([f"- {task}" for task in tasks_today])
+    else:
+        focus_message += "No tasks due today. Great job!"
+    return focus_message
+
+
+def render_digest(summary: dict, heading: str = "🗓️ **Daily Digest**") -> str:
+    digest_message = f"{heading}\n\nHere's what you've added today:\n"
+    total_added = 0
+    for category, count in summary.items():
+        if count > 0:
+            digest_message += f"\n- **{category}:** {count} new item(s)"
+            total_added += count
+    if total_added == 0:
+        digest_message += "\nNo new items were added today."
+    return digest_message
@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+async def first_hit(coros: list[Awaitable[T | None]]) -> T | None:
+    """Runs the coroutines concurrently and returns the first non-None result in priority order.
+
+    A result is returned as soon as every higher-priority coroutine has finished without a hit,
+    and the remaining in-flight coroutines are cancelled. Exceptions count as a miss.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        pending = set(tasks)
+        next_index = 0
+        while pending:
+            _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            while next_index < len(tasks) and tasks[next_index].done():
+                task = tasks[next_index]
+                if not task.cancelled() and task.exception() is None and task.result() is not None:
+                    return task.result()
+                if not task.cancelled() and task.exception() is not None:
+                    logger.warning(f"Fan-out branch {next_index} failed: {task.exception()}")
+                next_index += 1
+        return None
+    finally:
+        for task in tasks:
+            if not task.done(): task.cancel()
+
+
+async def fan_out(coros: dict[str, Awaitable[Any]]) -> dict[str, Any]:
+    """Runs keyed coroutines concurrently. Failed branches are logged and left out of the result."""
+    keys = list(coros)
+    results = await asyncio.gather(*coros.values(), return_exceptions=True)
+    collected = {}
+    for key, result in zip(keys, results):
+        if isinstance(result, BaseException):
+            logger.warning(f"Fan-out branch {key} failed: {result}")
+        else:
+            collected[key] = result
+    return collected
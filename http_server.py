@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Awaitable, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+
+logger = logging.getLogger(__name__)
+
+# Requests with larger bodies are refused.
+MAX_BODY_BYTES = 10 * 1024 * 1024
+# A connection is closed when the next request hasn't fully arrived within this many seconds.
+READ_TIMEOUT_SECONDS = 30.0
+# Connections beyond this many are turned away with a 503.
+MAX_CONNECTIONS = 100
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict[str, str]
+    headers: dict[str, str]  # lower-case names
+    body: bytes
+
+    def json(self):
+        return json.loads(self.body or b"null")
+
+
+@dataclass
+class Response:
+    status: int = 200
+    body: bytes = b""
+    headers: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def json(cls, data, status: int = 200, headers: dict[str, str] | None = None) -> "Response":
+        return cls(status, json.dumps(data).encode(), {"Content-Type": "application/json", **(headers or {})})
+
+    @classmethod
+    def text(cls, text: str, status: int = 200, content_type: str = "text/plain; charset=utf-8") -> "Response":
+        return cls(status, text.encode(), {"Content-Type": content_type})
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Request | None:
+    request_line = await reader.readline()
+    if not request_line.strip(): return None
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY_BYTES: raise ValueError(f"request body of {length} bytes is too large")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    return Request(method.upper(), url.path, dict(parse_qsl(url.query)), headers, body)
+
+
+def _encode_response(response: Response, keep_alive: bool) -> bytes:
+    reason = HTTPStatus(response.status).phrase if response.status in HTTPStatus._value2member_map_ else ""
+    headers = {"Content-Length": str(len(response.body)), "Connection": "keep-alive" if keep_alive else "close", **response.headers}
+    head = f"HTTP/1.1 {response.status} {reason}\r\n" + "".join(f"{name}: {value}\r\n" for name, value in headers.items()) + "\r\n"
+    return head.encode("latin-1") + response.body
+
+
+async def serve(handler: Handler, host: str = "127.0.0.1", port: int = 0, read_timeout: float = READ_TIMEOUT_SECONDS,
+                max_connections: int = MAX_CONNECTIONS) -> asyncio.Server:
+    """Starts a minimal HTTP/1.1 server (keep-alive, Content-Length bodies) on the running loop.
+
+    Each request is passed to ``handler``; an exception in it becomes a 500. A connection is
+    closed once it has been idle (or slow to send a request) for ``read_timeout`` seconds, and at
+    most ``max_connections`` are served at once. Port 0 picks a free port, readable from
+    ``server.sockets[0].getsockname()[1]``.
+    """
+    connections = 0
+
+    async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        nonlocal connections
+        if connections >= max_connections:
+            writer.write(_encode_response(Response.text("Service Unavailable", status=503), keep_alive=False))
+            writer.close()
+            return
+        connections += 1
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), read_timeout)
+                except asyncio.TimeoutError:
+                    break
+                except (ValueError, asyncio.IncompleteReadError) as e:
+                    writer.write(_encode_response(Response.text(str(e), status=400), keep_alive=False))
+                    break
+                if request is None: break
+                try:
+                    response = await handler(request)
+                except Exception as e:
+                    logger.error(f"Error handling {request.method} {request.path}: {e}")
+                    response = Response.text("Internal Server Error", status=500)
+                keep_alive = request.headers.get("connection", "").lower() != "close"
+                writer.write(_encode_response(response, keep_alive))
+                await writer.drain()
+                if not keep_alive: break
+        except ConnectionError:
+            pass
+        finally:
+            connections -= 1
+            writer.close()
+
+    return await asyncio.start_server(on_connection, host, port)
@@ -0,0 +1,260 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterator
+
+from telegram.error import TelegramError
+
+import ai_handler
+import notion_handler
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS imports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    file_id TEXT NOT NULL,
+    file_unique_id TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    message_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'running',
+    records_done INTEGER NOT NULL DEFAULT 0,
+    imported INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS imports_file ON imports (chat_id, file_unique_id, status);
+"""
+
+SUPPORTED_EXTENSIONS = (".md", ".markdown", ".txt", ".csv", ".jsonl", ".ndjson")
+# Record fields tried, in order, for the text of a CSV row or JSONL object.
+TEXT_FIELDS = ("text", "content", "note", "body", "title", "name")
+# Longer records are cut to this many characters before classification.
+MAX_RECORD_CHARS = 2000
+
+_BULLET = re.compile(r"^\s*(?:[-*+]\s+(?:\[[ xX]\]\s+)?|\d+[.)]\s+)")
+_HEADING = re.compile(r"^\s*#{1,6}\s+(.*)")
+
+
+def is_supported(file_name: str | None) -> bool:
+    return bool(file_name) and file_name.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+# --- Record Readers ---
+def _lines(path: str, progress: list[int]) -> Iterator[str]:
+    """Decoded lines of a file, read one at a time; ``progress[0]`` tracks the bytes consumed."""
+    with open(path, "rb") as f:
+        for raw in f:
+            progress[0] += len(raw)
+            yield raw.decode("utf-8", errors="replace")
+
+
+def _record_text(record) -> str:
+    if isinstance(record, str): return record
+    if isinstance(record, dict):
+        fields = {str(key).lower(): value for key, value in record.items()}
+        for name in TEXT_FIELDS:
+            if fields.get(name): return str(fields[name])
+        return " ".join(str(value) for value in record.values() if value)
+    return ""
+
+
+def iter_records(path: str, file_name: str, progress: list[int]) -> Iterator[str]:
+    """Streams the records of a Markdown/text, CSV or JSONL file as plain strings.
+
+    Markdown yields one record per non-empty line outside code fences, without list markers;
+    a heading is prefixed to the lines under it. CSV and JSONL yield one record per row/object.
+    """
+    name = file_name.lower()
+    if name.endswith(".csv"):
+        for row in csv.DictReader(_lines(path, progress)):
+            text = _record_text(row).strip()
+            if text: yield text[:MAX_RECORD_CHARS]
+    elif name.endswith((".jsonl", ".ndjson")):
+        for line in _lines(path, progress):
+            if not line.strip(): continue
+            try:
+                text = _record_text(json.loads(line)).strip()
+            except ValueError:
+                logger.warning(f"Skipping malformed JSONL line in {file_name}")
+                continue
+            if text: yield text[:MAX_RECORD_CHARS]
+    else:
+        heading, in_fence = None, False
+        for line in _lines(path, progress):
+            if line.lstrip().startswith("```"):
+                in_fence = not in_fence
+                continue
+            if in_fence or not line.strip(): continue
+            if match := _HEADING.match(line):
+                heading = match.group(1).strip()
+                continue
+            text = _BULLET.sub("", line).strip()
+            if text: yield (f"{heading}: {text}" if heading else text)[:MAX_RECORD_CHARS]
+
+
+# --- Journal ---
+class ImportJournal:
+    """SQLite checkpoints of imports, so an interrupted or failed import resumes where it stopped."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def start(self, chat_id: int, file_id: str, file_unique_id: str, file_name: str, message_id: int) -> dict:
+        """Returns the unfinished (running or failed) import of this file in this chat, now running and
+        reporting to ``message_id``, or a new one."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id FROM imports WHERE chat_id = ? AND file_unique_id = ? AND status IN ('running', 'failed') ORDER BY id DESC LIMIT 1",
+                                     (chat_id, file_unique_id)).fetchone()
+            if row:
+                self._conn.execute("UPDATE imports SET file_id = ?, message_id = ?, status = 'running', updated_at = ? WHERE id = ?", (file_id, message_id, now, row["id"]))
+                import_id = row["id"]
+            else:
+                import_id = self._conn.execute("INSERT INTO imports (chat_id, file_id, file_unique_id, file_name, message_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                               (chat_id, file_id, file_unique_id, file_name, message_id, now, now)).lastrowid
+            return dict(self._conn.execute("SELECT * FROM imports WHERE id = ?", (import_id,)).fetchone())
+
+    def checkpoint(self, import_id: int, records_done: int, imported: int, failed: int, status: str = "running") -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE imports SET records_done = ?, imported = ?, failed = ?, status = ?, updated_at = ? WHERE id = ?",
+                               (records_done, imported, failed, status, time.time(), import_id))
+
+    def set_status(self, import_id: int, status: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE imports SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), import_id))
+
+    def unfinished(self) -> list[dict]:
+        with self._lock:
+            return [dict(row) for row in self._conn.execute("SELECT * FROM imports WHERE status = 'running' ORDER BY id")]
+
+
+# --- Importer ---
+class Importer:
+    """Streams uploaded documents into Notion: records are read lazily, classified (micro-batched by
+    ``ai_handler``) and written through the rate-limited write queue by ``concurrency`` workers.
+
+    Progress is checkpointed as the count of leading records that are finished, together with their
+    added/failed counts, so a resumed import may repeat the few records that were in flight (or
+    finished out of order) when it stopped, but counts each record once.
+    """
+
+    def __init__(self, directory: str, concurrency: int = 8, progress_seconds: float = 3.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.concurrency = concurrency
+        self.progress_seconds = progress_seconds
+        self.journal = ImportJournal(os.path.join(directory, "imports.db"))
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    def _path(self, job: dict) -> str:
+        return os.path.join(self.directory, f"{job['chat_id']}-{job['file_unique_id']}{os.path.splitext(job['file_name'])[1].lower()}")
+
+    def start(self, bot, job: dict) -> bool:
+        """Runs the import in the background; False if this import is already running."""
+        if job["id"] in self._tasks: return False
+        task = asyncio.create_task(self._run(bot, job), name=f"import-{job['id']}")
+        self._tasks[job["id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["id"], None))
+        return True
+
+    def resume(self, bot) -> int:
+        """Restarts imports that were interrupted by a shutdown; returns how many."""
+        jobs = self.journal.unfinished()
+        for job in jobs: self.start(bot, job)
+        return len(jobs)
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks: task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _report(self, bot, job: dict, text: str) -> None:
+        try:
+            await bot.edit_message_text(chat_id=job["chat_id"], message_id=job["message_id"], text=text)
+        except TelegramError as e:
+            logger.debug(f"Couldn't update progress of import {job['id']}: {e}")
+
+    async def _import_record(self, text: str) -> bool:
+        ai_result = await ai_handler.process_text_with_ai(text)
+        if not ai_result: return False
+        return bool(await notion_handler.add_item_to_database(ai_result))
+
+    async def _run(self, bot, job: dict) -> None:
+        try:
+            await self._import(bot, job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Import {job['id']} of {job['file_name']} failed: {e}")
+            self.journal.set_status(job["id"], "failed")
+            # Sending the file again downloads it afresh and resumes from the checkpoint.
+            for path in (self._path(job), self._path(job) + ".part"):
+                if os.path.exists(path): os.remove(path)
+            await self._report(bot, job, f"❌ Import of {job['file_name']} stopped: {e}\nSend the file again to resume.")
+
+    async def _import(self, bot, job: dict) -> None:
+        path = self._path(job)
+        if not os.path.exists(path):
+            file = await bot.get_file(job["file_id"])
+            await file.download_to_drive(path + ".part")
+            os.replace(path + ".part", path)
+        size = os.path.getsize(path) or 1
+        progress = [0]
+        # Outcomes of records finished ahead of the watermark; they are counted once it passes them.
+        watermark, finished = job["records_done"], {}
+        counts = {"imported": job["imported"], "failed": job["failed"]}
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def worker() -> None:
+            nonlocal watermark
+            while (item := await queue.get()) is not None:
+                index, text = item
+                try:
+                    ok = await self._import_record(text)
+                except Exception as e:
+                    logger.warning(f"Import {job['id']} record {index} failed: {e}")
+                    ok = False
+                finished[index] = ok
+                while watermark in finished:
+                    counts["imported" if finished.pop(watermark) else "failed"] += 1
+                    watermark += 1
+
+        async def reporter() -> None:
+            while True:
+                await asyncio.sleep(self.progress_seconds)
+                self.journal.checkpoint(job["id"], watermark, counts["imported"], counts["failed"])
+                await self._report(bot, job, f"📥 Importing {job['file_name']}... {min(100, progress[0] * 100 // size)}%\n"
+                                             f"Added: {counts['imported']}, failed: {counts['failed']}")
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        progress_task = asyncio.create_task(reporter())
+        try:
+            for index, text in enumerate(iter_records(path, job["file_name"], progress)):
+                if index < job["records_done"]: continue
+                await queue.put((index, text))
+            for _ in workers: await queue.put(None)
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers: task.cancel()
+            self.journal.checkpoint(job["id"], watermark, counts["imported"], counts["failed"])
+            raise
+        finally:
+            progress_task.cancel()
+        self.journal.checkpoint(job["id"], watermark, counts["imported"], counts["failed"], status="done")
+        os.remove(path)
+        logger.info(f"Import {job['id']} of {job['file_name']} finished: {counts['imported']} added, {counts['failed']} failed.")
+        await self._report(bot, job, f"✅ Imported {job['file_name']}\nAdded: {counts['imported']}, failed: {counts['failed']}")
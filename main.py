@@ -1,14 +1,27 @@
+import asyncio
+import html
 import logging
+import sys
 import config
+import importer
 import ai_handler
+import metrics
+import notion_client
 import notion_handler
+import webhook
+from ai_cache import AICache
+from digest import DigestService, render_digest, render_focus
+from outbox import Outbox
+from pending import PendingActions
+from scheduler import ChatOrderedUpdateProcessor
+from unfurl import Unfurler
 from datetime import time, timezone, datetime
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
 )
-from telegram.constants import ChatAction
+from telegram.error import RetryAfter, TelegramError
 
 # --- Basic Setup ---
 logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
@@ -16,50 +29,47 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 
+# --- Pending Confirmations ---
+# Data behind inline-keyboard confirmations; buttons carry "<choice>:<action id>" as callback_data.
+pending_actions = PendingActions(config.PENDING_ACTIONS_PATH or None, ttl_seconds=config.PENDING_ACTION_TTL_SECONDS, max_entries=config.PENDING_ACTIONS_MAX)
+
 # --- Daily Digest & Today's Focus Logic ---
+digest_service = DigestService(window_seconds=config.DIGEST_WINDOW_SECONDS, send_rate=config.TELEGRAM_SEND_RATE)
+
 async def send_today_dashboard(bot, chat_id: int):
     """Fetches and sends the full 'Today' dashboard."""
     logger.info(f"Running Today Dashboard for chat_id: {chat_id}")
-    
+
     # Part 1: Today's Focus (Tasks due today)
-    tasks_today = notion_handler.get_tasks_due_today()
-    focus_message = "🎯 **Today's Focus**\n\n"
-    if tasks_today:
-        focus_message += "\n".join([f"- {task}" for task in tasks_today])
-    else:
-        focus_message += "No tasks due today. Great job!"
-        
-    await bot.send_message(chat_id=chat_id, text=focus_message, parse_mode='Markdown')
+    tasks_today = await digest_service.get_tasks_due_today()
+    await digest_service.send(bot, chat_id, render_focus(tasks_today), parse_mode='Markdown')
 
     # Part 2: Daily Digest (Summary of items added today)
-    summary = notion_handler.get_daily_summary()
-    digest_message = "\n\n🗓️ **Daily Digest**\n\nHere's what you've added today:\n"
-    total_added = 0
-    for category, count in summary.items():
-        if count > 0:
-            digest_message += f"\n- **{category}:** {count} new item(s)"
-            total_added += count
-    if total_added == 0:
-        digest_message += "\nNo new items were added today."
-        
-    await bot.send_message(chat_id=chat_id, text=digest_message, parse_mode='Markdown')
+    summary = await digest_service.get_summary()
+    await digest_service.send(bot, chat_id, render_digest(summary), parse_mode='Markdown')
 
 # --- Job Callback for Daily Digest ---
 async def daily_digest_job_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Scheduled job callback. We'll just send the digest part."""
-    chat_id = context.job.chat_id
-    summary = notion_handler.get_daily_summary()
-    digest_message = "🗓️ **Your Daily Digest**\n\nHere's what you've added today:\n"
-    total_added = 0
-    for category, count in summary.items():
-        if count > 0:
-            digest_message += f"\n- **{category}:** {count} new item(s)"
-            total_added += count
-    if total_added == 0:
-        digest_message += "\nNo new items were added today."
-    await context.bot.send_message(chat_id=chat_id, text=digest_message, parse_mode='Markdown')
+    """Scheduled job callback. We'll just send the digest part.
+
+    Every chat's job fires at the same moment; the summary is computed once and shared,
+    and sends are staggered by the digest service's rate limiter.
+    """
+    summary = await digest_service.get_summary()
+    await digest_service.send(context.bot, context.job.chat_id, render_digest(summary, heading="🗓️ **Your Daily Digest**"), parse_mode='Markdown')
+
+# --- Job Callback for Local Indexes ---
+async def index_sync_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Keeps the local title and search indexes current; the first run does a full crawl."""
+    await notion_handler.sync_title_index()
+    await notion_handler.sync_search_index()
+
+async def index_reconcile_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Drops pages archived or deleted in Notion from the local indexes."""
+    await notion_handler.reconcile_indexes()
 
 # --- Command Handlers ---
+@metrics.traced("handler")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     # ... (unchanged)
     user = update.effective_user
@@ -75,6 +85,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_text("I've scheduled a daily summary for you every evening at 7 PM!")
     await update.message.reply_html(f"Hi {user.first_name}! Let's organize your thoughts.")
 
+@metrics.traced("handler")
 async def today_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Manually triggers the full 'Today' dashboard."""
     await update.message.reply_text("Fetching your dashboard for today...")
@@ -82,41 +93,47 @@ async def today_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
 
 # ... (other command handlers are unchanged)
+@metrics.traced("handler")
 async def task_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     task_description = " ".join(context.args)
     if not task_description: await update.message.reply_text("Usage: /task <your task>"); return
     await update.message.reply_text("Analyzing your task...")
-    task_details = ai_handler.extract_task_details(task_description)
+    task_details = await ai_handler.extract_task_details(task_description)
     if task_details:
-        notion_page_url = notion_handler.add_task(task_details)
+        notion_page_url = await notion_handler.add_task(task_details)
         if notion_page_url: await update.message.reply_html(f"✅ Task added: <a href='{notion_page_url}'>{task_details['task_name']}</a>")
         else: await update.message.reply_text("❌ Couldn't add task.")
     else: await update.message.reply_text("Sorry, I had trouble understanding that task.")
+@metrics.traced("handler")
 async def archive_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
         title_to_archive = " ".join(context.args)
         if not title_to_archive: await update.message.reply_text("Usage: /archive <exact page title>"); return
         await update.message.reply_text(f"Searching for '{title_to_archive}'...")
-        page_data = notion_handler.search_databases_for_exact_title(title_to_archive)
+        page_data = await notion_handler.search_databases_for_exact_title(title_to_archive, match="casefold")
         if page_data:
-            context.user_data['archive_data'] = page_data
-            keyboard = [[InlineKeyboardButton("✅ Yes, archive it", callback_data='archive_confirm'), InlineKeyboardButton("❌ Cancel", callback_data='archive_cancel')]]
+            action_id = pending_actions.put(update.effective_user.id, "archive", page_data)
+            keyboard = [[InlineKeyboardButton("✅ Yes, archive it", callback_data=f'archive_confirm:{action_id}'), InlineKeyboardButton("❌ Cancel", callback_data=f'archive_cancel:{action_id}')]]
             await update.message.reply_text(f"Found: <b>{title_to_archive}</b>\n\nMove it to the archive?", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='HTML')
         else: await update.message.reply_text(f"Sorry, couldn't find a page with that exact title.")
     except (IndexError, ValueError): await update.message.reply_text("Usage: /archive <exact page title>")
+@metrics.traced("handler")
 async def find_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
         query = " ".join(context.args)
-        if not query: await update.message.reply_text("Usage: /find <keyword>"); return
+        if not query: await update.message.reply_text("Usage: /find <keyword> [#tag] [in:category]"); return
         await update.message.reply_text(f"Searching your workspace for '{query}'...")
-        results = notion_handler.search_workspace(query)
+        # One extra result tells us whether there are more than we show.
+        results = await notion_handler.find_pages(query, limit=11)
         if results:
-            message = f"🔎 Found {len(results)} page(s) matching '<b>{query}</b>':\n\n" + "\n".join([f"• <a href='{page['url']}'>{page['title']}</a>" for page in results[:10]])
+            found = f"{len(results)}" if len(results) <= 10 else "10+"
+            message = f"🔎 Found {found} page(s) matching '<b>{query}</b>':\n\n" + "\n".join([f"• <a href='{page['url']}'>{page['title']}</a>" for page in results[:10]])
             await update.message.reply_html(message, disable_web_page_preview=True)
         else: await update.message.reply_text(f"No results found for '{query}'.")
     except Exception as e:
         logger.error(f"Error in find_command: {e}")
         await update.message.reply_text("An error occurred while searching.")
+@metrics.traced("handler")
 async def add_to_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
         full_args = " ".join(context.args)
@@ -125,9 +142,10 @@ async def add_to_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         title_to_find, note_to_add = parts[0].strip(), parts[1].strip()
         if not title_to_find or not note_to_add: await update.message.reply_text("Both a title and a note are required."); return
         await update.message.reply_text(f"Searching for '{title_to_find}'...")
-        page_data = notion_handler.search_databases_for_exact_title(title_to_find)
+        page_data = await notion_handler.search_databases_for_exact_title(title_to_find, match="casefold")
         if page_data:
-            success = notion_handler.add_note_to_page(page_data.get("page_id"), note_to_add)
+            # Optimistic: the append is queued (and coalesced with other notes to the same page) in the background.
+            success = await notion_handler.add_note_to_page(page_data.get("page_id"), note_to_add, wait=False)
             if success: await update.message.reply_html(f"✅ Note added to <a href='{page_data.get('url')}'>{title_to_find}</a>")
             else: await update.message.reply_text("❌ Couldn't add your note.")
         else: await update.message.reply_text(f"Sorry, couldn't find a page with the exact title '{title_to_find}'.")
@@ -135,94 +153,251 @@ async def add_to_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         logger.error(f"Error in add_to_command: {e}")
         await update.message.reply_text("An error occurred.")
 
+# --- Capture Outbox ---
+outbox = Outbox(config.OUTBOX_PATH, max_attempts=config.OUTBOX_MAX_ATTEMPTS)
+
+unfurler = Unfurler(AICache(config.LINK_DB_PATH, ttl_seconds=config.UNFURL_CACHE_TTL_SECONDS), timeout=config.UNFURL_TIMEOUT,
+                    max_bytes=config.UNFURL_MAX_BYTES, per_host=config.UNFURL_PER_HOST, allowed_hosts=config.UNFURL_ALLOWED_HOSTS)
+
+CAPTURE_FAILURE_MESSAGES = {
+    "text": "❌ Sorry, I couldn't add this to Notion.",
+    "link": "❌ Couldn't save link.",
+    "media": "❌ Error processing file.",
+}
+
+async def _capture(update: Update, kind: str, payload: dict) -> None:
+    """Journals a capture, acknowledges it right away and leaves the rest to the outbox workers."""
+    capture_id = outbox.append(kind, payload, update.effective_chat.id, update.effective_user.id if update.effective_user else None)
+    reply = await update.message.reply_text("📥 Captured! Saving to Notion...")
+    outbox.set_reply(capture_id, reply.message_id)
+
+async def _edit_capture_reply(bot, item: dict, text: str, **kwargs) -> None:
+    """Replaces the acknowledgement with the final result (or sends it if there was no acknowledgement)."""
+    try:
+        if item["reply_message_id"]:
+            await bot.edit_message_text(chat_id=item["chat_id"], message_id=item["reply_message_id"], text=text, parse_mode='HTML', disable_web_page_preview=True, **kwargs)
+        else:
+            await bot.send_message(chat_id=item["chat_id"], text=text, parse_mode='HTML', disable_web_page_preview=True, **kwargs)
+    except TelegramError as e:
+        # The Notion side already succeeded, so this must not make the capture retry.
+        logger.warning(f"Couldn't update reply for capture {item['id']}: {e}")
+
+async def process_capture(application: Application, item: dict) -> None:
+    """Classifies and saves one journaled capture. Raising makes the outbox retry it later."""
+    bot, payload = application.bot, item["payload"]
+    if item["kind"] == "text":
+        ai_result = await ai_handler.process_text_with_ai(payload["text"])
+        if not ai_result: raise RuntimeError("AI classification failed")
+        if ai_result.get("category") == "Projects" and ai_result.get("complexity") == "complex":
+            action_id = pending_actions.put(item["user_id"], "project", {"project": ai_result})
+            keyboard = [[InlineKeyboardButton("✅ Yes, break it down", callback_data=f'breakdown_yes:{action_id}'), InlineKeyboardButton("❌ No, thanks", callback_data=f'breakdown_no:{action_id}')]]
+            await _edit_capture_reply(bot, item, f"Complex project detected: <b>'{html.escape(ai_result['title'])}'</b>.\nBreak it down?", reply_markup=InlineKeyboardMarkup(keyboard))
+            return
+        notion_page_url = await notion_handler.add_item_to_database(ai_result)
+        if not notion_page_url: raise RuntimeError("Notion write failed")
+        await _edit_capture_reply(bot, item, f"✅ Added to <b>{html.escape(str(ai_result.get('category')))}</b>: <a href='{notion_page_url}'>{html.escape(str(ai_result.get('title')))}</a>")
+    elif item["kind"] == "link":
+        url = payload["url"]
+        preview = await unfurler.unfurl(url)
+        notion_page_url, duplicate = await notion_handler.add_link_to_resources(url, preview)
+        if not notion_page_url: raise RuntimeError("Notion write failed")
+        title = html.escape((preview or {}).get("title") or url)
+        if duplicate: await _edit_capture_reply(bot, item, f"🔁 Already saved: <a href='{notion_page_url}'>{title}</a>")
+        else: await _edit_capture_reply(bot, item, f"✅ Saved link: <a href='{notion_page_url}'>{title}</a>")
+    elif item["kind"] == "media":
+        media_type, caption = payload["media_type"], payload["caption"]
+        file = await bot.get_file(payload["file_id"])
+        notion_page_url = await notion_handler.add_content_to_resources(title=caption, content_url=file.file_path, content_type=media_type.lower())
+        if not notion_page_url: raise RuntimeError("Notion write failed")
+        await _edit_capture_reply(bot, item, f"✅ Saved {media_type}: <a href='{notion_page_url}'>{html.escape(caption)}</a>")
+    else:
+        logger.error(f"Dropping capture {item['id']} of unknown kind {item['kind']}")
+
+async def capture_failed(application: Application, item: dict, error: str) -> None:
+    await _edit_capture_reply(application.bot, item, CAPTURE_FAILURE_MESSAGES.get(item["kind"], "❌ Something went wrong."))
+
 # --- Message Handlers ---
+@metrics.traced("handler")
 async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    # ... (unchanged)
-    user_text = update.message.text
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
-    ai_result = ai_handler.process_text_with_ai(user_text)
-    if not ai_result:
-        await update.message.reply_text("Sorry, I had trouble understanding that.")
-        return
-    if ai_result.get("category") == "Projects" and ai_handler.is_project_complex(ai_result.get("title")):
-        context.user_data['project_data'] = ai_result
-        keyboard = [[InlineKeyboardButton("✅ Yes, break it down", callback_data='breakdown_yes'), InlineKeyboardButton("❌ No, thanks", callback_data='breakdown_no')]]
-        await update.message.reply_text(f"Complex project detected: <b>'{ai_result['title']}'</b>.\nBreak it down?", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='HTML')
-    else:
-        notion_page_url = notion_handler.add_item_to_database(ai_result)
-        if notion_page_url:
-            await update.message.reply_html(f"✅ Added to <b>{ai_result.get('category')}</b>: <a href='{notion_page_url}'>{ai_result.get('title')}</a>", disable_web_page_preview=True)
-        else:
-            await update.message.reply_text("❌ Sorry, I couldn't add this to Notion.")
+    await _capture(update, "text", {"text": update.message.text})
 
 # --- Callback Query Handler ---
+@metrics.traced("handler")
 async def button_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    # ... (unchanged)
     query = update.callback_query
     await query.answer()
-    choice = query.data
+    choice, _, action_id = query.data.partition(":")
+    user_id = update.effective_user.id
     if choice.startswith('archive_'):
-        archive_data = context.user_data.get('archive_data')
+        archive_data = pending_actions.pop(action_id, user_id, "archive")
         if not archive_data: await query.edit_message_text("Error. Try /archive again."); return
         if choice == 'archive_confirm':
-            success = notion_handler.move_page_to_archive(archive_data)
+            success = await notion_handler.move_page_to_archive(archive_data)
             await query.edit_message_text("✅ Moved to Archive." if success else "❌ Failed to move page.")
         else: await query.edit_message_text("Archive cancelled.")
         return
-    ai_data = context.user_data.get('project_data')
-    if not ai_data: await query.edit_message_text("Error. Please send the project again."); return
+    # Breaking down keeps the action for the approve/cancel buttons that follow; every other choice finishes it.
+    project = pending_actions.get(action_id, user_id, "project") if choice == 'breakdown_yes' else pending_actions.pop(action_id, user_id, "project")
+    if not project: await query.edit_message_text("Error. Please send the project again."); return
+    ai_data = project["project"]
     if choice == 'breakdown_yes':
         await query.edit_message_text(f"Breaking down '{ai_data['title']}'...")
-        tasks = ai_handler.break_down_project(ai_data['title'])
+        tasks = await _stream_breakdown(query, ai_data['title'])
         if tasks:
-            context.user_data['project_tasks'] = tasks
-            task_list_str = "\n".join([f"• {task}" for task in tasks])
-            keyboard = [[InlineKeyboardButton("👍 Add them", callback_data='approve_tasks'), InlineKeyboardButton("👎 Add without tasks", callback_data='cancel_tasks')]]
-            await query.edit_message_text(f"Sub-tasks for <b>'{ai_data['title']}'</b>:\n\n{task_list_str}\n\nAdd them?", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='HTML')
+            pending_actions.update(action_id, {**project, "tasks": tasks})
+            task_list_str = "\n".join(f"• {html.escape(task)}" for task in tasks)
+            keyboard = [[InlineKeyboardButton("👍 Add them", callback_data=f'approve_tasks:{action_id}'), InlineKeyboardButton("👎 Add without tasks", callback_data=f'cancel_tasks:{action_id}')]]
+            await query.edit_message_text(f"Sub-tasks for <b>'{html.escape(ai_data['title'])}'</b>:\n\n{task_list_str}\n\nAdd them?", reply_markup=InlineKeyboardMarkup(keyboard), parse_mode='HTML')
         else:
+            pending_actions.pop(action_id, user_id, "project")
             await query.edit_message_text("Couldn't break it down. Adding project without tasks.")
-            notion_page_url = notion_handler.add_item_to_database(ai_data)
-            if notion_page_url: await query.edit_message_text(f"✅ Project added!\n<a href='{notion_page_url}'>{ai_data['title']}</a>", parse_mode='HTML', disable_web_page_preview=True)
+            notion_page_url = await notion_handler.add_item_to_database(ai_data)
+            if notion_page_url: await query.edit_message_text(f"✅ Project added!\n<a href='{notion_page_url}'>{html.escape(ai_data['title'])}</a>", parse_mode='HTML', disable_web_page_preview=True)
             else: await query.edit_message_text("❌ Couldn't add project.")
     elif choice in ['breakdown_no', 'cancel_tasks']:
         await query.edit_message_text(f"Okay, adding '{ai_data['title']}'...")
-        notion_page_url = notion_handler.add_item_to_database(ai_data)
-        if notion_page_url: await query.edit_message_text(f"✅ Project added!\n<a href='{notion_page_url}'>{ai_data['title']}</a>", parse_mode='HTML', disable_web_page_preview=True)
+        notion_page_url = await notion_handler.add_item_to_database(ai_data)
+        if notion_page_url: await query.edit_message_text(f"✅ Project added!\n<a href='{notion_page_url}'>{html.escape(ai_data['title'])}</a>", parse_mode='HTML', disable_web_page_preview=True)
         else: await query.edit_message_text("❌ Couldn't add project.")
     elif choice == 'approve_tasks':
-        tasks = context.user_data.get('project_tasks')
+        tasks = project.get("tasks")
         await query.edit_message_text("Adding project and tasks...")
-        notion_page_url = notion_handler.add_project_with_tasks(ai_data, tasks)
-        if notion_page_url: await query.edit_message_text(f"✅ Project and tasks added!\n<a href='{notion_page_url}'>{ai_data['title']}</a>", parse_mode='HTML', disable_web_page_preview=True)
+        notion_page_url = await notion_handler.add_project_with_tasks(ai_data, tasks)
+        if notion_page_url: await query.edit_message_text(f"✅ Project and tasks added!\n<a href='{notion_page_url}'>{html.escape(ai_data['title'])}</a>", parse_mode='HTML', disable_web_page_preview=True)
         else: await query.edit_message_text("❌ Couldn't add project.")
 
-# ... (handle_link and handle_media are unchanged)
+async def _stream_breakdown(query, title: str) -> list[str] | None:
+    """Streams the project's sub-tasks into the callback's message as they arrive.
+
+    Edits are at least PROGRESSIVE_EDIT_SECONDS apart (longer if Telegram asks us to back off);
+    the caller's final edit shows whatever the last throttled edit left out.
+    """
+    loop = asyncio.get_running_loop()
+    tasks, next_edit = [], 0.0
+    try:
+        async for task in ai_handler.stream_breakdown(title):
+            tasks.append(task)
+            if loop.time() < next_edit: continue
+            next_edit = loop.time() + config.PROGRESSIVE_EDIT_SECONDS
+            task_list_str = "\n".join(f"• {html.escape(task)}" for task in tasks)
+            try:
+                await query.edit_message_text(f"Breaking down <b>'{html.escape(title)}'</b>...\n\n{task_list_str}", parse_mode='HTML')
+            except RetryAfter as e:
+                next_edit = loop.time() + (e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after)
+            except TelegramError as e:
+                logger.debug(f"Skipped a progressive edit: {e}")
+    except Exception as e:
+        logger.error(f"Error streaming project breakdown: {e}")
+        return None
+    return tasks or None
+
+@metrics.traced("handler")
 async def handle_link(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    url = update.message.text
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
-    notion_page_url = notion_handler.add_content_to_resources(title=url, content_url=url, content_type="url")
-    if notion_page_url: await update.message.reply_html(f"✅ Saved link: <a href='{notion_page_url}'>{url}</a>", disable_web_page_preview=True)
-    else: await update.message.reply_text("❌ Couldn't save link.")
+    entities = update.message.parse_entities(["url", "text_link"])
+    url = next((entity.url if entity.type == "text_link" else text for entity, text in entities.items()), update.message.text)
+    if "://" not in url: url = f"https://{url}"
+    await _capture(update, "link", {"url": url})
+@metrics.traced("handler")
 async def handle_media(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     message = update.message
+    if message.document and (context.chat_data.pop('import_next_document', False) or (message.caption or "").startswith("/import")):
+        await _start_import(update, message.document); return
     media_type = "Photo" if message.photo else "File"
     caption = message.caption or f"Telegram {media_type}"
-    await context.bot.send_chat_action(chat_id=update.effective_chat.id, action=ChatAction.TYPING)
-    try:
-        file_id = message.photo[-1].file_id if message.photo else message.document.file_id
-        caption = caption or (message.document.file_name if message.document else caption)
-        file = await context.bot.get_file(file_id)
-        notion_page_url = notion_handler.add_content_to_resources(title=caption, content_url=file.file_path, content_type=media_type.lower())
-        if notion_page_url: await update.message.reply_html(f"✅ Saved {media_type}: <a href='{notion_page_url}'>{caption}</a>", disable_web_page_preview=True)
-        else: await update.message.reply_text(f"❌ Couldn't save {media_type}.")
-    except Exception as e:
-        logger.error(f"Error handling media: {e}")
-        await update.message.reply_text("❌ Error processing file.")
+    file_id = message.photo[-1].file_id if message.photo else message.document.file_id
+    caption = caption or (message.document.file_name if message.document else caption)
+    await _capture(update, "media", {"media_type": media_type, "caption": caption, "file_id": file_id})
+
+# --- Bulk Import ---
+document_importer = importer.Importer(config.IMPORT_DIR, concurrency=config.IMPORT_CONCURRENCY, progress_seconds=config.IMPORT_PROGRESS_SECONDS)
+
+async def _start_import(update: Update, document) -> None:
+    if not importer.is_supported(document.file_name):
+        await update.message.reply_text("I can import Markdown (.md, .txt), CSV (.csv) and JSON Lines (.jsonl) files."); return
+    reply = await update.message.reply_text(f"📥 Preparing import of {document.file_name}...")
+    job = document_importer.journal.start(update.effective_chat.id, document.file_id, document.file_unique_id, document.file_name, reply.message_id)
+    if job["records_done"]: await reply.edit_text(f"📥 Resuming import of {document.file_name} after {job['records_done']} records...")
+    if not document_importer.start(update.get_bot(), job): await reply.edit_text(f"📥 {document.file_name} is already being imported.")
+
+@metrics.traced("handler")
+async def import_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Imports the document this command replies to, or the next document sent to the chat."""
+    replied = update.message.reply_to_message
+    if replied and replied.document:
+        await _start_import(update, replied.document); return
+    context.chat_data['import_next_document'] = True
+    await update.message.reply_text("Send me a Markdown, CSV or JSON Lines file and I'll add each line or record to Notion.")
+
+@metrics.traced("handler")
+async def queue_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Shows the capture backlog and update scheduler load."""
+    backlog = outbox.backlog()
+    updates = context.application.update_processor.metrics() if isinstance(context.application.update_processor, ChatOrderedUpdateProcessor) else None
+    await update.message.reply_html(
+        f"📥 <b>Capture queue</b>\n\nPending: {backlog['pending']}\nIn progress: {backlog['processing']}\nFailed: {backlog['failed']}"
+        + (f"\nOldest waiting: {int(backlog['oldest_age'])}s" if backlog['pending'] or backlog['processing'] else "")
+        + (f"\n\n⚙️ <b>Updates</b>\n\nRunning: {updates['running']}\nQueued: {updates['queued']}\nHeld back: {updates['held_back']}"
+           f"\nQueue wait: avg {updates['wait_avg'] * 1000:.0f} ms, max {updates['wait_max'] * 1000:.0f} ms" if updates else ""))
+
+@metrics.traced("handler")
+async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Admin view of per-stage latency, errors and retries, plus cache and queue gauges."""
+    if update.effective_user.id not in config.ADMIN_USER_IDS:
+        await update.message.reply_text("Sorry, /stats is for admins only."); return
+    lines = ["📊 <b>Stage latency</b>"]
+    for stage, stats in metrics.registry.stages().items():
+        errors = ", ".join(f"{status}×{count}" for status, count in sorted(stats["errors"].items()))
+        lines.append(f"\n<b>{stage}</b>: {stats['calls']} calls, p50 ≤{stats['p50'] * 1000:.0f} ms, p95 ≤{stats['p95'] * 1000:.0f} ms"
+                     + (f"\nErrors: {errors}" if errors else "") + (f"\nRetries: {stats['retries']}" if stats["retries"] else "")
+                     + "\nSlowest: " + ", ".join(f"{op} (p95 ≤{p95 * 1000:.0f} ms)" for op, p95, _ in stats["slowest"]))
+    if len(lines) == 1: lines.append("\nNothing recorded yet.")
+    cache_stats, backlog = ai_handler.cache.stats(), outbox.backlog()
+    lines.append(f"\n🧠 AI cache hit rate: {cache_stats['hit_rate']:.0%} ({cache_stats['hits']} hits, {cache_stats['misses']} misses)")
+    lines.append(f"📥 Captures pending: {backlog['pending']}, in progress: {backlog['processing']}, failed: {backlog['failed']}")
+    lines.append(f"✍️ Notion writes queued: {notion_handler.write_queue.pending()}")
+    await update.message.reply_html("\n".join(lines))
 
 # --- Main Bot Logic ---
-def main() -> None:
-    """Start the bot and register all handlers."""
-    application = Application.builder().token(config.TELEGRAM_TOKEN).build()
+_metrics_server = None
+_warm_up_task: asyncio.Task | None = None
+
+async def on_startup(application: Application) -> None:
+    """Replays captures left unfinished by the previous run and starts the outbox workers."""
+    global _metrics_server, _warm_up_task
+    # Blocking callers (notion_handler.sync) share this loop's connection pool and write queue.
+    notion_client.set_home_loop(asyncio.get_running_loop())
+    replayed = outbox.requeue_in_flight()
+    if replayed: logger.info(f"Replaying {replayed} unfinished capture(s).")
+    outbox.prune()
+    outbox.start(lambda item: process_capture(application, item), lambda item, error: capture_failed(application, item, error), workers=config.OUTBOX_WORKERS)
+    resumed = document_importer.resume(application.bot)
+    if resumed: logger.info(f"Resuming {resumed} interrupted import(s).")
+    # Loads the AI models while polling starts, so the first capture doesn't pay for it.
+    _warm_up_task = asyncio.create_task(ai_handler.warm_up(), name="ai_warm_up")
+    if config.METRICS_PORT: _metrics_server = await metrics.serve_metrics(config.METRICS_HOST, config.METRICS_PORT)
+
+async def on_shutdown(application: Application) -> None:
+    """Stops the outbox workers, flushes queued Notion writes and closes the shared connection pool."""
+    if _metrics_server: _metrics_server.close()
+    await document_importer.stop()
+    await outbox.stop()
+    await unfurler.aclose()
+    await notion_handler.write_queue.drain()
+    await notion_handler.client.aclose()
+
+def build_application() -> Application:
+    """Builds the bot application with all handlers and jobs registered."""
+    update_processor = ChatOrderedUpdateProcessor(max_concurrent_updates=config.UPDATE_MAX_CONCURRENCY, max_chat_queue=config.UPDATE_MAX_CHAT_QUEUE)
+    application = (
+        Application.builder()
+        .token(config.TELEGRAM_TOKEN)
+        .base_url(config.TELEGRAM_API_BASE_URL)
+        .request(metrics.TracedHTTPXRequest(connection_pool_size=256))
+        .concurrent_updates(update_processor)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
 
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("today", today_command))
@@ -230,13 +405,40 @@ def main() -> None:
     application.add_handler(CommandHandler("find", find_command))
     application.add_handler(CommandHandler("addto", add_to_command))
     application.add_handler(CommandHandler("task", task_command))
+    application.add_handler(CommandHandler("queue", queue_command))
+    application.add_handler(CommandHandler("stats", stats_command))
+    application.add_handler(CommandHandler("import", import_command))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & ~filters.Entity("url"), handle_text_message))
     application.add_handler(MessageHandler(filters.Entity("url") | filters.Entity("text_link"), handle_link))
     application.add_handler(MessageHandler(filters.PHOTO | filters.Document.ALL, handle_media))
     application.add_handler(CallbackQueryHandler(button_callback_handler))
 
+    metrics.registry.add_collector("ai_cache", ai_handler.cache.stats)
+    metrics.registry.add_collector("outbox", outbox.backlog)
+    metrics.registry.add_collector("pending_actions", pending_actions.stats)
+    metrics.registry.add_collector("notion_write_queue", lambda: {"pending": notion_handler.write_queue.pending()})
+    metrics.registry.add_collector("updates", update_processor.metrics)
+
+    application.job_queue.run_repeating(index_sync_job, interval=config.TITLE_INDEX_SYNC_SECONDS, first=1, name="index_sync")
+    application.job_queue.run_repeating(index_reconcile_job, interval=config.INDEX_RECONCILE_SECONDS, first=config.INDEX_RECONCILE_SECONDS, name="index_reconcile")
+    return application
+
+def main() -> None:
+    """Start the bot and register all handlers."""
+    if "--profile-startup" in sys.argv:
+        import startup_profile
+        startup_profile.report(build_application, ai_handler.warm_up)
+        return
+    if config.TELEGRAM_MODE == "webhook" and not config.WEBHOOK_SECRET:
+        logger.error("WEBHOOK_SECRET must be set in webhook mode; refusing to accept unauthenticated updates.")
+        sys.exit(1)
+    application = build_application()
     logger.info("Bot is starting up...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if config.TELEGRAM_MODE == "webhook":
+        asyncio.run(webhook.run(application, config.WEBHOOK_HOST, config.WEBHOOK_PORT, config.WEBHOOK_PATH, config.WEBHOOK_SECRET, config.WEBHOOK_URL,
+                                max_connections=config.WEBHOOK_MAX_CONNECTIONS, on_startup=on_startup, on_shutdown=on_shutdown))
+    else:
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
     logger.info("Bot has shut down.")
 
 
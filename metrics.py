@@ -0,0 +1,221 @@
+import asyncio
+import functools
+import logging
+import re
+import threading
+import time
+from typing import Callable
+
+import httpx
+from telegram.request import BaseRequest, HTTPXRequest
+
+import http_server
+from http_server import Request, Response
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_ID = re.compile(r"[0-9a-fA-F]{8}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{4}-?[0-9a-fA-F]{12}")
+
+
+def status_of(error: BaseException) -> str:
+    """Short status label for a failed call: the HTTP status code when there is one, else the error type."""
+    if isinstance(error, httpx.HTTPStatusError): return str(error.response.status_code)
+    code = getattr(error, "code", None)  # google.api_core errors carry the HTTP status
+    if isinstance(code, int): return str(code)
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)): return "timeout"
+    return type(error).__name__
+
+
+def _is_error(status: str) -> bool:
+    return status not in ("ok", "none") and not status.startswith(("2", "3"))
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        i = 0
+        while i < len(LATENCY_BUCKETS) and seconds > LATENCY_BUCKETS[i]: i += 1
+        self.counts[i] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def copy(self) -> "_Histogram":
+        histogram = _Histogram()
+        histogram.merge(self)
+        return histogram
+
+    def merge(self, other: "_Histogram") -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the largest finite bound for +Inf)."""
+        if not self.count: return 0.0
+        target, seen = q * self.count, 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= target: return bound
+        return LATENCY_BUCKETS[-1]
+
+
+class Registry:
+    """Latency histograms, call counts per status and retry counts, keyed by (stage, op).
+
+    Recording is a couple of dict lookups under a lock, cheap enough to leave on everywhere.
+    Gauges from other components (cache, queues) are read on demand through collectors.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency: dict[tuple[str, str], _Histogram] = {}
+        self._calls: dict[tuple[str, str, str], int] = {}
+        self._retries: dict[tuple[str, str], int] = {}
+        self._collectors: dict[str, Callable[[], dict]] = {}
+
+    def observe(self, stage: str, op: str, seconds: float, status: str = "ok") -> None:
+        with self._lock:
+            histogram = self._latency.get((stage, op))
+            if histogram is None: histogram = self._latency[(stage, op)] = _Histogram()
+            histogram.observe(seconds)
+            self._calls[(stage, op, status)] = self._calls.get((stage, op, status), 0) + 1
+
+    def retry(self, stage: str, op: str) -> None:
+        with self._lock:
+            self._retries[(stage, op)] = self._retries.get((stage, op), 0) + 1
+
+    def add_collector(self, name: str, collect: Callable[[], dict]) -> None:
+        """Registers a callable whose numeric values are exported as ``para_<name>_<key>`` gauges."""
+        self._collectors[name] = collect
+
+    def gauges(self) -> dict[str, float]:
+        values = {}
+        for name, collect in self._collectors.items():
+            try:
+                values.update({f"{name}_{key}": value for key, value in collect().items() if isinstance(value, (int, float))})
+            except Exception as e:
+                logger.warning(f"Metrics collector {name} failed: {e}")
+        return values
+
+    def stages(self) -> dict[str, dict]:
+        """Per-stage totals: calls, errors by status, retries, p50/p95 and the slowest operations."""
+        with self._lock:
+            latency = {key: histogram.copy() for key, histogram in self._latency.items()}
+            calls, retries = dict(self._calls), dict(self._retries)
+        summary: dict[str, dict] = {}
+        for (stage, op), histogram in latency.items():
+            entry = summary.setdefault(stage, {"histogram": _Histogram(), "errors": {}, "retries": 0, "ops": []})
+            entry["histogram"].merge(histogram)
+            entry["ops"].append((op, histogram.quantile(0.95), histogram.count))
+        for (stage, op, status), count in calls.items():
+            if _is_error(status): summary[stage]["errors"][status] = summary[stage]["errors"].get(status, 0) + count
+        for (stage, op), count in retries.items():
+            summary.setdefault(stage, {"histogram": _Histogram(), "errors": {}, "retries": 0, "ops": []})["retries"] += count
+        return {stage: {"calls": entry["histogram"].count, "p50": entry["histogram"].quantile(0.5), "p95": entry["histogram"].quantile(0.95),
+                        "mean": entry["histogram"].sum / entry["histogram"].count if entry["histogram"].count else 0.0,
+                        "errors": entry["errors"], "retries": entry["retries"], "slowest": sorted(entry["ops"], key=lambda op: (-op[1], -op[2]))[:3]}
+                for stage, entry in sorted(summary.items())}
+
+    def render_prometheus(self) -> str:
+        """The registry in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            latency = {key: (list(h.counts), h.sum, h.count) for key, h in self._latency.items()}
+            calls, retries = dict(self._calls), dict(self._retries)
+        lines = ["# HELP para_stage_seconds Latency of instrumented calls.", "# TYPE para_stage_seconds histogram"]
+        for (stage, op), (counts, total, count) in sorted(latency.items()):
+            labels = f'stage="{_escape(stage)}",op="{_escape(op)}"'
+            cumulative = 0
+            for bound, bucket in zip([*map(str, LATENCY_BUCKETS), "+Inf"], counts):
+                cumulative += bucket
+                lines.append(f'para_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines += [f"para_stage_seconds_sum{{{labels}}} {total}", f"para_stage_seconds_count{{{labels}}} {count}"]
+        lines += ["# HELP para_stage_calls_total Instrumented calls by outcome.", "# TYPE para_stage_calls_total counter"]
+        lines += [f'para_stage_calls_total{{stage="{_escape(stage)}",op="{_escape(op)}",status="{_escape(status)}"}} {count}' for (stage, op, status), count in sorted(calls.items())]
+        lines += ["# HELP para_retries_total Retried calls.", "# TYPE para_retries_total counter"]
+        lines += [f'para_retries_total{{stage="{_escape(stage)}",op="{_escape(op)}"}} {count}' for (stage, op), count in sorted(retries.items())]
+        for name, value in sorted(self.gauges().items()):
+            lines += [f"# TYPE para_{name} gauge", f"para_{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+class span:
+    """Times a block into ``registry`` under (stage, op); an exception is recorded as its status.
+
+    Set ``status`` inside the block to record e.g. the HTTP status of a successful call.
+    """
+    __slots__ = ("stage", "op", "status", "_started")
+
+    def __init__(self, stage: str, op: str):
+        self.stage, self.op, self.status = stage, op, "ok"
+
+    def __enter__(self) -> "span":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc is not None: self.status = "cancelled" if isinstance(exc, asyncio.CancelledError) else status_of(exc)
+        registry.observe(self.stage, self.op, time.perf_counter() - self._started, self.status)
+        return False
+
+
+def traced(stage: str) -> Callable:
+    """Decorator that records every call of an async function as a span named after it.
+
+    Functions that may return None (often "failed" or "not found") record that as status "none".
+    """
+    def decorator(func):
+        may_return_none = func.__annotations__.get("return") is not None
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(stage, func.__name__) as s:
+                result = await func(*args, **kwargs)
+                if result is None and may_return_none: s.status = "none"
+                return result
+        return wrapper
+    return decorator
+
+
+def route(path: str) -> str:
+    """Collapses page/database/block ids in an API path so it can be used as a label."""
+    return _ID.sub("{id}", path)
+
+
+# --- Telegram ---
+class TracedHTTPXRequest(HTTPXRequest):
+    """Bot API transport that records each request as a "telegram" span named after the API method."""
+
+    async def do_request(self, url: str, method: str, request_data=None, read_timeout=BaseRequest.DEFAULT_NONE, write_timeout=BaseRequest.DEFAULT_NONE,
+                         connect_timeout=BaseRequest.DEFAULT_NONE, pool_timeout=BaseRequest.DEFAULT_NONE) -> tuple[int, bytes]:
+        with span("telegram", url.rsplit("/", 1)[-1]) as s:
+            code, payload = await super().do_request(url, method, request_data, read_timeout, write_timeout, connect_timeout, pool_timeout)
+            s.status = str(code)
+            return code, payload
+
+
+# --- Endpoint ---
+async def serve_metrics(host: str, port: int):
+    """Serves ``GET /metrics`` in Prometheus format on the running loop; returns the server."""
+    async def handle(request: Request) -> Response:
+        if request.method == "GET" and request.path == "/metrics":
+            return Response.text(registry.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+        return Response.text("Not Found", status=404)
+    server = await http_server.serve(handle, host, port)
+    logger.info(f"Serving metrics on http://{host}:{server.sockets[0].getsockname()[1]}/metrics")
+    return server
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Any, Coroutine
+
+import httpx
+
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+NOTION_VERSION = "2022-06-28"
+
+
+class NotionClient:
+    """Async Notion REST client with a shared keep-alive connection pool per event loop."""
+
+    def __init__(self, api_key: str | None, base_url: str, timeout: float = 10.0, connect_timeout: float = 5.0,
+                 max_connections: int = 10, max_keepalive_connections: int = 5, keepalive_expiry: float = 30.0):
+        self.base_url = base_url
+        self.headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Notion-Version": NOTION_VERSION,
+        }
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections, keepalive_expiry=keepalive_expiry)
+        # httpx pools are bound to the loop they were created on, so the bot loop and the
+        # sync shim loop each get their own pool.
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(base_url=self.base_url, headers=self.headers, timeout=self.timeout, limits=self.limits)
+            self._clients[loop] = client
+        return client
+
+    async def request(self, method: str, path: str, payload: dict | None = None, params: dict | None = None) -> dict:
+        """Sends one request and returns the decoded JSON body. Raises ``httpx.HTTPError`` on failure."""
+        with metrics.span("notion_api", f"{method} {metrics.route(path)}") as span:
+            response = await self._client().request(method, path, json=payload, params=params)
+            span.status = str(response.status_code)
+            response.raise_for_status()
+            return response.json()
+
+    async def post(self, path: str, payload: dict | None = None, params: dict | None = None) -> dict:
+        return await self.request("POST", path, payload, params)
+
+    async def patch(self, path: str, payload: dict | None = None) -> dict:
+        return await self.request("PATCH", path, payload)
+
+    async def get(self, path: str, params: dict | None = None) -> dict:
+        return await self.request("GET", path, params=params)
+
+    async def aclose(self) -> None:
+        """Closes the connection pool belonging to the running loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+# --- Sync Shim ---
+_sync_loop: asyncio.AbstractEventLoop | None = None
+_sync_loop_lock = threading.Lock()
+_home_loop: asyncio.AbstractEventLoop | None = None
+
+
+def set_home_loop(loop: asyncio.AbstractEventLoop | None) -> None:
+    """Registers the bot's event loop; while it runs, ``run_sync`` sends coroutines there."""
+    global _home_loop
+    _home_loop = loop
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="notion-sync", daemon=True).start()
+    return _sync_loop
+
+
+def run_sync(coro: Coroutine[Any, Any, Any]) -> Any:
+    """Runs a coroutine to completion from synchronous code.
+
+    The coroutine runs on the bot's loop once one is registered with ``set_home_loop`` (so it
+    shares the connection pool and write queue with the handlers), otherwise on a shared
+    background loop. Calling it from the loop it would run on raises ``RuntimeError``.
+    """
+    loop = _home_loop if _home_loop is not None and _home_loop.is_running() else _get_sync_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() would block the loop it runs on; await the coroutine instead.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
@@ -1,19 +1,32 @@
-import requests
-import json
+import asyncio
+import httpx
+import weakref
+from typing import AsyncIterator
 import logging
 import config
-from datetime import datetime, timezone
+import metrics
+from datetime import datetime, timedelta, timezone
+from fanout import fan_out, first_hit
+from notion_client import NotionClient, run_sync
+from search_index import SearchIndex, parse_query
+from title_index import TitleIndex, page_title
+from unfurl import LinkIndex, dedup_keys
+from write_queue import NotionWriteQueue
 
 
 logger = logging.getLogger(__name__)
 
 # --- Notion API Configuration ---
-NOTION_API_BASE_URL = "https://api.notion.com/v1"
-HEADERS = {
-    "Authorization": f"Bearer {config.NOTION_API_KEY}",
-    "Content-Type": "application/json",
-    "Notion-Version": "2022-06-28",
-}
+NOTION_API_BASE_URL = config.NOTION_API_BASE_URL
+
+client = NotionClient(
+    config.NOTION_API_KEY,
+    NOTION_API_BASE_URL,
+    timeout=config.NOTION_TIMEOUT,
+    connect_timeout=config.NOTION_CONNECT_TIMEOUT,
+    max_connections=config.NOTION_MAX_CONNECTIONS,
+    max_keepalive_connections=config.NOTION_MAX_KEEPALIVE_CONNECTIONS,
+)
 
 DATABASE_IDS = {
     "Projects": config.NOTION_PROJECTS_DB_ID,
@@ -23,60 +36,159 @@ DATABASE_IDS = {
     "Tasks": config.NOTION_TASKS_DB_ID,
 }
 
+# Databases mirrored in the local title index.
+INDEXED_DATABASES = ["Projects", "Areas", "Resources", "Archive"]
+
+title_index = TitleIndex(config.TITLE_INDEX_PATH)
+# A sync batch holds the search index's lock for its whole commit, so every call to it goes through asyncio.to_thread.
+search_index = SearchIndex(config.SEARCH_INDEX_PATH)
+link_index = LinkIndex(config.LINK_DB_PATH)
+
+write_queue = NotionWriteQueue(
+    client,
+    rate=config.NOTION_WRITE_RATE,
+    burst=config.NOTION_WRITE_BURST,
+    workers=config.NOTION_WRITE_WORKERS,
+    max_retries=config.NOTION_WRITE_MAX_RETRIES,
+)
+
+# Writes acknowledged optimistically; kept referenced until they finish.
+_background_writes: set[asyncio.Task] = set()
+
+def _in_background(coro, description: str) -> bool:
+    """Runs a write without waiting for it and returns the optimistic acknowledgement (True)."""
+    task = asyncio.create_task(coro)
+    _background_writes.add(task)
+    def _done(finished: asyncio.Task) -> None:
+        _background_writes.discard(finished)
+        if finished.cancelled() or finished.exception() or not finished.result(): logger.error(f"Background write failed: {description}")
+    task.add_done_callback(_done)
+    return True
+
+# --- Streaming Readers ---
+def _project(page: dict, properties: list[str] | None) -> dict:
+    if properties is None: return page
+    return {**page, "properties": {name: value for name, value in page.get("properties", {}).items() if name in properties}}
+
+async def _throttled_post(path: str, payload: dict | None = None) -> dict:
+    return await write_queue.read("POST", path, payload)
+
+async def _throttled_get(path: str, params: dict | None = None) -> dict:
+    return await write_queue.read("GET", path, params=params)
+
+async def _paginate(path: str, payload: dict, page_size: int, limit: int | None, post=client.post) -> AsyncIterator[dict]:
+    payload = dict(payload, page_size=min(page_size, limit) if limit else page_size)
+    yielded = 0
+    while True:
+        response = await post(path, payload)
+        for result in response.get("results", []):
+            yield result
+            yielded += 1
+            if limit is not None and yielded >= limit: return
+        if not response.get("has_more") or not response.get("next_cursor"): return
+        payload["start_cursor"] = response["next_cursor"]
+
+async def iter_query(db_id: str, query_payload: dict | None = None, page_size: int = 100, properties: list[str] | None = None, limit: int | None = None,
+                     throttled: bool = False) -> AsyncIterator[dict]:
+    """Streams the pages of a database query, fetching further pages only as they are consumed.
+
+    ``properties`` keeps only the named properties on each page, ``limit`` stops after that many
+    pages, and breaking out of the loop stops fetching. ``throttled`` sends the requests through
+    the write queue's rate limiter and retries (for background crawls). Raises ``httpx.HTTPError``
+    on failure.
+    """
+    post = _throttled_post if throttled else client.post
+    async for page in _paginate(f"/databases/{db_id}/query", query_payload or {}, page_size, limit, post):
+        yield _project(page, properties)
+
+async def iter_search(query: str, page_size: int = 100, limit: int | None = None) -> AsyncIterator[dict]:
+    """Streams pages matching a workspace search, most recently edited first."""
+    search_payload = {"query": query, "filter": {"value": "page", "property": "object"}, "sort": {"direction": "descending", "timestamp": "last_edited_time"}}
+    async for page in _paginate("/search", search_payload, page_size, limit):
+        yield page
+
+async def iter_block_children(block_id: str, throttled: bool = False) -> AsyncIterator[dict]:
+    """Streams the top-level child blocks of a page or block."""
+    get = _throttled_get if throttled else client.get
+    params = {"page_size": 100}
+    while True:
+        response = await get(f"/blocks/{block_id}/children", params)
+        for block in response.get("results", []):
+            yield block
+        if not response.get("has_more") or not response.get("next_cursor"): return
+        params["start_cursor"] = response["next_cursor"]
+
+@metrics.traced("notion")
+async def count_query(db_id: str, query_payload: dict | None = None) -> int:
+    """Counts every page a query matches without keeping the pages in memory."""
+    count = 0
+    async for _ in iter_query(db_id, query_payload, properties=[]):
+        count += 1
+    return count
+
 # --- Core Functions ---
-def add_item_to_database(ai_data: dict, content_blocks: list = None) -> str | None:
+async def _create_item(ai_data: dict, content_blocks: list = None) -> dict | None:
+    """Creates the page and adds it to the local indexes; returns the page object."""
     category, title, tags = ai_data.get("category"), ai_data.get("title"), ai_data.get("tags", [])
     database_id = DATABASE_IDS.get(category)
     if not database_id: return None
     new_page_data = {"parent": {"database_id": database_id}, "properties": {"Name": {"title": [{"text": {"content": title}}]}, "Tags": {"multi_select": [{"name": tag} for tag in tags]}}}
     if content_blocks: new_page_data["children"] = content_blocks
     try:
-        response = requests.post(f"{NOTION_API_BASE_URL}/pages", headers=HEADERS, data=json.dumps(new_page_data))
-        response.raise_for_status()
-        return response.json().get("url")
-    except requests.exceptions.RequestException as e:
+        page = await write_queue.request("POST", "/pages", new_page_data)
+        if category in INDEXED_DATABASES:
+            title_index.upsert_pages(category, [page])
+            await _index_page_text(category, page, _blocks_text(content_blocks or []))
+        return page
+    except httpx.HTTPError as e:
         logger.error(f"Error adding item to Notion: {e}")
         return None
 
-def add_task(task_details: dict) -> str | None:
+@metrics.traced("notion")
+async def add_item_to_database(ai_data: dict, content_blocks: list = None) -> str | None:
+    page = await _create_item(ai_data, content_blocks)
+    return page.get("url") if page else None
+
+def _task_properties(task_name: str, due_date: str | None = None) -> dict:
+    properties = {
+        "Task Name": {"title": [{"text": {"content": task_name}}]},
+        "Status": {"select": {"name": "To Do"}}
+    }
+    if due_date: properties["Due Date"] = {"date": {"start": due_date}}
+    return properties
+
+@metrics.traced("notion")
+async def add_task(task_details: dict) -> str | None:
     """Adds a new task to the Tasks database in Notion."""
     task_name = task_details.get("task_name")
     due_date = task_details.get("due_date")
-    
+
     if not task_name: return None
-    
+
     database_id = DATABASE_IDS.get("Tasks")
     if not database_id:
         logger.error("Tasks Database ID is not configured.")
         return None
-        
-    properties = {
-        "Task Name": {"title": [{"text": {"content": task_name}}]},
-        "Status": {"select": {"name": "To Do"}}
-    }
-    
-    if due_date:
-        properties["Due Date"] = {"date": {"start": due_date}}
 
-    new_page_data = {"parent": {"database_id": database_id}, "properties": properties}
+    new_page_data = {"parent": {"database_id": database_id}, "properties": _task_properties(task_name, due_date)}
 
     try:
-        response = requests.post(f"{NOTION_API_BASE_URL}/pages", headers=HEADERS, data=json.dumps(new_page_data))
-        response.raise_for_status()
-        return response.json().get("url")
-    except requests.exceptions.RequestException as e:
+        page = await write_queue.request("POST", "/pages", new_page_data)
+        return page.get("url")
+    except httpx.HTTPError as e:
         logger.error(f"Error adding task to Notion: {e}")
         return None
 
-def get_tasks_due_today() -> list[str] | None:
+@metrics.traced("notion")
+async def get_tasks_due_today() -> list[str] | None:
     """Queries the Tasks database for tasks due today."""
     db_id = DATABASE_IDS.get("Tasks")
     if not db_id:
         logger.error("Tasks Database ID is not configured.")
         return None
-    
+
     today_iso = datetime.now(timezone.utc).date().isoformat()
-    
+
     query_payload = {
         "filter": {
             "property": "Due Date",
@@ -86,114 +198,343 @@ def get_tasks_due_today() -> list[str] | None:
         }
     }
     try:
-        response = requests.post(f"{NOTION_API_BASE_URL}/databases/{db_id}/query", headers=HEADERS, data=json.dumps(query_payload))
-        response.raise_for_status()
-        results = response.json().get("results", [])
-        
         task_titles = []
-        for page in results:
+        async for page in iter_query(db_id, query_payload, properties=["Task Name"]):
             title_list = page.get("properties", {}).get("Task Name", {}).get("title", [])
             if title_list:
                 title = title_list[0].get("plain_text", "Untitled")
                 task_titles.append(title)
-        
+
         return task_titles
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Error getting tasks due today: {e}")
         return None
 
 
-def get_daily_summary() -> dict:
-    """Counts the number of pages created today in each main database."""
+async def _count_created_today(db_id: str, today_iso: str) -> int:
+    query_payload = {
+        "filter": {
+             "timestamp": "created_time",
+             "created_time": { "on_or_after": today_iso }
+        }
+    }
+    return await count_query(db_id, query_payload)
+
+@metrics.traced("notion")
+async def get_daily_summary() -> dict:
+    """Counts the number of pages created today in each main database, querying them concurrently."""
     summary = {"Projects": 0, "Areas": 0, "Resources": 0, "Tasks": 0}
     today_iso = datetime.now(timezone.utc).date().isoformat()
-
-    for db_name, db_id in DATABASE_IDS.items():
-        if db_name == "Archive" or not db_id: continue
-
-        query_payload = {
-            "filter": {
-                 "timestamp": "created_time",
-                 "created_time": { "on_or_after": today_iso }
-            }
-        }
-        try:
-            response = requests.post(f"{NOTION_API_BASE_URL}/databases/{db_id}/query", headers=HEADERS, data=json.dumps(query_payload))
-            response.raise_for_status()
-            count = len(response.json().get("results", []))
-            summary[db_name] = count
-        except requests.exceptions.RequestException as e:
-            logger.warning(f"Could not get summary for {db_name}: {e}")
-            
+    queries = {db_name: _count_created_today(db_id, today_iso) for db_name, db_id in DATABASE_IDS.items() if db_name != "Archive" and db_id}
+    summary.update(await fan_out(queries))
     return summary
 
-def search_databases_for_exact_title(title: str) -> dict | None:
-    searchable_db_ids = [DATABASE_IDS["Projects"], DATABASE_IDS["Areas"], DATABASE_IDS["Resources"]]
-    for db_id in searchable_db_ids:
-        if not db_id: continue
-        query_payload = {"filter": {"property": "Name", "title": {"equals": title}}}
-        try:
-            search_url = f"{NOTION_API_BASE_URL}/databases/{db_id}/query"
-            response = requests.post(search_url, headers=HEADERS, data=json.dumps(query_payload))
-            response.raise_for_status()
-            results = response.json().get("results")
-            if results: return {"page_id": results[0]["id"], "url": results[0]["url"], "properties": results[0]["properties"]}
-        except requests.exceptions.RequestException as e: logger.error(f"Error searching database {db_id}: {e}")
+# Databases searched by exact title, in the order that wins when several match.
+EXACT_TITLE_SEARCH_ORDER = ["Projects", "Areas", "Resources"]
+
+async def _query_exact_title(db_id: str, title: str) -> dict | None:
+    query_payload = {"filter": {"property": "Name", "title": {"equals": title}}}
+    try:
+        response = await client.post(f"/databases/{db_id}/query", query_payload)
+        results = response.get("results")
+        if results: return {"page_id": results[0]["id"], "url": results[0]["url"], "properties": results[0]["properties"]}
+    except httpx.HTTPError as e: logger.error(f"Error searching database {db_id}: {e}")
     return None
 
-def add_note_to_page(page_id: str, note: str) -> bool:
-    append_url = f"{NOTION_API_BASE_URL}/blocks/{page_id}/children"
+async def _query_exact_title_indexed(db_name: str, title: str) -> dict | None:
+    page_data = await _query_exact_title(DATABASE_IDS[db_name], title)
+    if page_data: title_index.upsert_pages(db_name, [{"id": page_data["page_id"], "url": page_data["url"], "properties": page_data["properties"]}])
+    return page_data
+
+@metrics.traced("notion")
+async def search_databases_for_exact_title(title: str, match: str = "exact") -> dict | None:
+    """Looks the title up in the local index, falling back to concurrent Notion queries on a miss.
+
+    ``match`` may also be "casefold" or "prefix"; those are answered from the index only,
+    and the Notion fallback always uses an exact title match.
+    """
+    page_data = title_index.lookup(title, EXACT_TITLE_SEARCH_ORDER, match)
+    if page_data: return page_data
+    searchable = [db_name for db_name in EXACT_TITLE_SEARCH_ORDER if DATABASE_IDS[db_name]]
+    return await first_hit([_query_exact_title_indexed(db_name, title) for db_name in searchable])
+
+@metrics.traced("notion")
+async def add_note_to_page(page_id: str, note: str, wait: bool = True) -> bool:
+    """Appends a paragraph; with ``wait=False`` the write is queued and True is returned straight away."""
+    if not wait: return _in_background(add_note_to_page(page_id, note), "add note to page")
     new_block_data = {"children": [{"object": "block", "type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": note}}]}}]}
     try:
-        requests.patch(append_url, headers=HEADERS, data=json.dumps(new_block_data)).raise_for_status()
+        await write_queue.request("PATCH", f"/blocks/{page_id}/children", new_block_data, coalesce_key=f"append:{page_id}")
+        await asyncio.to_thread(search_index.append_body, page_id, note)
         return True
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Error adding note to page: {e}")
         return False
 
-def get_active_projects() -> list[str] | None:
+@metrics.traced("notion")
+async def get_active_projects() -> list[str] | None:
     db_id = DATABASE_IDS.get("Projects")
     if not db_id: return None
-    query_url = f"{NOTION_API_BASE_URL}/databases/{db_id}/query"
     try:
-        response = requests.post(query_url, headers=HEADERS)
-        response.raise_for_status()
-        results = response.json().get("results", [])
-        return [page.get("properties", {}).get("Name", {}).get("title", [{}])[0].get("plain_text", "Untitled") for page in results]
-    except requests.exceptions.RequestException as e:
+        return [page.get("properties", {}).get("Name", {}).get("title", [{}])[0].get("plain_text", "Untitled") async for page in iter_query(db_id, properties=["Name"])]
+    except httpx.HTTPError as e:
         logger.error(f"Error getting active projects: {e}")
         return None
 
-def search_workspace(query: str) -> list[dict] | None:
-    search_payload = {"query": query, "filter": {"value": "page", "property": "object"}, "sort": {"direction": "descending", "timestamp": "last_edited_time"}}
+async def iter_search_workspace(query: str, page_size: int = 100, limit: int | None = None) -> AsyncIterator[dict]:
+    """Streams {"title", "url"} for titled pages matching the query; stops after ``limit`` results."""
+    found = 0
+    async for page in iter_search(query, page_size=min(page_size, limit) if limit else page_size):
+        if not page.get("properties", {}).get("Name", {}).get("title"): continue
+        yield {"title": page.get("properties", {}).get("Name", {}).get("title", [{}])[0].get("plain_text", "Untitled"), "url": page.get("url")}
+        found += 1
+        if limit is not None and found >= limit: return
+
+@metrics.traced("notion")
+async def search_workspace(query: str, limit: int | None = None) -> list[dict] | None:
     try:
-        response = requests.post(f"{NOTION_API_BASE_URL}/search", headers=HEADERS, data=json.dumps(search_payload))
-        response.raise_for_status()
-        results = response.json().get("results", [])
-        return [{"title": page.get("properties", {}).get("Name", {}).get("title", [{}])[0].get("plain_text", "Untitled"), "url": page.get("url")} for page in results if page.get("properties", {}).get("Name", {}).get("title")]
-    except requests.exceptions.RequestException as e:
+        return [result async for result in iter_search_workspace(query, limit=limit)]
+    except httpx.HTTPError as e:
         logger.error(f"Error searching workspace: {e}")
         return None
 
-def move_page_to_archive(page_data: dict) -> bool:
+@metrics.traced("notion")
+async def find_pages(query: str, limit: int = 10) -> list[dict] | None:
+    """Answers /find from the local search index, falling back to Notion search.
+
+    The query may carry ``in:<category>`` and ``#tag`` filters; those are only understood by
+    the local index, so a filtered query never falls back.
+    """
+    text, category, tag = parse_query(query)
+    results = await asyncio.to_thread(search_index.search, text, category=category, tag=tag, limit=limit)
+    if results or category or tag: return results
+    return await search_workspace(query, limit=limit)
+
+@metrics.traced("notion")
+async def move_page_to_archive(page_data: dict, wait: bool = True) -> bool:
+    """Copies the page into Archive and archives the original; ``wait=False`` acknowledges immediately."""
     if not page_data: return False
+    if not wait: return _in_background(move_page_to_archive(page_data), "move page to archive")
     original_page_id, original_properties = page_data["page_id"], page_data["properties"]
     title_content, tags_content = original_properties.get("Name", {}).get("title", []), original_properties.get("Tags", {}).get("multi_select", [])
     new_properties = {"Name": {"title": title_content}, "Tags": {"multi_select": tags_content}}
     archive_payload = {"parent": {"database_id": DATABASE_IDS["Archive"]}, "properties": new_properties}
     try:
-        requests.post(f"{NOTION_API_BASE_URL}/pages", headers=HEADERS, data=json.dumps(archive_payload)).raise_for_status()
-        requests.patch(f"{NOTION_API_BASE_URL}/pages/{original_page_id}", headers=HEADERS, data=json.dumps({"archived": True})).raise_for_status()
+        archived_page = await write_queue.request("POST", "/pages", archive_payload)
+        await write_queue.request("PATCH", f"/pages/{original_page_id}", {"archived": True})
+        title_index.remove(original_page_id)
+        title_index.upsert_pages("Archive", [archived_page])
+        await asyncio.to_thread(search_index.remove, original_page_id)
+        link_index.remove_page(original_page_id)
+        await _index_page_text("Archive", archived_page, "")
         return True
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Error moving page to archive: {e}")
         return False
 
-def add_project_with_tasks(ai_data: dict, tasks: list[str]) -> str | None:
-    task_blocks = [{"object": "block", "type": "to_do", "to_do": {"rich_text": [{"type": "text", "text": {"content": task}}]}} for task in tasks]
-    return add_item_to_database(ai_data, content_blocks=task_blocks)
+@metrics.traced("notion")
+async def add_project_with_tasks(ai_data: dict, tasks: list[str], as_task_rows: bool = config.PROJECT_TASKS_AS_ROWS) -> str | None:
+    """Adds the project with its sub-tasks, either as to-do blocks on the page or (``as_task_rows``)
+    as rows of the Tasks database related to the project.
+
+    Task rows are queued on the write queue together and created concurrently. If any of them
+    fails, the project and its task rows are archived again, including rows Notion created for a
+    request that failed (a timed-out write may still have been applied).
+    """
+    if not as_task_rows or not DATABASE_IDS.get("Tasks"):
+        task_blocks = [{"object": "block", "type": "to_do", "to_do": {"rich_text": [{"type": "text", "text": {"content": task}}]}} for task in tasks]
+        return await add_item_to_database(ai_data, content_blocks=task_blocks)
+    project = await _create_item(ai_data)
+    if not project: return None
+    relation = {config.NOTION_TASK_PROJECT_PROPERTY: {"relation": [{"id": project["id"]}]}}
+    futures = [await write_queue.submit("POST", "/pages", {"parent": {"database_id": DATABASE_IDS["Tasks"]}, "properties": {**_task_properties(task), **relation}}) for task in tasks]
+    results = await asyncio.gather(*futures, return_exceptions=True)
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if not failures: return project.get("url")
+    logger.error(f"Creating {len(failures)} of {len(tasks)} task(s) for project '{ai_data.get('title')}' failed ({failures[0]}); rolling back.")
+    created = [project["id"]] + [result["id"] for result in results if not isinstance(result, BaseException)]
+    try:
+        linked = {"property": config.NOTION_TASK_PROJECT_PROPERTY, "relation": {"contains": project["id"]}}
+        created += [page["id"] async for page in iter_query(DATABASE_IDS["Tasks"], {"filter": linked}, properties=[], throttled=True) if page["id"] not in created]
+    except httpx.HTTPError as e:
+        logger.error(f"Couldn't list the task rows of project {project['id']} while rolling back: {e}")
+    rollback = await asyncio.gather(*(write_queue.request("PATCH", f"/pages/{page_id}", {"archived": True}) for page_id in created), return_exceptions=True)
+    for page_id, result in zip(created, rollback):
+        if isinstance(result, BaseException): logger.error(f"Couldn't archive page {page_id} while rolling back: {result}")
+    title_index.remove(project["id"])
+    await asyncio.to_thread(search_index.remove, project["id"])
+    return None
 
-def add_content_to_resources(title: str, content_url: str, content_type: str) -> str | None:
+@metrics.traced("notion")
+async def add_content_to_resources(title: str, content_url: str, content_type: str) -> str | None:
     ai_data = {"category": "Resources", "title": title, "tags": [content_type.capitalize()]}
     content_block = {"object": "block", "type": "bookmark" if content_type == "url" else "embed", "bookmark" if content_type == "url" else "embed": {"url": content_url}}
-    return add_item_to_database(ai_data, content_blocks=[content_block])
+    return await add_item_to_database(ai_data, content_blocks=[content_block])
+
+# Held while a link is checked against the dedup index and saved, so concurrent captures of the same link make one page.
+_link_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+@metrics.traced("notion")
+async def add_link_to_resources(url: str, preview: dict | None = None) -> tuple[str | None, bool]:
+    """Saves a link (titled from its preview) to Resources unless it's already there.
+
+    Returns (page url, True) for a link saved earlier, (page url, False) for a new page and
+    (None, False) on failure.
+    """
+    keys = dedup_keys(url, preview)
+    lock = _link_locks.get(keys[0]) or _link_locks.setdefault(keys[0], asyncio.Lock())
+    async with lock:
+        existing = link_index.lookup(keys)
+        if existing: return existing["url"], True
+        preview = preview or {}
+        blocks = [{"object": "block", "type": "bookmark", "bookmark": {"url": url}}]
+        if preview.get("description"): blocks.append({"object": "block", "type": "paragraph", "paragraph": {"rich_text": [{"type": "text", "text": {"content": preview["description"][:2000]}}]}})
+        tags = ["Url"] + ([preview["site_name"][:100].replace(",", " ")] if preview.get("site_name") else [])
+        page = await _create_item({"category": "Resources", "title": preview.get("title") or url, "tags": tags}, content_blocks=blocks)
+        if not page: return None, False
+        link_index.add(keys, page["id"], page.get("url"))
+        return page.get("url"), False
+
+
+# --- Title Index Sync ---
+def _sync_query(last_synced: str | None) -> dict:
+    """Pages edited since the last sync (all pages on a first sync), oldest edit first.
+
+    Crawling in edit order lets a sync checkpoint the last edit time it has stored, so a crawl
+    that fails part way resumes from there instead of starting over.
+    """
+    query_payload = {"sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]}
+    if last_synced:
+        # last_edited_time is rounded to the minute, so overlap the previous window slightly.
+        since = (datetime.fromisoformat(last_synced) - timedelta(minutes=2)).isoformat()
+        query_payload["filter"] = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since}}
+    return query_payload
+
+def _checkpoint(batch: list[dict]) -> str | None:
+    """The latest edit time in a stored batch; the next sync may resume from it."""
+    edited = [page["last_edited_time"] for page in batch if page.get("last_edited_time")]
+    return max(edited, key=datetime.fromisoformat) if edited else None
+
+@metrics.traced("notion")
+async def sync_title_index(full: bool = False) -> None:
+    """Brings the title index up to date with a full crawl, or with pages edited since the last sync."""
+    for db_name in INDEXED_DATABASES:
+        db_id = DATABASE_IDS.get(db_name)
+        if not db_id: continue
+        started = datetime.now(timezone.utc)
+        last_synced = None if full else title_index.last_synced(db_name)
+        if not last_synced: title_index.clear(db_name)
+        try:
+            batch = []
+            async for page in iter_query(db_id, _sync_query(last_synced), throttled=True):
+                batch.append(page)
+                if len(batch) >= 100:
+                    title_index.upsert_pages(db_name, batch)
+                    if checkpoint := _checkpoint(batch): title_index.set_last_synced(db_name, checkpoint)
+                    batch = []
+            title_index.upsert_pages(db_name, batch)
+            title_index.set_last_synced(db_name, started.isoformat())
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not sync title index for {db_name}: {e}")
+
+@metrics.traced("notion")
+async def reconcile_indexes() -> None:
+    """Forgets indexed pages that were archived, trashed or deleted in Notion.
+
+    Database queries never return such pages, so incremental syncs don't notice them going;
+    this lists the live pages of each database and drops the indexed ones that are missing.
+    """
+    for db_name in INDEXED_DATABASES:
+        db_id = DATABASE_IDS.get(db_name)
+        if not db_id: continue
+        # Taken before the listing, so pages created meanwhile (and indexed on creation) are kept.
+        indexed = title_index.page_ids(db_name) | await asyncio.to_thread(search_index.page_ids, db_name)
+        try:
+            live = {page["id"] async for page in iter_query(db_id, properties=[], throttled=True)}
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not reconcile indexes for {db_name}: {e}")
+            continue
+        gone = indexed - live
+        for page_id in gone:
+            title_index.remove(page_id)
+            await asyncio.to_thread(search_index.remove, page_id)
+            link_index.remove_page(page_id)
+        if gone: logger.info(f"Dropped {len(gone)} page(s) no longer in {db_name} from the local indexes.")
+
+
+# --- Search Index Sync ---
+# Concurrent block reads while indexing page bodies.
+_BODY_FETCH_CONCURRENCY = 3
+
+def _bookmark_urls(blocks: list[dict]) -> list[str]:
+    return [block["bookmark"]["url"] for block in blocks if block.get("type") == "bookmark" and block.get("bookmark", {}).get("url")]
+
+def _blocks_text(blocks: list[dict]) -> str:
+    """Plain text of the paragraph and to_do blocks in a list of blocks."""
+    lines = []
+    for block in blocks:
+        block_type = block.get("type")
+        if block_type not in ("paragraph", "to_do"): continue
+        rich_text = block.get(block_type, {}).get("rich_text", [])
+        lines.append("".join(part.get("plain_text") or part.get("text", {}).get("content", "") for part in rich_text))
+    return "\n".join(line for line in lines if line)
+
+def _page_doc(db_name: str, page: dict, body: str) -> tuple:
+    tags = [tag.get("name", "") for tag in page.get("properties", {}).get("Tags", {}).get("multi_select", [])]
+    return page["id"], db_name, page_title(page), tags, body, page.get("url")
+
+async def _index_page_text(db_name: str, page: dict, body: str) -> None:
+    await asyncio.to_thread(search_index.upsert, *_page_doc(db_name, page, body))
+
+async def _page_doc_with_body(db_name: str, page: dict, semaphore: asyncio.Semaphore) -> tuple | None:
+    """The page's search document with its body text, or None for an archived or trashed page."""
+    if page.get("archived") or page.get("in_trash"): return None
+    async with semaphore:
+        blocks = [block async for block in iter_block_children(page["id"], throttled=True)]
+    # Links saved before the dedup index existed (or from Notion directly) are picked up here.
+    if db_name == "Resources":
+        for url in _bookmark_urls(blocks): link_index.add(dedup_keys(url), page["id"], page.get("url"))
+    return _page_doc(db_name, page, _blocks_text(blocks))
+
+async def _index_batch(db_name: str, pages: list[dict], semaphore: asyncio.Semaphore) -> None:
+    docs = await asyncio.gather(*(_page_doc_with_body(db_name, page, semaphore) for page in pages))
+    removed = [page["id"] for page, doc in zip(pages, docs) if doc is None]
+    # One transaction per batch, in a worker thread like every other search index call.
+    await asyncio.to_thread(search_index.upsert_many, [doc for doc in docs if doc is not None], removed)
+
+@metrics.traced("notion")
+async def sync_search_index(full: bool = False) -> None:
+    """Updates the full-text index from pages edited since the last sync (or rebuilds it)."""
+    semaphore = asyncio.Semaphore(_BODY_FETCH_CONCURRENCY)
+    for db_name in INDEXED_DATABASES:
+        db_id = DATABASE_IDS.get(db_name)
+        if not db_id: continue
+        started = datetime.now(timezone.utc)
+        last_synced = None if full else await asyncio.to_thread(search_index.last_synced, db_name)
+        if not last_synced: await asyncio.to_thread(search_index.clear, db_name)
+        try:
+            batch = []
+            async for page in iter_query(db_id, _sync_query(last_synced), throttled=True):
+                batch.append(page)
+                if len(batch) >= 100:
+                    await _index_batch(db_name, batch, semaphore)
+                    if checkpoint := _checkpoint(batch): await asyncio.to_thread(search_index.set_last_synced, db_name, checkpoint)
+                    batch = []
+            await _index_batch(db_name, batch, semaphore)
+            await asyncio.to_thread(search_index.set_last_synced, db_name, started.isoformat())
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not sync search index for {db_name}: {e}")
+
+
+# --- Sync Shim ---
+class _SyncShim:
+    """Blocking facade for callers outside the bot loop, e.g. ``notion_handler.sync.add_task(details)``."""
+
+    def __getattr__(self, name: str):
+        func = globals().get(name)
+        if not asyncio.iscoroutinefunction(func):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: run_sync(func(*args, **kwargs))
+
+
+sync = _SyncShim()
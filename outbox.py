@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable
+
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    chat_id INTEGER NOT NULL,
+    user_id INTEGER,
+    reply_message_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS captures_status ON captures (status, next_attempt_at);
+"""
+
+# A capture whose acknowledgement never got recorded (crash between the insert and the reply)
+# is picked up anyway after this many seconds.
+ORPHAN_GRACE_SECONDS = 30
+
+
+class Outbox:
+    """Durable SQLite (WAL) journal of captures waiting to be classified and saved to Notion.
+
+    Captures are written before the user is acknowledged and drained by a worker pool, so a
+    restart replays whatever was still pending. Delivery is at-least-once: a crash after the
+    Notion write but before ``complete`` processes that capture again.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 5, retry_delay: float = 5.0):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._wakeup: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    # --- Journal ---
+    def append(self, kind: str, payload: dict, chat_id: int, user_id: int | None = None) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO captures (kind, payload, chat_id, user_id, next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload), chat_id, user_id, now, now, now))
+        return cursor.lastrowid
+
+    def set_reply(self, capture_id: int, message_id: int) -> None:
+        """Records the acknowledgement message that workers will edit, and wakes them."""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE captures SET reply_message_id = ?, updated_at = ? WHERE id = ?", (message_id, time.time(), capture_id))
+        if self._wakeup: self._wakeup.set()
+
+    def claim(self) -> dict | None:
+        """Atomically moves the oldest ready capture to 'processing' and returns it."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT * FROM captures WHERE status = 'pending' AND next_attempt_at <= ? AND (reply_message_id IS NOT NULL OR created_at <= ?) ORDER BY id LIMIT 1",
+                (now, now - ORPHAN_GRACE_SECONDS)).fetchone()
+            if row is None: return None
+            self._conn.execute("UPDATE captures SET status = 'processing', attempts = attempts + 1, updated_at = ? WHERE id = ?", (now, row["id"]))
+        item = dict(row)
+        item["payload"] = json.loads(item["payload"])
+        item["attempts"] += 1
+        return item
+
+    def complete(self, capture_id: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE captures SET status = 'done', last_error = NULL, updated_at = ? WHERE id = ?", (time.time(), capture_id))
+
+    def fail(self, item: dict, error: str) -> bool:
+        """Schedules a retry with backoff; returns False once the capture has run out of attempts."""
+        now = time.time()
+        retry = item["attempts"] < self.max_attempts
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE captures SET status = ?, last_error = ?, next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                               ("pending" if retry else "failed", error, now + self.retry_delay * 2 ** (item["attempts"] - 1), now, item["id"]))
+        return retry
+
+    def requeue_in_flight(self) -> int:
+        """Returns captures left in 'processing' by a previous run to the pending queue."""
+        with self._lock, self._conn:
+            return self._conn.execute("UPDATE captures SET status = 'pending', next_attempt_at = ? WHERE status = 'processing'", (time.time(),)).rowcount
+
+    def prune(self, older_than_seconds: float = 24 * 3600) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM captures WHERE status = 'done' AND updated_at < ?", (time.time() - older_than_seconds,))
+
+    def backlog(self) -> dict:
+        """Counts per status plus the age in seconds of the oldest unfinished capture."""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM captures WHERE status != 'done' GROUP BY status").fetchall())
+            oldest = self._conn.execute("SELECT MIN(created_at) FROM captures WHERE status IN ('pending', 'processing')").fetchone()[0]
+        return {"pending": counts.get("pending", 0), "processing": counts.get("processing", 0), "failed": counts.get("failed", 0),
+                "oldest_age": time.time() - oldest if oldest else 0.0}
+
+    # --- Workers ---
+    def start(self, processor: Callable[[dict], Awaitable[None]], on_give_up: Callable[[dict, str], Awaitable[None]], workers: int = 4) -> None:
+        """Starts ``workers`` tasks that drain the journal through ``processor``.
+
+        ``processor`` raising means "retry later"; after the last attempt ``on_give_up`` is called.
+        """
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(processor, on_give_up), name=f"outbox-{i}") for i in range(workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks: task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, processor, on_give_up) -> None:
+        while True:
+            item = self.claim()
+            if item is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                with metrics.span("capture", item["kind"]):
+                    await processor(item)
+                self.complete(item["id"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Capture {item['id']} attempt {item['attempts']} failed: {e}")
+                if self.fail(item, str(e)):
+                    metrics.registry.retry("capture", item["kind"])
+                else:
+                    logger.error(f"Giving up on capture {item['id']} after {item['attempts']} attempts.")
+                    try:
+                        await on_give_up(item, str(e))
+                    except Exception as give_up_error:
+                        logger.error(f"Error reporting failed capture {item['id']}: {give_up_error}")
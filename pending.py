@@ -0,0 +1,122 @@
+import json
+import logging
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_actions (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+
+class PendingActions:
+    """Confirmations waiting for a button press, keyed by a short id carried in ``callback_data``.
+
+    Entries expire after ``ttl_seconds``; beyond ``max_entries`` the least recently used are dropped.
+    With a ``path`` the entries are also kept in SQLite, so buttons keep working across restarts.
+    Data must be JSON-serializable.
+    """
+
+    def __init__(self, path: str | None = None, ttl_seconds: float = 24 * 3600, max_entries: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "expired": 0, "evicted": 0}
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._load()
+
+    def _load(self) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.execute("DELETE FROM pending_actions WHERE expires_at <= ?", (now,))
+            rows = self._conn.execute("SELECT id, user_id, kind, data, expires_at FROM pending_actions ORDER BY last_used DESC LIMIT ?", (self.max_entries,)).fetchall()
+            self._conn.execute("DELETE FROM pending_actions WHERE id NOT IN (SELECT id FROM pending_actions ORDER BY last_used DESC LIMIT ?)", (self.max_entries,))
+        for action_id, user_id, kind, data, expires_at in reversed(rows):
+            self._entries[action_id] = {"user_id": user_id, "kind": kind, "data": json.loads(data), "expires_at": expires_at}
+        if rows: logger.info(f"Restored {len(rows)} pending actions.")
+
+    def put(self, user_id: int | None, kind: str, data: Any) -> str:
+        """Stores an action for ``user_id`` and returns its id (8 URL-safe characters)."""
+        now = time.time()
+        action_id = secrets.token_urlsafe(6)
+        entry = {"user_id": user_id, "kind": kind, "data": data, "expires_at": now + self.ttl_seconds}
+        with self._lock:
+            self._entries[action_id] = entry
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+            self._stats["created"] += 1
+            self._stats["evicted"] += len(evicted)
+            if self._conn:
+                with self._conn:
+                    self._conn.execute("INSERT OR REPLACE INTO pending_actions VALUES (?, ?, ?, ?, ?, ?)", (action_id, user_id, kind, json.dumps(data), entry["expires_at"], now))
+                    self._conn.executemany("DELETE FROM pending_actions WHERE id = ?", [(old,) for old in evicted])
+        return action_id
+
+    def _live(self, action_id: str, user_id: int | None, kind: str, now: float) -> dict | None:
+        entry = self._entries.get(action_id)
+        if entry is None or entry["kind"] != kind or entry["user_id"] != user_id: return None
+        if entry["expires_at"] <= now:
+            self._drop(action_id)
+            self._stats["expired"] += 1
+            return None
+        return entry
+
+    def get(self, action_id: str, user_id: int | None, kind: str) -> Any | None:
+        """The data of a live action of this kind that belongs to ``user_id``, or None."""
+        now = time.time()
+        with self._lock:
+            entry = self._live(action_id, user_id, kind, now)
+            if entry is None: return None
+            self._entries.move_to_end(action_id)
+            if self._conn:
+                with self._conn:
+                    self._conn.execute("UPDATE pending_actions SET last_used = ? WHERE id = ?", (now, action_id))
+            return entry["data"]
+
+    def update(self, action_id: str, data: Any) -> None:
+        """Replaces the data of an action, keeping its id and expiry."""
+        with self._lock:
+            entry = self._entries.get(action_id)
+            if entry is None: return
+            entry["data"] = data
+            self._entries.move_to_end(action_id)
+            if self._conn:
+                with self._conn:
+                    self._conn.execute("UPDATE pending_actions SET data = ?, last_used = ? WHERE id = ?", (json.dumps(data), time.time(), action_id))
+
+    def pop(self, action_id: str, user_id: int | None, kind: str) -> Any | None:
+        """Like ``get``, but also removes the action, so a second press of its buttons finds nothing."""
+        with self._lock:
+            entry = self._live(action_id, user_id, kind, time.time())
+            if entry is None: return None
+            self._drop(action_id)
+            return entry["data"]
+
+    def _drop(self, action_id: str) -> None:
+        self._entries.pop(action_id, None)
+        if self._conn:
+            with self._conn:
+                self._conn.execute("DELETE FROM pending_actions WHERE id = ?", (action_id,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the queue wait histogram buckets.
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _ChatQueue:
+    __slots__ = ("admission", "lock", "updates")
+
+    def __init__(self, max_queued: int):
+        self.admission = asyncio.Semaphore(max_queued)
+        self.lock = asyncio.Lock()
+        self.updates = 0
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Runs updates from different chats concurrently while keeping each chat's updates in order.
+
+    At most ``max_concurrent_updates`` handlers run at once. Each chat may have up to
+    ``max_chat_queue`` updates waiting or running; further updates from that chat are held back
+    (in order, without taking a running slot from other chats) until earlier ones finish, never
+    dropped. Up to ``max_concurrent_updates * max_chat_queue`` updates are admitted at once;
+    later ones wait for admission in arrival order.
+    Multi-step button flows keep working because a chat never has two handlers running at once.
+    """
+
+    def __init__(self, max_concurrent_updates: int = 16, max_chat_queue: int = 20):
+        # The base class's semaphore only bounds how many updates are admitted at once (every chat
+        # with a full queue); the cap on running handlers is applied in do_process_update after the
+        # chat lock is taken, so chats waiting their turn don't hold running slots.
+        super().__init__(max_concurrent_updates * max_chat_queue)
+        self.max_running = max_concurrent_updates
+        self.max_chat_queue = max_chat_queue
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._chats: dict[int, _ChatQueue] = {}
+        self._active = 0
+        self._waiting = 0
+        self._held_back = 0
+        self._wait_count = 0
+        self._wait_sum = 0.0
+        self._wait_max = 0.0
+        self._wait_buckets = [0] * len(WAIT_BUCKETS)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    @staticmethod
+    def _chat_key(update: object) -> int | None:
+        if isinstance(update, Update):
+            if update.effective_chat: return update.effective_chat.id
+            if update.effective_user: return update.effective_user.id
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self._chat_key(update)
+        if key is None:
+            await self._run(coroutine, time.monotonic())
+            return
+        chat = self._chats.get(key)
+        if chat is None: chat = self._chats[key] = _ChatQueue(self.max_chat_queue)
+        chat.updates += 1
+        enqueued = time.monotonic()
+        if chat.admission.locked():
+            self._held_back += 1
+            logger.info(f"Holding back an update for chat {key}: {self.max_chat_queue} updates already queued.")
+        self._waiting += 1
+        waiting = True
+        try:
+            # Semaphore and lock waiters are woken first in, first out, so the chat's order is kept.
+            async with chat.admission, chat.lock:
+                self._waiting -= 1
+                waiting = False
+                await self._run(coroutine, enqueued)
+        finally:
+            if waiting:
+                self._waiting -= 1
+                coroutine.close()
+            chat.updates -= 1
+            if not chat.updates: del self._chats[key]
+
+    async def _run(self, coroutine: Awaitable[Any], enqueued: float) -> None:
+        self._waiting += 1
+        async with self._running:
+            self._waiting -= 1
+            self._record_wait(time.monotonic() - enqueued)
+            self._active += 1
+            try:
+                await coroutine
+            finally:
+                self._active -= 1
+
+    def _record_wait(self, seconds: float) -> None:
+        self._wait_count += 1
+        self._wait_sum += seconds
+        self._wait_max = max(self._wait_max, seconds)
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if seconds <= bound:
+                self._wait_buckets[i] += 1
+                break
+
+    def metrics(self) -> dict:
+        """Queue wait statistics and current load."""
+        return {
+            "running": self._active,
+            "queued": self._waiting,
+            "chats": len(self._chats),
+            "held_back": self._held_back,
+            "wait_count": self._wait_count,
+            "wait_avg": self._wait_sum / self._wait_count if self._wait_count else 0.0,
+            "wait_max": self._wait_max,
+            "wait_buckets": dict(zip(WAIT_BUCKETS, self._wait_buckets)),
+        }
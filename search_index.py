@@ -0,0 +1,156 @@
+import difflib
+import logging
+import re
+import sqlite3
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS docs USING fts5(
+    title, tags, body, page_id UNINDEXED, url UNINDEXED, category UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS terms USING fts5vocab(docs, row);
+CREATE TABLE IF NOT EXISTS doc_ids (
+    id INTEGER PRIMARY KEY,  -- rowid of the page's row in docs
+    page_id TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    db_name TEXT PRIMARY KEY,
+    last_synced TEXT NOT NULL
+);
+"""
+
+# BM25 column weights: title, tags, body (the unindexed columns don't score).
+COLUMN_WEIGHTS = (10.0, 5.0, 1.0, 0.0, 0.0, 0.0)
+# Indexed body text per page is capped to keep the index compact.
+MAX_BODY_CHARS = 20_000
+# The index file is memory-mapped up to this size.
+MMAP_BYTES = 256 * 1024 * 1024
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_FILTER = re.compile(r"(?:^|\s)(?:#(\S+)|in:(\S+))", re.I)
+
+
+def parse_query(text: str) -> tuple[str, str | None, str | None]:
+    """Splits "/find" input into free text, an ``in:<category>`` filter and a ``#tag`` filter."""
+    tag = category = None
+    for match in _FILTER.finditer(text):
+        tag = match.group(1) or tag
+        category = match.group(2) or category
+    return _FILTER.sub(" ", text).strip(), category, tag
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+class SearchIndex:
+    """Local BM25 full-text index (SQLite FTS5) over page titles, tags and body text.
+
+    Every query term is prefix-matched; terms that match nothing are widened to close
+    spellings from the index vocabulary.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(f"PRAGMA mmap_size={MMAP_BYTES}")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        with self._conn:
+            # Indexes written before doc_ids existed: map their pages to the rows they already have.
+            if self._conn.execute("SELECT 1 FROM doc_ids LIMIT 1").fetchone() is None:
+                self._conn.execute("INSERT OR IGNORE INTO doc_ids (id, page_id) SELECT rowid, page_id FROM docs")
+
+    # page_id is an unindexed FTS column, so rows are always addressed by rowid through doc_ids.
+    def _rowid(self, page_id: str) -> int | None:
+        row = self._conn.execute("SELECT id FROM doc_ids WHERE page_id = ?", (page_id,)).fetchone()
+        return row[0] if row else None
+
+    def _delete(self, page_id: str) -> None:
+        rowid = self._rowid(page_id)
+        if rowid is None: return
+        self._conn.execute("DELETE FROM docs WHERE rowid = ?", (rowid,))
+        self._conn.execute("DELETE FROM doc_ids WHERE id = ?", (rowid,))
+
+    def upsert(self, page_id: str, category: str, title: str, tags: list[str], body: str, url: str | None) -> None:
+        self.upsert_many([(page_id, category, title, tags, body, url)])
+
+    def upsert_many(self, docs: list[tuple], removed: list[str] = ()) -> None:
+        """Stores (page_id, category, title, tags, body, url) documents and drops ``removed`` pages in one transaction."""
+        with self._lock, self._conn:
+            for page_id in removed: self._delete(page_id)
+            for page_id, category, title, tags, body, url in docs:
+                rowid = self._rowid(page_id)
+                if rowid is None: rowid = self._conn.execute("INSERT INTO doc_ids (page_id) VALUES (?)", (page_id,)).lastrowid
+                else: self._conn.execute("DELETE FROM docs WHERE rowid = ?", (rowid,))
+                self._conn.execute("INSERT INTO docs (rowid, title, tags, body, page_id, url, category) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                   (rowid, title, " ".join(tags), body[:MAX_BODY_CHARS], page_id, url, category))
+
+    def append_body(self, page_id: str, text: str) -> None:
+        with self._lock, self._conn:
+            rowid = self._rowid(page_id)
+            row = self._conn.execute("SELECT body FROM docs WHERE rowid = ?", (rowid,)).fetchone() if rowid is not None else None
+            if row: self._conn.execute("UPDATE docs SET body = ? WHERE rowid = ?", ((row[0] + "\n" + text)[:MAX_BODY_CHARS], rowid))
+
+    def remove(self, page_id: str) -> None:
+        with self._lock, self._conn:
+            self._delete(page_id)
+
+    def page_ids(self, category: str) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT page_id FROM docs WHERE category = ?", (category,))}
+
+    def clear(self, category: str) -> None:
+        """Forgets a database's pages and sync cursor so the next sync is a full rebuild."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM doc_ids WHERE id IN (SELECT rowid FROM docs WHERE category = ?)", (category,))
+            self._conn.execute("DELETE FROM docs WHERE category = ?", (category,))
+            self._conn.execute("DELETE FROM sync_state WHERE db_name = ?", (category,))
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM docs LIMIT 1").fetchone() is None
+
+    def _term_group(self, term: str) -> str:
+        """Prefix match for the term, OR-ed with close vocabulary spellings when it has no matches."""
+        group = [_quote(term) + "*"]
+        if len(term) >= 4:
+            with self._lock:
+                has_match = self._conn.execute("SELECT 1 FROM terms WHERE term >= ? AND term < ? LIMIT 1", (term, term + "\uffff")).fetchone()
+                candidates = [] if has_match else [row[0] for row in self._conn.execute("SELECT term FROM terms WHERE term >= ? AND term < ?", (term[0], term[0] + "\uffff"))]
+            group += [_quote(alt) for alt in difflib.get_close_matches(term, candidates, n=3, cutoff=0.8)]
+        return "(" + " OR ".join(group) + ")"
+
+    def search(self, text: str, category: str | None = None, tag: str | None = None, limit: int = 10) -> list[dict]:
+        """Returns up to ``limit`` pages as {"title", "url", "category", "score"}, best first."""
+        terms = [term.casefold() for term in _WORD.findall(text)]
+        clauses = [self._term_group(term) for term in terms]
+        if tag: clauses.append("tags : " + _quote(tag.casefold()))
+        if not clauses: return []
+        sql = f"SELECT title, url, category, bm25(docs, {', '.join(map(str, COLUMN_WEIGHTS))}) AS score FROM docs WHERE docs MATCH ?"
+        params: list = [" AND ".join(clauses)]
+        if category:
+            sql += " AND lower(category) = ?"
+            params.append(category.casefold())
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        try:
+            with self._lock:
+                rows = self._conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Search index query failed for {text!r}: {e}")
+            return []
+        return [{"title": row[0], "url": row[1], "category": row[2], "score": -row[3]} for row in rows]
+
+    def last_synced(self, db_name: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT last_synced FROM sync_state WHERE db_name = ?", (db_name,)).fetchone()
+        return row[0] if row else None
+
+    def set_last_synced(self, db_name: str, timestamp: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (db_name, timestamp))
@@ -0,0 +1,75 @@
+"""Startup profile: where the bot's import and initialization time goes.
+
+    python main.py --profile-startup
+
+Import times come from a fresh interpreter run with ``-X importtime``; initialization steps
+are timed in-process. Nothing is polled and no messages are sent.
+"""
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times(module: str = "main") -> list[tuple[str, int, float, float]]:
+    """(module, depth, self ms, cumulative ms) for every module imported by ``import <module>``."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=_ROOT, capture_output=True, text=True)
+    times = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match: times.append((match.group(4), len(match.group(3)) // 2, int(match.group(1)) / 1000, int(match.group(2)) / 1000))
+    return times
+
+
+def _own_modules() -> set[str]:
+    return {name[:-3] for name in os.listdir(_ROOT) if name.endswith(".py")}
+
+
+async def _timed(steps: dict[str, Callable[[], Awaitable]]) -> list[tuple[str, float, str]]:
+    timings = []
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            await step()
+            outcome = "ok"
+        except Exception as e:
+            outcome = f"failed: {e}"
+        timings.append((name, (time.perf_counter() - started) * 1000, outcome))
+    return timings
+
+
+def report(build_application: Callable, warm_up: Callable[[], Awaitable]) -> None:
+    """Prints import times of the bot's modules and the slowest packages, then times initialization."""
+    times = import_times()
+    own = _own_modules()
+    print("Bot modules (ms)                 self   cumulative")
+    for name, depth, self_ms, cumulative_ms in times:
+        if name in own: print(f"  {'  ' * depth}{name:<{30 - 2 * depth}}{self_ms:>7.1f}{cumulative_ms:>13.1f}")
+    packages: dict[str, float] = {}
+    for name, _, _, cumulative_ms in times:
+        if "." not in name and name not in own: packages[name] = max(packages.get(name, 0.0), cumulative_ms)
+    print("\nSlowest packages (cumulative ms)")
+    for name, cumulative_ms in sorted(packages.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {name:<30}{cumulative_ms:>20.1f}")
+
+    application, initialized = None, False
+    async def build() -> None:
+        nonlocal application
+        application = build_application()
+    async def initialize() -> None:
+        nonlocal initialized
+        await application.initialize()
+        initialized = True
+    async def run_steps() -> list[tuple[str, float, str]]:
+        timings = await _timed({"build_application": build, "application.initialize (getMe)": initialize, "AI warm-up (deferred Gemini import)": warm_up})
+        if initialized: await application.shutdown()
+        return timings
+    print("\nInitialization (ms)")
+    for name, elapsed_ms, outcome in asyncio.run(run_steps()):
+        print(f"  {name:<40}{elapsed_ms:>10.1f}  {outcome}")
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# The bot's modules live at the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Modules open their SQLite files at import time; keep them out of the working tree.
+_state_dir = tempfile.mkdtemp(prefix="para-tests-")
+for _name in ("TITLE_INDEX_PATH", "SEARCH_INDEX_PATH", "LINK_DB_PATH", "OUTBOX_PATH", "AI_CACHE_PATH", "PENDING_ACTIONS_PATH"):
+    os.environ.setdefault(_name, os.path.join(_state_dir, _name.lower().removesuffix("_path") + ".db"))
+os.environ.setdefault("IMPORT_DIR", os.path.join(_state_dir, "imports"))
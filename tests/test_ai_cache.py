@@ -0,0 +1,41 @@
+import ai_cache as ai_cache_module
+import ai_handler
+from ai_cache import AICache
+
+
+def test_entries_expire_after_the_ttl(tmp_path, monkeypatch):
+    path = str(tmp_path / "ai_cache.db")
+    cache = AICache(path, ttl_seconds=60)
+    cache.set("k", {"title": "Garden"})
+    assert cache.get("k") == {"title": "Garden"}
+
+    now = ai_cache_module.time.time()
+    monkeypatch.setattr(ai_cache_module.time, "time", lambda: now + 61)
+    assert cache.get("k") is None
+    assert AICache(path, ttl_seconds=60).get("k") is None
+
+
+def test_disk_store_outlives_the_memory_lru(tmp_path):
+    path = str(tmp_path / "ai_cache.db")
+    cache = AICache(path, max_memory_entries=1)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.stats()["memory_entries"] == 1
+    assert cache.get("a") == 1
+    assert cache.stats()["disk_hits"] == 1
+    assert AICache(path).get("b") == 2
+
+
+def test_keys_ignore_case_and_spacing_but_not_the_prompt_version():
+    assert AICache.make_key("classify", "Buy  Milk", 1) == AICache.make_key("classify", "buy milk", 1)
+    assert AICache.make_key("classify", "buy milk", 1) != AICache.make_key("classify", "buy milk", 2)
+    assert AICache.make_key("task", "buy milk", 1, scope="2026-10-16") != AICache.make_key("task", "buy milk", 1, scope="2026-10-17")
+
+
+def test_bumping_a_prompt_version_invalidates_its_entries(monkeypatch):
+    monkeypatch.setattr(ai_handler, "cache", AICache(":memory:"))
+    ai_handler.cache.set(ai_handler._cache_key("classify", "Plan the trip"), {"category": "Projects"})
+    assert ai_handler.cache.get(ai_handler._cache_key("classify", "Plan the trip")) == {"category": "Projects"}
+
+    monkeypatch.setitem(ai_handler.PROMPT_VERSIONS, "classify", ai_handler.PROMPT_VERSIONS["classify"] + 1)
+    assert ai_handler.cache.get(ai_handler._cache_key("classify", "Plan the trip")) is None
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import re
+
+import ai_handler
+import metrics
+from ai_cache import AICache
+
+
+class _Chunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStreamingModel:
+    """Streams the given chunks, each after ``delay`` seconds."""
+
+    def __init__(self, chunks: list[str], delay: float = 0.0):
+        self.chunks, self.delay = chunks, delay
+
+    async def generate_content_async(self, prompt, stream=False):
+        async def chunks():
+            for text in self.chunks:
+                await asyncio.sleep(self.delay)
+                yield _Chunk(text)
+        return chunks()
+
+
+def _use(monkeypatch, model) -> metrics.Registry:
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, "registry", registry)
+    monkeypatch.setattr(ai_handler, "model", model)
+    monkeypatch.setattr(ai_handler, "json_model", model)
+    monkeypatch.setattr(ai_handler.cache, "get", lambda key: None)
+    return registry
+
+
+def test_breakdown_span_excludes_the_callers_time(monkeypatch):
+    registry = _use(monkeypatch, FakeStreamingModel(["- Plan the route\n- Book", " the hotel\n- Pack"], delay=0.01))
+
+    async def consume():
+        tasks = []
+        async for task in ai_handler.stream_breakdown("Trip to Lisbon"):
+            tasks.append(task)
+            await asyncio.sleep(0.1)  # e.g. a throttled message edit
+        return tasks
+
+    assert asyncio.run(consume()) == ["Plan the route", "Book the hotel", "Pack"]
+    histogram = registry._latency[("gemini", "breakdown")]
+    assert histogram.count == 1 and histogram.sum < 0.1
+    assert registry._calls[("gemini", "breakdown", "ok")] == 1
+
+
+def test_breakdown_closed_early_is_not_an_error(monkeypatch):
+    registry = _use(monkeypatch, FakeStreamingModel(["- One\n- Two\n- Three\n"]))
+
+    async def first_task():
+        stream = ai_handler.stream_breakdown("Garden")
+        task = await anext(stream)
+        await stream.aclose()
+        return task
+
+    assert asyncio.run(first_task()) == "One"
+    assert registry._calls == {("gemini", "breakdown_first_task", "ok"): 1, ("gemini", "breakdown", "ok"): 1}
+
+
+class FakeClassifier:
+    """Classifies each text as a Resource titled with the text; ``batch_reply`` overrides the reply to batch prompts."""
+
+    def __init__(self, batch_reply=None):
+        self.batch_reply = batch_reply
+        self.prompts: list[str] = []
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        items = re.findall(r"Item (\d+): --- (.*?) ---", prompt)
+        if items:
+            reply = self.batch_reply(items) if self.batch_reply else [{"index": int(i), **self._classify(text)} for i, text in items]
+        else:
+            reply = self._classify(re.search(r"Text to analyze: --- (.*?) ---", prompt).group(1))
+        return _Chunk(json.dumps(reply))
+
+    @staticmethod
+    def _classify(text: str) -> dict:
+        return {"category": "Resources", "title": text, "tags": [], "complexity": "simple", "subtasks": []}
+
+
+def _classify(monkeypatch, model: FakeClassifier, texts: list[str], window: float = 0.01, max_items: int = 10) -> list[dict | None]:
+    monkeypatch.setattr(ai_handler, "json_model", model)
+    monkeypatch.setattr(ai_handler, "cache", AICache(":memory:"))
+    batcher = ai_handler.ClassificationBatcher(window, max_items)
+
+    async def scenario():
+        return await asyncio.wait_for(asyncio.gather(*(batcher.classify(text) for text in texts)), timeout=1)
+
+    return asyncio.run(scenario())
+
+
+def test_requests_within_the_window_share_one_call(monkeypatch):
+    model = FakeClassifier()
+    results = _classify(monkeypatch, model, ["Buy milk", "Read SICP", "Fix bike"])
+    assert [result["title"] for result in results] == ["Buy milk", "Read SICP", "Fix bike"]
+    assert len(model.prompts) == 1
+
+
+def test_a_full_batch_is_sent_without_waiting_for_the_window(monkeypatch):
+    model = FakeClassifier()
+    results = _classify(monkeypatch, model, ["a", "b", "c", "d"], window=30, max_items=2)
+    assert [result["title"] for result in results] == ["a", "b", "c", "d"]
+    assert len(model.prompts) == 2
+
+
+def test_a_reply_of_the_wrong_length_falls_back_to_one_call_per_item(monkeypatch):
+    model = FakeClassifier(batch_reply=lambda items: [{"index": 0, **FakeClassifier._classify(items[0][1])}])
+    results = _classify(monkeypatch, model, ["Buy milk", "Read SICP", "Fix bike"])
+    assert [result["title"] for result in results] == ["Buy milk", "Read SICP", "Fix bike"]
+    assert len(model.prompts) == 4
+
+
+def test_only_malformed_entries_are_retried(monkeypatch):
+    def reply(items):
+        entries = [{"index": int(i), **FakeClassifier._classify(text)} for i, text in items]
+        del entries[1]["category"]
+        return entries
+
+    model = FakeClassifier(batch_reply=reply)
+    results = _classify(monkeypatch, model, ["Buy milk", "Read SICP", "Fix bike"])
+    assert [result["title"] for result in results] == ["Buy milk", "Read SICP", "Fix bike"]
+    assert len(model.prompts) == 2 and "Read SICP" in model.prompts[1]
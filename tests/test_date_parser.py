@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+import date_parser
+from date_parser import MIN_CONFIDENCE, PROMPT_EXAMPLES, parse_task
+
+
+# (input, expected task_name, expected due_date, expected to be confident), all parsed as of CORPUS_TODAY.
+CORPUS_TODAY = date(2026, 10, 16)  # a Friday
+CORPUS = [
+    ("Call the plumber tomorrow", "Call the plumber", "2026-10-17", True),
+    ("Buy groceries", "Buy groceries", None, True),
+    ("Pay rent on 2026-11-01", "Pay rent", "2026-11-01", True),
+    ("Finish the report by Friday", "Finish the report", "2026-10-23", True),
+    ("Schedule meeting for September 5th", "Schedule meeting", "2027-09-05", True),
+    ("Renew passport on the 3rd of November", "Renew passport", "2026-11-03", True),
+    ("Dentist Nov 20", "Dentist", "2026-11-20", True),
+    ("Book flights by December 1st, 2026", "Book flights", "2026-12-01", True),
+    ("Submit taxes today", "Submit taxes", "2026-10-16", True),
+    ("Water the plants tonight", "Water the plants", "2026-10-16", True),
+    ("Send invoice the day after tomorrow", "Send invoice", "2026-10-18", True),
+    ("Follow up in 3 days", "Follow up", "2026-10-19", True),
+    ("Plan offsite in two weeks", "Plan offsite", "2026-10-30", True),
+    ("Start the new course next week", "Start the new course", "2026-10-19", True),
+    ("Team lunch on Monday", "Team lunch", "2026-10-19", True),
+    ("Review PRs this Friday", "Review PRs", "2026-10-16", True),
+    ("Review PRs next Friday", "Review PRs", "2026-10-23", True),
+    ("Call mom tmrw", "Call mom", "2026-10-17", True),
+    ("Pay rent on the 1st", "Pay rent", "2026-11-01", True),
+    ("Call mom on the 5th", "Call mom", "2026-11-05", True),
+    ("Submit form by 15th", "Submit form", "2026-11-15", True),
+    ("File expenses by the 20th", "File expenses", "2026-10-20", True),
+    ("Review in a fortnight", "Review", "2026-10-30", True),
+    ("Clean the garage this weekend", "Clean the garage this weekend", None, False),
+    ("Send report by end of month", "Send report by end of month", None, False),
+    ("Dinner with Sam tomorrow at 7pm", "Dinner with Sam", "2026-10-17", False),
+    ("Pay bill on 31/10", "Pay bill on 31/10", None, False),
+    ("Meet Bob on Wed", "Meet Bob on Wed", None, False),
+    ("Buy sun cream", "Buy sun cream", None, False),
+    ("Renew lease on February 30th", "Renew lease on February 30th", None, False),
+    ("Buy a new mon itor", "Buy a new mon itor", None, False),
+    ("Ask Sunday school teacher", "Ask Sunday school teacher", None, False),
+    ("Call grandma Sunday", "Call grandma Sunday", None, False),
+    ("Celebrate 25th anniversary", "Celebrate 25th anniversary", None, False),
+    ("Water plants every fortnight", "Water plants every fortnight", None, False),
+    ("Pay deposit on the 32nd", "Pay deposit on the 32nd", None, False),
+]
+
+
+@pytest.mark.parametrize("text, task_name, due_date, confident", CORPUS)
+def test_corpus(text, task_name, due_date, confident):
+    details, confidence = parse_task(text, CORPUS_TODAY)
+    if confident:
+        assert (details["task_name"], details["due_date"]) == (task_name, due_date)
+        assert confidence >= MIN_CONFIDENCE
+    else:
+        assert confidence < MIN_CONFIDENCE
+
+
+@pytest.mark.parametrize("text", PROMPT_EXAMPLES)
+def test_prompt_examples_are_in_corpus(text):
+    assert text in {entry[0] for entry in CORPUS}
+
+
+def test_prompt_examples_render_parsed_answers():
+    lines = date_parser.prompt_examples(CORPUS_TODAY).splitlines()
+    assert lines[0] == '- "Call the plumber tomorrow" -> {"task_name": "Call the plumber", "due_date": "2026-10-17"}'
+    assert lines[2] == '- "Buy groceries" -> {"task_name": "Buy groceries", "due_date": null}'
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+import digest as digest_module
+from digest import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight, calls = SingleFlight(ttl=60), []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"tasks": 3}
+
+        results = await asyncio.gather(*(flight.do("summary", compute) for _ in range(5)))
+        return results, calls, await flight.do("summary", compute)
+
+    results, calls, later = asyncio.run(scenario())
+    assert results == [{"tasks": 3}] * 5
+    assert later == {"tasks": 3}
+    assert len(calls) == 1
+
+
+def test_results_expire_after_the_ttl(monkeypatch):
+    async def scenario():
+        flight, calls = SingleFlight(ttl=60), []
+
+        async def compute():
+            calls.append(1)
+            return len(calls)
+
+        first = await flight.do("summary", compute)
+        now = digest_module.time.monotonic()
+        monkeypatch.setattr(digest_module.time, "monotonic", lambda: now + 61)
+        return first, await flight.do("summary", compute)
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+def test_an_error_reaches_every_waiting_caller_and_is_not_cached():
+    async def scenario():
+        flight, calls = SingleFlight(ttl=60), []
+
+        async def fail():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("Notion is down")
+
+        results = await asyncio.gather(*(flight.do("summary", fail) for _ in range(3)), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await flight.do("summary", fail)
+        return results, calls
+
+    results, calls = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) and str(result) == "Notion is down" for result in results)
+    assert len(calls) == 2
@@ -0,0 +1,52 @@
+import asyncio
+
+from fanout import fan_out, first_hit
+
+
+def test_higher_priority_hit_wins_over_an_earlier_lower_priority_hit():
+    async def scenario():
+        cancelled = []
+
+        async def branch(name, delay, result):
+            try:
+                await asyncio.sleep(delay)
+                return result
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+
+        result = await first_hit([branch("exact", 0.02, "exact"), branch("fuzzy", 0.0, "fuzzy"), branch("slow", 1.0, "slow")])
+        await asyncio.sleep(0)
+        return result, cancelled
+
+    assert asyncio.run(scenario()) == ("exact", ["slow"])
+
+
+def test_misses_and_failures_fall_through_to_the_next_branch():
+    async def scenario():
+        async def miss():
+            return None
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        async def hit():
+            await asyncio.sleep(0.01)
+            return "hit"
+
+        return await first_hit([miss(), fail(), hit()]), await first_hit([miss(), fail()])
+
+    assert asyncio.run(scenario()) == ("hit", None)
+
+
+def test_fan_out_leaves_out_failed_branches():
+    async def scenario():
+        async def value(v):
+            return v
+
+        async def fail():
+            raise RuntimeError("boom")
+
+        return await fan_out({"a": value(1), "b": fail(), "c": value(None)})
+
+    assert asyncio.run(scenario()) == {"a": 1, "c": None}
@@ -0,0 +1,66 @@
+import asyncio
+
+import http_server
+from http_server import Response
+
+
+async def _ok(request):
+    return Response.text("ok")
+
+
+async def _get(port: int) -> bytes:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET / HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    return data
+
+
+def test_serves_requests():
+    async def scenario():
+        server = await http_server.serve(_ok)
+        try:
+            return await _get(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+
+    response = asyncio.run(scenario())
+    assert response.startswith(b"HTTP/1.1 200 OK") and response.endswith(b"ok")
+
+
+def test_idle_and_slow_connections_are_closed():
+    async def scenario():
+        server = await http_server.serve(_ok, read_timeout=0.05)
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+            writer.write(b"GET / HTTP/1.1\r\n")  # never finishes the request
+            await writer.drain()
+            data = await asyncio.wait_for(reader.read(), 1.0)
+            writer.close()
+            return data
+        finally:
+            server.close()
+
+    assert asyncio.run(scenario()) == b""
+
+
+def test_connections_beyond_the_limit_are_refused():
+    async def scenario():
+        server = await http_server.serve(_ok, max_connections=1)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            _, idle_writer = await asyncio.open_connection("127.0.0.1", port)
+            await asyncio.sleep(0.05)
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            refused = await reader.read()
+            writer.close()
+            idle_writer.close()
+            await asyncio.sleep(0.05)
+            return refused, await _get(port)
+        finally:
+            server.close()
+
+    refused, served = asyncio.run(scenario())
+    assert refused.startswith(b"HTTP/1.1 503")
+    assert served.startswith(b"HTTP/1.1 200")
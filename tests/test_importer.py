@@ -0,0 +1,100 @@
+import asyncio
+
+from importer import MAX_RECORD_CHARS, ImportJournal, Importer, iter_records
+
+
+class FakeBot:
+    def __init__(self):
+        self.reports: list[str] = []
+
+    async def edit_message_text(self, chat_id: int, message_id: int, text: str):
+        self.reports.append(text)
+
+
+async def _wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.005)
+
+
+def test_resumed_import_counts_each_record_once(tmp_path, monkeypatch):
+    imported: list[str] = []
+
+    async def scenario():
+        resumed = asyncio.Event()
+
+        async def import_record(self, text):
+            if text == "record 6" and not resumed.is_set(): await asyncio.Event().wait()  # in flight when stopped
+            imported.append(text)
+            return text != "record 2"
+
+        monkeypatch.setattr(Importer, "_import_record", import_record)
+        bot, first = FakeBot(), Importer(str(tmp_path), concurrency=2, progress_seconds=60)
+        job = first.journal.start(1, "file-1", "unique-1", "notes.md", 50)
+        with open(first._path(job), "w") as f:
+            f.write("\n".join(f"- record {i}" for i in range(10)))
+        first.start(bot, job)
+        await _wait_for(lambda: {"record 7", "record 8", "record 9"} <= set(imported))
+        await first.stop()
+
+        resumed.set()
+        second = Importer(str(tmp_path), concurrency=2, progress_seconds=60)
+        assert second.resume(bot) == 1
+        await asyncio.gather(*second._tasks.values())
+        return bot, second.journal
+
+    bot, journal = asyncio.run(scenario())
+    row = journal._conn.execute("SELECT status, records_done, imported, failed FROM imports").fetchone()
+    assert tuple(row) == ("done", 10, 9, 1)
+    assert bot.reports[-1] == "✅ Imported notes.md\nAdded: 9, failed: 1"
+    # Records finished ahead of the stuck one were imported again on resume, but not counted twice.
+    assert imported.count("record 8") == 2 and imported.count("record 5") == 1
+
+
+def _records(tmp_path, name: str, content: str) -> tuple[list[str], int]:
+    path = tmp_path / name
+    path.write_text(content)
+    progress = [0]
+    return list(iter_records(str(path), name, progress)), progress[0]
+
+
+def test_markdown_records_carry_their_heading_and_skip_code_fences(tmp_path):
+    content = "# Groceries\n- [ ] Milk\n* Eggs\n\n```\n- not a record\n```\n## Reading\n1. SICP\nLoose line\n"
+    records, consumed = _records(tmp_path, "notes.md", content)
+    assert records == ["Groceries: Milk", "Groceries: Eggs", "Reading: SICP", "Reading: Loose line"]
+    assert consumed == len(content.encode())
+
+
+def test_csv_records_use_the_first_text_column(tmp_path):
+    records, _ = _records(tmp_path, "notes.csv", "id,Title,Note\n1,Ignored,Call the bank\n2,Plan trip,\n,,\n")
+    assert records == ["Call the bank", "Plan trip"]
+    records, _ = _records(tmp_path, "other.csv", "Who,What\nAda,Review draft\n")
+    assert records == ["Ada Review draft"]
+
+
+def test_jsonl_skips_malformed_and_empty_lines(tmp_path):
+    records, _ = _records(tmp_path, "notes.jsonl", '{"text": "Buy milk"}\n{broken\n\n"Just a string"\n{"other": "x", "more": "y"}\n')
+    assert records == ["Buy milk", "Just a string", "x y"]
+
+
+def test_long_records_are_cut(tmp_path):
+    records, _ = _records(tmp_path, "notes.txt", "x" * (MAX_RECORD_CHARS + 10))
+    assert records == ["x" * MAX_RECORD_CHARS]
+
+
+def test_journal_resumes_running_and_failed_imports_but_not_finished_ones(tmp_path):
+    journal = ImportJournal(str(tmp_path / "imports.db"))
+    job = journal.start(1, "file-1", "unique-1", "notes.md", 10)
+    journal.checkpoint(job["id"], 40, 38, 2)
+    journal.set_status(job["id"], "failed")
+
+    resumed = journal.start(1, "file-2", "unique-1", "notes.md", 11)
+    assert (resumed["id"], resumed["status"], resumed["records_done"], resumed["imported"], resumed["failed"]) == (job["id"], "running", 40, 38, 2)
+    assert (resumed["file_id"], resumed["message_id"]) == ("file-2", 11)
+    assert [row["id"] for row in journal.unfinished()] == [job["id"]]
+
+    assert journal.start(2, "file-1", "unique-1", "notes.md", 12)["id"] != job["id"]
+    journal.checkpoint(job["id"], 50, 47, 3, status="done")
+    fresh = journal.start(1, "file-3", "unique-1", "notes.md", 13)
+    assert fresh["id"] != job["id"] and fresh["records_done"] == 0
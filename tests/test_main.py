@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+import ai_handler
+import main
+import notion_handler
+
+
+class FakeBot:
+    """Records message edits; get_file returns a file at a fixed path."""
+
+    def __init__(self):
+        self.edits: list[str] = []
+
+    async def edit_message_text(self, text: str, **kwargs):
+        self.edits.append(text)
+
+    async def get_file(self, file_id: str):
+        return SimpleNamespace(file_path=f"https://files.test/{file_id}")
+
+
+def _run_capture(kind: str, payload: dict) -> list[str]:
+    bot = FakeBot()
+    item = {"id": 1, "kind": kind, "payload": payload, "chat_id": 10, "user_id": 7, "reply_message_id": 99}
+    asyncio.run(main.process_capture(SimpleNamespace(bot=bot), item))
+    return bot.edits
+
+
+def test_note_titles_are_escaped_in_the_reply(monkeypatch):
+    async def classify(text):
+        return {"category": "Resources", "title": text, "tags": [], "complexity": "simple"}
+
+    async def add_item(ai_result):
+        return "https://notion.so/p1"
+
+    monkeypatch.setattr(ai_handler, "process_text_with_ai", classify)
+    monkeypatch.setattr(notion_handler, "add_item_to_database", add_item)
+    assert _run_capture("text", {"text": "Compare <div> & <span>"}) == [
+        "✅ Added to <b>Resources</b>: <a href='https://notion.so/p1'>Compare &lt;div&gt; &amp; &lt;span&gt;</a>"]
+
+
+def test_media_captions_are_escaped_in_the_reply(monkeypatch):
+    async def add_content(title, content_url, content_type):
+        return "https://notion.so/p2"
+
+    monkeypatch.setattr(notion_handler, "add_content_to_resources", add_content)
+    assert _run_capture("media", {"media_type": "Photo", "caption": "Q&A <draft>", "file_id": "f1"}) == [
+        "✅ Saved Photo: <a href='https://notion.so/p2'>Q&amp;A &lt;draft&gt;</a>"]
+
+
+class FakeQuery:
+    def __init__(self, data: str):
+        self.data = data
+        self.edits: list[str] = []
+
+    async def answer(self):
+        pass
+
+    async def edit_message_text(self, text: str, **kwargs):
+        self.edits.append(text)
+
+
+def test_breakdown_sub_tasks_and_title_are_escaped(monkeypatch):
+    async def stream_breakdown(title):
+        for task in ["Compare <a> & <b>", "Decide"]:
+            yield task
+
+    monkeypatch.setattr(ai_handler, "stream_breakdown", stream_breakdown)
+    action_id = main.pending_actions.put(7, "project", {"project": {"category": "Projects", "title": "R&D <plan>", "tags": []}})
+    query = FakeQuery(f"breakdown_yes:{action_id}")
+    update = SimpleNamespace(callback_query=query, effective_user=SimpleNamespace(id=7))
+    asyncio.run(main.button_callback_handler(update, None))
+    assert query.edits[-1] == "Sub-tasks for <b>'R&amp;D &lt;plan&gt;'</b>:\n\n• Compare &lt;a&gt; &amp; &lt;b&gt;\n• Decide\n\nAdd them?"
@@ -0,0 +1,144 @@
+import asyncio
+
+import httpx
+
+import notion_handler
+from search_index import SearchIndex
+from title_index import TitleIndex
+
+
+class FakePages:
+    """Serves ``total`` numbered results in pages of the requested size, recording each request."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.requests: list[dict] = []
+
+    async def post(self, path: str, payload: dict) -> dict:
+        self.requests.append(dict(payload))
+        start = int(payload.get("start_cursor", 0))
+        end = min(start + payload["page_size"], self.total)
+        return {"results": [{"id": f"p{i}", "properties": {"Name": {}, "Tags": {}}} for i in range(start, end)],
+                "has_more": end < self.total, "next_cursor": str(end) if end < self.total else None}
+
+
+def _collect(iterator) -> list:
+    async def collect():
+        return [item async for item in iterator]
+    return asyncio.run(collect())
+
+
+def test_paginate_follows_the_cursor_to_the_end():
+    pages = FakePages(250)
+    results = _collect(notion_handler._paginate("/databases/db/query", {"filter": {}}, 100, None, pages.post))
+    assert [result["id"] for result in results] == [f"p{i}" for i in range(250)]
+    assert [request.get("start_cursor") for request in pages.requests] == [None, "100", "200"]
+    assert all(request["page_size"] == 100 and request["filter"] == {} for request in pages.requests)
+
+
+def test_paginate_asks_for_no_more_than_the_limit():
+    pages = FakePages(250)
+    results = _collect(notion_handler._paginate("/databases/db/query", {}, 100, 30, pages.post))
+    assert len(results) == 30
+    assert [request["page_size"] for request in pages.requests] == [30]
+
+
+def test_paginate_stops_fetching_when_the_caller_stops():
+    pages = FakePages(250)
+
+    async def first_page_only():
+        async for result in notion_handler._paginate("/databases/db/query", {}, 50, None, pages.post):
+            if result["id"] == "p10": break
+
+    asyncio.run(first_page_only())
+    assert len(pages.requests) == 1
+
+
+def test_iter_query_keeps_only_the_requested_properties(monkeypatch):
+    pages = FakePages(3)
+    monkeypatch.setattr(notion_handler, "_throttled_post", pages.post)
+    results = _collect(notion_handler.iter_query("db", properties=["Name"], throttled=True))
+    assert [result["properties"] for result in results] == [{"Name": {}}] * 3
+    assert pages.requests[0]["page_size"] == 100
+
+
+def test_find_waits_for_a_sync_write_without_blocking_the_loop(monkeypatch):
+    index = SearchIndex(":memory:")
+    index.upsert("p1", "Projects", "Garden plan", [], "", "https://notion.so/p1")
+    monkeypatch.setattr(notion_handler, "search_index", index)
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        index._lock.acquire()  # as a sync batch commit would hold it
+        find = asyncio.create_task(notion_handler.find_pages("garden"))
+        await asyncio.sleep(0.1)
+        index._lock.release()
+        results = await find
+        ticker.cancel()
+        return ticks, results
+
+    ticks, results = asyncio.run(scenario())
+    assert ticks >= 10
+    assert [result["title"] for result in results] == ["Garden plan"]
+
+
+class FakeWorkspace:
+    """Write queue and query endpoint over in-memory pages; creating a page titled ``applied_but_timed_out``
+    stores it but fails like a timed-out request."""
+
+    def __init__(self, applied_but_timed_out: str):
+        self.applied_but_timed_out = applied_but_timed_out
+        self.pages: dict[str, dict] = {}
+
+    def _apply(self, method: str, path: str, payload: dict) -> dict:
+        if method == "PATCH":
+            page = self.pages[path.rsplit("/", 1)[1]]
+            page.update(payload)
+            return page
+        page_id = f"page-{len(self.pages) + 1}"
+        page = self.pages[page_id] = {"id": page_id, "url": f"https://notion.so/{page_id}", "archived": False, **payload}
+        title = payload["properties"].get("Task Name", {}).get("title", [{}])[0].get("text", {}).get("content")
+        if title == self.applied_but_timed_out: raise httpx.ReadTimeout("timed out")
+        return page
+
+    async def submit(self, method: str, path: str, payload: dict | None = None, coalesce_key: str | None = None) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            future.set_result(self._apply(method, path, payload))
+        except httpx.HTTPError as e:
+            future.set_exception(e)
+        return future
+
+    async def request(self, method: str, path: str, payload: dict | None = None, coalesce_key: str | None = None) -> dict:
+        return await (await self.submit(method, path, payload, coalesce_key))
+
+    async def query(self, path: str, payload: dict) -> dict:
+        project_id = payload["filter"]["relation"]["contains"]
+        linked = [page for page in self.pages.values() if not page["archived"]
+                  and {"id": project_id} in page["properties"].get("Project", {}).get("relation", [])]
+        return {"results": linked, "has_more": False}
+
+
+def test_failed_task_rows_roll_back_the_project_and_every_linked_row(monkeypatch):
+    workspace = FakeWorkspace(applied_but_timed_out="Book hotel")
+    monkeypatch.setattr(notion_handler, "write_queue", workspace)
+    monkeypatch.setattr(notion_handler, "_throttled_post", workspace.query)
+    monkeypatch.setattr(notion_handler, "title_index", TitleIndex(":memory:"))
+    monkeypatch.setattr(notion_handler, "search_index", SearchIndex(":memory:"))
+    monkeypatch.setitem(notion_handler.DATABASE_IDS, "Projects", "db-projects")
+    monkeypatch.setitem(notion_handler.DATABASE_IDS, "Tasks", "db-tasks")
+
+    url = asyncio.run(notion_handler.add_project_with_tasks({"category": "Projects", "title": "Trip", "tags": []},
+                                                            ["Book flights", "Book hotel", "Pack"], as_task_rows=True))
+    assert url is None
+    assert len(workspace.pages) == 4
+    assert all(page["archived"] for page in workspace.pages.values())
+    assert notion_handler.title_index.lookup("Trip", ["Projects"]) is None
@@ -0,0 +1,94 @@
+import asyncio
+
+import outbox as outbox_module
+from outbox import Outbox
+
+
+def test_claim_takes_the_oldest_acknowledged_capture():
+    box = Outbox(":memory:")
+    first = box.append("text", {"text": "one"}, chat_id=1, user_id=7)
+    second = box.append("text", {"text": "two"}, chat_id=1)
+    box.set_reply(second, 11)
+    box.set_reply(first, 10)
+
+    item = box.claim()
+    assert (item["id"], item["payload"], item["attempts"], item["reply_message_id"]) == (first, {"text": "one"}, 1, 10)
+    assert box.claim()["id"] == second
+    assert box.claim() is None
+    assert box.backlog()["processing"] == 2
+
+
+def test_unacknowledged_capture_waits_for_the_orphan_grace_period(monkeypatch):
+    box = Outbox(":memory:")
+    box.append("text", {"text": "one"}, chat_id=1)
+    assert box.claim() is None
+
+    now = outbox_module.time.time()
+    monkeypatch.setattr(outbox_module.time, "time", lambda: now + outbox_module.ORPHAN_GRACE_SECONDS + 1)
+    assert box.claim() is not None
+
+
+def test_fail_backs_off_then_gives_up(monkeypatch):
+    box = Outbox(":memory:", max_attempts=2, retry_delay=5.0)
+    capture_id = box.append("link", {"url": "https://example.com"}, chat_id=1)
+    box.set_reply(capture_id, 10)
+
+    assert box.fail(box.claim(), "boom") is True
+    assert box.claim() is None  # not due for another 5 seconds
+    now = outbox_module.time.time()
+    monkeypatch.setattr(outbox_module.time, "time", lambda: now + 6)
+    item = box.claim()
+    assert item["attempts"] == 2
+    assert box.fail(item, "boom again") is False
+    assert box.backlog()["failed"] == 1
+    assert box.claim() is None
+
+
+def test_requeue_in_flight_replays_captures_after_a_restart(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    box = Outbox(path)
+    capture_id = box.append("text", {"text": "one"}, chat_id=1)
+    box.set_reply(capture_id, 10)
+    box.claim()
+
+    restarted = Outbox(path)
+    assert restarted.claim() is None
+    assert restarted.requeue_in_flight() == 1
+    item = restarted.claim()
+    assert (item["id"], item["attempts"]) == (capture_id, 2)
+
+
+def test_completed_captures_leave_the_backlog_and_are_pruned():
+    box = Outbox(":memory:")
+    capture_id = box.append("text", {"text": "one"}, chat_id=1)
+    box.set_reply(capture_id, 10)
+    box.complete(box.claim()["id"])
+    assert box.backlog() == {"pending": 0, "processing": 0, "failed": 0, "oldest_age": 0.0}
+    box.prune(older_than_seconds=-1)
+    assert box._conn.execute("SELECT COUNT(*) FROM captures").fetchone()[0] == 0
+
+
+def test_workers_retry_failed_captures_and_report_giving_up():
+    async def scenario():
+        box = Outbox(":memory:", max_attempts=2, retry_delay=0)
+        processed, given_up = [], []
+
+        async def processor(item):
+            processed.append((item["payload"]["text"], item["attempts"]))
+            if item["payload"]["text"] == "bad": raise RuntimeError("Notion write failed")
+
+        async def on_give_up(item, error):
+            given_up.append((item["payload"]["text"], error))
+
+        box.start(processor, on_give_up, workers=2)
+        for text in ("good", "bad"):
+            box.set_reply(box.append("text", {"text": text}, chat_id=1), 10)
+        for _ in range(200):
+            if given_up and box.backlog()["pending"] == box.backlog()["processing"] == 0: break
+            await asyncio.sleep(0.01)
+        await box.stop()
+        return processed, given_up
+
+    processed, given_up = asyncio.run(scenario())
+    assert sorted(processed) == [("bad", 1), ("bad", 2), ("good", 1)]
+    assert given_up == [("bad", "Notion write failed")]
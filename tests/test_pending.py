@@ -0,0 +1,69 @@
+import pending as pending_module
+from pending import PendingActions
+
+
+def test_get_and_pop_are_limited_to_the_owner_and_kind():
+    actions = PendingActions()
+    action_id = actions.put(7, "archive", {"page_id": "p1"})
+    assert len(action_id) == 8
+    assert actions.get(action_id, 8, "archive") is None
+    assert actions.get(action_id, 7, "project") is None
+    assert actions.get(action_id, 7, "archive") == {"page_id": "p1"}
+    assert actions.pop(action_id, 7, "archive") == {"page_id": "p1"}
+    assert actions.pop(action_id, 7, "archive") is None
+
+
+def test_update_keeps_the_id():
+    actions = PendingActions()
+    action_id = actions.put(7, "project", {"project": {"title": "Trip"}})
+    actions.update(action_id, {"project": {"title": "Trip"}, "tasks": ["Book"]})
+    assert actions.get(action_id, 7, "project")["tasks"] == ["Book"]
+
+
+def test_actions_expire(monkeypatch):
+    actions = PendingActions(ttl_seconds=60)
+    action_id = actions.put(7, "archive", {"page_id": "p1"})
+    now = pending_module.time.time()
+    monkeypatch.setattr(pending_module.time, "time", lambda: now + 61)
+    assert actions.get(action_id, 7, "archive") is None
+    assert actions.stats()["expired"] == 1
+    assert actions.stats()["entries"] == 0
+
+
+def test_least_recently_used_actions_are_evicted():
+    actions = PendingActions(max_entries=2)
+    first = actions.put(7, "archive", 1)
+    second = actions.put(7, "archive", 2)
+    actions.get(first, 7, "archive")
+    third = actions.put(7, "archive", 3)
+    assert actions.get(second, 7, "archive") is None
+    assert (actions.get(first, 7, "archive"), actions.get(third, 7, "archive")) == (1, 3)
+    assert actions.stats()["evicted"] == 1
+
+
+def test_actions_survive_a_restart(tmp_path):
+    path = str(tmp_path / "pending_actions.db")
+    actions = PendingActions(path)
+    kept = actions.put(7, "project", {"project": {"title": "Trip"}})
+    used = actions.put(7, "archive", {"page_id": "p1"})
+    actions.pop(used, 7, "archive")
+
+    restarted = PendingActions(path)
+    assert restarted.get(kept, 7, "project") == {"project": {"title": "Trip"}}
+    assert restarted.get(used, 7, "archive") is None
+
+
+def test_expired_and_excess_actions_are_dropped_on_load(tmp_path, monkeypatch):
+    path = str(tmp_path / "pending_actions.db")
+    actions = PendingActions(path, ttl_seconds=60)
+    old = actions.put(7, "archive", 1)
+    now = pending_module.time.time()
+    fresh = []
+    for i in range(3):
+        monkeypatch.setattr(pending_module.time, "time", lambda i=i: now + 61 + i)
+        fresh.append(actions.put(7, "archive", i))
+
+    restarted = PendingActions(path, ttl_seconds=60, max_entries=2)
+    assert restarted.get(old, 7, "archive") is None
+    assert restarted.get(fresh[0], 7, "archive") is None
+    assert restarted.stats()["entries"] == 2
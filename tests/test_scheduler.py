@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timezone
+
+from telegram import Chat, Message, Update
+
+from scheduler import ChatOrderedUpdateProcessor
+
+
+def _update(update_id: int, chat_id: int) -> Update:
+    message = Message(message_id=update_id, date=datetime.now(timezone.utc), chat=Chat(id=chat_id, type="private"))
+    return Update(update_id=update_id, message=message)
+
+
+async def _process(processor: ChatOrderedUpdateProcessor, updates: list[Update], handler) -> None:
+    # Mirrors Application._update_fetcher: one task per update, started in arrival order.
+    tasks = [asyncio.create_task(processor.process_update(update, handler(update))) for update in updates]
+    await asyncio.gather(*tasks)
+
+
+def test_updates_of_one_chat_run_in_order_one_at_a_time():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=4, max_chat_queue=20)
+        order, running = [], set()
+
+        async def handler(update):
+            assert update.effective_chat.id not in running
+            running.add(update.effective_chat.id)
+            await asyncio.sleep(0.001 * (update.update_id % 3))
+            order.append(update.update_id)
+            running.discard(update.effective_chat.id)
+
+        await _process(processor, [_update(i, 1) for i in range(10)], handler)
+        return order
+
+    assert asyncio.run(scenario()) == list(range(10))
+
+
+def test_chats_run_concurrently_up_to_the_limit():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=3, max_chat_queue=20)
+        running, peak = 0, 0
+
+        async def handler(update):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await _process(processor, [_update(i, chat_id) for i, chat_id in enumerate(range(10))], handler)
+        return peak
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_burst_beyond_the_chat_queue_is_held_back_not_dropped():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=4, max_chat_queue=5)
+        order = []
+
+        async def handler(update):
+            await asyncio.sleep(0)
+            order.append(update.update_id)
+
+        await _process(processor, [_update(i, 1) for i in range(30)], handler)
+        return order, processor.metrics()
+
+    order, metrics = asyncio.run(scenario())
+    assert order == list(range(30))
+    assert metrics["held_back"] == 25
+    assert metrics["wait_count"] == 30
+    assert (metrics["running"], metrics["queued"], metrics["chats"]) == (0, 0, 0)
+
+
+def test_a_flooding_chat_does_not_hold_up_other_chats():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=2, max_chat_queue=5)
+        finished = []
+
+        async def handler(update):
+            await asyncio.sleep(0.005)
+            finished.append(update.effective_chat.id)
+
+        # Chat 1 has four updates beyond its queue; all ten updates are within the admission bound of 2 * 5.
+        updates = [_update(i, 1) for i in range(9)] + [_update(100, 2)]
+        await _process(processor, updates, handler)
+        return finished, processor.metrics()
+
+    finished, metrics = asyncio.run(scenario())
+    assert metrics["held_back"] == 4
+    assert finished.index(2) < 2
+
+
+def test_updates_without_a_chat_still_run():
+    async def scenario():
+        processor = ChatOrderedUpdateProcessor(max_concurrent_updates=2, max_chat_queue=2)
+        done = []
+
+        async def handler():
+            done.append(True)
+
+        await processor.process_update(object(), handler())
+        return done
+
+    assert asyncio.run(scenario()) == [True]
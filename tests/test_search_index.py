@@ -0,0 +1,56 @@
+import sqlite3
+
+from search_index import SearchIndex
+
+
+def _titles(index: SearchIndex, text: str, **filters) -> list[str]:
+    return [result["title"] for result in index.search(text, **filters)]
+
+
+def test_upsert_replaces_the_page_document():
+    index = SearchIndex(":memory:")
+    index.upsert("p1", "Projects", "Garden plan", ["Home"], "tomatoes", "https://notion.so/p1")
+    index.upsert("p1", "Projects", "Garden redesign", ["Home"], "peppers", "https://notion.so/p1")
+    assert _titles(index, "garden") == ["Garden redesign"]
+    assert _titles(index, "tomatoes") == []
+    assert index.page_ids("Projects") == {"p1"}
+
+
+def test_upsert_many_writes_and_removes_in_one_call():
+    index = SearchIndex(":memory:")
+    index.upsert_many([("p1", "Areas", "Health", [], "", None), ("p2", "Areas", "Finance", ["Money"], "budget", None)])
+    index.upsert_many([("p3", "Areas", "Fitness", [], "", None)], removed=["p1"])
+    assert index.page_ids("Areas") == {"p2", "p3"}
+    assert _titles(index, "", tag="money") == ["Finance"]
+
+
+def test_append_body_and_remove():
+    index = SearchIndex(":memory:")
+    index.upsert("p1", "Resources", "Reading list", [], "first", None)
+    index.append_body("p1", "second")
+    index.append_body("missing", "ignored")
+    assert _titles(index, "second") == ["Reading list"]
+    index.remove("p1")
+    assert index.is_empty()
+
+
+def test_clear_forgets_one_category():
+    index = SearchIndex(":memory:")
+    index.upsert_many([("p1", "Areas", "Health", [], "", None), ("p2", "Projects", "Health app", [], "", None)])
+    index.clear("Areas")
+    assert _titles(index, "health") == ["Health app"]
+    index.upsert("p1", "Areas", "Health", [], "", None)
+    assert sorted(_titles(index, "health")) == ["Health", "Health app"]
+
+
+def test_existing_index_is_mapped_to_doc_ids(tmp_path):
+    path = str(tmp_path / "search_index.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE VIRTUAL TABLE docs USING fts5(title, tags, body, page_id UNINDEXED, url UNINDEXED, category UNINDEXED)")
+    conn.execute("INSERT INTO docs VALUES ('Old page', '', '', 'p1', NULL, 'Areas')")
+    conn.commit()
+    conn.close()
+
+    index = SearchIndex(path)
+    index.upsert("p1", "Areas", "New page", [], "", None)
+    assert _titles(index, "page") == ["New page"]
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import notion_handler
+from title_index import TitleIndex
+
+
+def _page(page_id: str, title: str, edited: str = "2026-01-01T00:00:00+00:00", **extra) -> dict:
+    return {"id": page_id, "url": f"https://notion.so/{page_id}", "last_edited_time": edited,
+            "properties": {"Name": {"title": [{"plain_text": title}]}}, **extra}
+
+
+def test_exact_and_casefold_lookup_follow_database_priority():
+    index = TitleIndex(":memory:")
+    index.upsert_pages("Areas", [_page("a1", "Health")])
+    index.upsert_pages("Projects", [_page("p1", "Health")])
+    assert index.lookup("Health", ["Projects", "Areas"])["page_id"] == "p1"
+    assert index.lookup("Health", ["Areas", "Projects"])["page_id"] == "a1"
+    assert index.lookup("health", ["Areas"]) is None
+    assert index.lookup("health", ["Areas"], match="casefold")["page_id"] == "a1"
+
+
+def test_prefix_lookup_prefers_the_shortest_title_and_escapes_wildcards():
+    index = TitleIndex(":memory:")
+    index.upsert_pages("Projects", [_page("p1", "Garden redesign"), _page("p2", "Garden"), _page("p3", "100% done")])
+    assert index.lookup("gard", ["Projects"], match="prefix")["page_id"] == "p2"
+    assert index.lookup("100%", ["Projects"], match="prefix")["page_id"] == "p3"
+    assert index.lookup("1_0", ["Projects"], match="prefix") is None
+
+
+def test_archived_pages_are_dropped():
+    index = TitleIndex(":memory:")
+    index.upsert_pages("Projects", [_page("p1", "Garden")])
+    index.upsert_pages("Projects", [_page("p1", "Garden", archived=True)])
+    assert index.lookup("Garden", ["Projects"]) is None
+    assert index.page_ids("Projects") == set()
+
+
+class FakeNotion:
+    """Answers throttled database queries from ``pages``, honouring the last_edited_time filter and page size."""
+
+    def __init__(self, pages: list[dict], fail_after: int | None = None):
+        self.pages = pages
+        self.fail_after = fail_after
+        self.queries: list[dict] = []
+
+    async def read(self, method: str, path: str, payload: dict | None = None, params: dict | None = None) -> dict:
+        self.queries.append(payload)
+        if self.fail_after is not None and len(self.queries) > self.fail_after: raise httpx.ConnectError("down")
+        pages = sorted(self.pages, key=lambda page: page["last_edited_time"])
+        since = payload.get("filter", {}).get("last_edited_time", {}).get("on_or_after")
+        if since: pages = [page for page in pages if datetime.fromisoformat(page["last_edited_time"]) >= datetime.fromisoformat(since)]
+        start = int(payload.get("start_cursor", 0))
+        end = start + payload["page_size"]
+        return {"results": pages[start:end], "has_more": end < len(pages), "next_cursor": str(end)}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = TitleIndex(":memory:")
+    monkeypatch.setattr(notion_handler, "title_index", index)
+    monkeypatch.setattr(notion_handler, "INDEXED_DATABASES", ["Projects"])
+    monkeypatch.setitem(notion_handler.DATABASE_IDS, "Projects", "db-projects")
+    return index
+
+
+def _edited(minutes_ago: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(minutes=minutes_ago)).isoformat()
+
+
+def test_incremental_sync_asks_only_for_pages_edited_since_the_cursor(index, monkeypatch):
+    notion = FakeNotion([_page("p1", "Garden", _edited(60)), _page("p2", "Kitchen", _edited(30))])
+    monkeypatch.setattr(notion_handler.write_queue, "read", notion.read)
+    asyncio.run(notion_handler.sync_title_index(full=True))
+    assert index.page_ids("Projects") == {"p1", "p2"}
+    assert "filter" not in notion.queries[0]
+    cursor = index.last_synced("Projects")
+
+    notion.pages = [_page("p1", "Garden", _edited(60)), _page("p2", "Kitchen remodel", _edited(0))]
+    asyncio.run(notion_handler.sync_title_index())
+    assert notion.queries[-1]["filter"]["last_edited_time"]["on_or_after"] < cursor
+    assert notion.queries[-1]["sorts"] == [{"timestamp": "last_edited_time", "direction": "ascending"}]
+    assert index.lookup("Kitchen remodel", ["Projects"])["page_id"] == "p2"
+    assert index.lookup("Garden", ["Projects"])["page_id"] == "p1"
+    assert index.last_synced("Projects") > cursor
+
+
+def test_failed_crawl_keeps_the_cursor_of_the_last_stored_batch(index, monkeypatch):
+    pages = [_page(f"p{i}", f"Page {i}", _edited(300 - i)) for i in range(150)]
+    notion = FakeNotion(pages, fail_after=1)
+    monkeypatch.setattr(notion_handler.write_queue, "read", notion.read)
+    asyncio.run(notion_handler.sync_title_index(full=True))
+    assert len(index.page_ids("Projects")) == 100
+    assert index.last_synced("Projects") == pages[99]["last_edited_time"]
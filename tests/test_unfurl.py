@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+import http_server
+from ai_cache import AICache
+from http_server import Response
+from unfurl import Unfurler, canonical_url, check_public, dedup_keys
+
+
+def test_canonical_url_drops_tracking_and_cosmetic_differences():
+    assert canonical_url("HTTPS://www.Example.com:443/a/?utm_source=x&b=2&a=1#top") == "https://example.com/a?a=1&b=2"
+
+
+def test_same_link_with_tracking_parameters_dedups():
+    assert dedup_keys("https://example.com/post?utm_medium=social") == dedup_keys("https://www.example.com/post/")
+
+
+def test_pages_sharing_generic_metadata_are_not_duplicates():
+    preview = {"title": "Example — the app for everything", "description": "Sign in to see everything Example has to offer you today."}
+    assert not set(dedup_keys("https://example.com/a", preview)) & set(dedup_keys("https://example.com/b", preview))
+
+
+def test_canonical_pointing_at_the_homepage_is_ignored():
+    home = {"canonical_url": "https://example.com/", "final_url": "https://example.com/a"}
+    assert not set(dedup_keys("https://example.com/a", home)) & set(dedup_keys("https://example.com/"))
+    assert not set(dedup_keys("https://example.com/a", home)) & set(dedup_keys("https://example.com/b", {**home, "final_url": "https://example.com/b"}))
+
+
+def test_canonical_on_another_host_is_ignored():
+    assert len(dedup_keys("https://example.com/a", {"canonical_url": "https://other.example/a"})) == 1
+
+
+def test_same_site_alias_dedups():
+    preview = {"final_url": "https://example.com/articles/42", "canonical_url": "https://example.com/articles/42-title"}
+    assert set(dedup_keys("https://example.com/articles/42-title")) < set(dedup_keys("https://example.com/a/42", preview))
+
+
+@pytest.mark.parametrize("url", ["http://127.0.0.1:9100/metrics", "http://localhost/", "http://169.254.169.254/latest/meta-data/",
+                                 "http://10.0.0.5/", "http://[::1]/", "file:///etc/passwd"])
+def test_non_public_urls_are_refused(url):
+    with pytest.raises(ValueError):
+        asyncio.run(check_public(url))
+
+
+def test_allowed_hosts_are_not_checked():
+    asyncio.run(check_public("http://127.0.0.1:8080/", frozenset({"127.0.0.1"})))
+
+
+def _unfurl(url: str, allowed_hosts: list[str]) -> dict | None:
+    async def page(request):
+        if request.path == "/redirect": return Response(302, headers={"Location": "http://169.254.169.254/"})
+        return Response.text("<html><head><title>Local page</title></head><body></body></html>", content_type="text/html")
+
+    async def scenario():
+        server = await http_server.serve(page)
+        unfurler = Unfurler(AICache(":memory:"), allowed_hosts=allowed_hosts)
+        try:
+            return await unfurler.unfurl(url.format(port=server.sockets[0].getsockname()[1]))
+        finally:
+            await unfurler.aclose()
+            server.close()
+
+    return asyncio.run(scenario())
+
+
+def test_unfurl_refuses_local_pages_unless_allowed():
+    assert _unfurl("http://127.0.0.1:{port}/page", []) is None
+    assert _unfurl("http://127.0.0.1:{port}/page", ["127.0.0.1"])["title"] == "Local page"
+
+
+def test_unfurl_checks_every_redirect():
+    assert _unfurl("http://127.0.0.1:{port}/redirect", ["127.0.0.1"]) is None
@@ -0,0 +1,63 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import webhook
+from benchmarks.stubs import FakeTelegramSender
+
+
+SECRET = "s3cret"
+
+
+def _message(update_id: int) -> dict:
+    return {"update_id": update_id, "message": {"message_id": update_id, "date": 0, "chat": {"id": 1, "type": "private"}, "text": "hi"}}
+
+
+def _post(body, secret: str | None = SECRET, raw: bytes | None = None) -> tuple[int, list]:
+    """POSTs ``body`` (or ``raw`` bytes) to a webhook endpoint; returns the status and the queued update ids."""
+    async def scenario():
+        application = SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+        server = await webhook.serve(application, "127.0.0.1", 0, "/telegram", SECRET)
+        url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/telegram"
+        try:
+            if raw is not None:
+                async with httpx.AsyncClient() as client:
+                    status = (await client.post(url, content=raw, headers={webhook.SECRET_HEADER: secret.encode()})).status_code
+            else:
+                sender = FakeTelegramSender(url, secret)
+                status = await sender.send(body)
+                await sender.aclose()
+        finally:
+            server.close()
+        queued = []
+        while not application.update_queue.empty(): queued.append(application.update_queue.get_nowait().update_id)
+        return status, queued
+
+    return asyncio.run(scenario())
+
+
+def test_single_and_batched_updates_are_queued():
+    assert _post(_message(1)) == (200, [1])
+    assert _post([_message(2), _message(3)]) == (200, [2, 3])
+
+
+@pytest.mark.parametrize("secret", [None, "wrong"])
+def test_missing_or_wrong_secret_is_forbidden(secret):
+    assert _post(_message(1), secret=secret) == (403, [])
+
+
+def test_non_ascii_secret_is_forbidden():
+    assert _post(None, secret="s3crét", raw=json.dumps(_message(1)).encode()) == (403, [])
+
+
+def test_malformed_body_is_rejected():
+    assert _post(None, raw=b"{not json") == (400, [])
+    assert _post([{"message": "no update id"}]) == (400, [])
+
+
+def test_a_secret_is_required():
+    with pytest.raises(ValueError):
+        webhook.make_handler(SimpleNamespace(), "/telegram", "")
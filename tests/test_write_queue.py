@@ -0,0 +1,144 @@
+import asyncio
+
+import httpx
+import pytest
+
+from write_queue import NotionWriteQueue
+
+
+def _status_error(status: int, headers: dict | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "https://notion.test/v1/pages")
+    return httpx.HTTPStatusError(f"{status}", request=request, response=httpx.Response(status, headers=headers, request=request))
+
+
+class FakeClient:
+    """Records requests; ``failures`` are raised (in order) before requests start succeeding."""
+
+    def __init__(self, failures: list[Exception] | None = None):
+        self.failures = list(failures or [])
+        self.calls: list[tuple[str, str, dict | None]] = []
+
+    async def request(self, method: str, path: str, payload: dict | None = None, params: dict | None = None) -> dict:
+        self.calls.append((method, path, payload))
+        if self.failures: raise self.failures.pop(0)
+        return {"object": "page", "id": f"page-{len(self.calls)}"}
+
+
+def _queue(client: FakeClient, **kwargs) -> NotionWriteQueue:
+    return NotionWriteQueue(client, rate=1000, burst=1000, base_delay=0.001, max_delay=0.01, **kwargs)
+
+
+def _note(text: str) -> dict:
+    return {"children": [{"type": "paragraph", "paragraph": {"rich_text": [{"text": {"content": text}}]}}]}
+
+
+def test_appends_to_the_same_page_are_coalesced():
+    async def scenario():
+        client = FakeClient()
+        queue = _queue(client, workers=1)
+        futures = [await queue.submit("PATCH", "/blocks/p1/children", _note(text), coalesce_key="append:p1") for text in "abc"]
+        results = await asyncio.gather(*futures)
+        await queue.drain()
+        return client, results
+
+    client, results = asyncio.run(scenario())
+    assert len(client.calls) == 1
+    assert [child["paragraph"]["rich_text"][0]["text"]["content"] for child in client.calls[0][2]["children"]] == ["a", "b", "c"]
+    assert results == [results[0]] * 3
+
+
+def test_appends_to_other_pages_are_not_coalesced():
+    async def scenario():
+        client = FakeClient()
+        queue = _queue(client, workers=1)
+        futures = [await queue.submit("PATCH", f"/blocks/{page}/children", _note(page), coalesce_key=f"append:{page}") for page in ("p1", "p2")]
+        await asyncio.gather(*futures)
+        await queue.drain()
+        return client
+
+    assert [call[1] for call in asyncio.run(scenario()).calls] == ["/blocks/p1/children", "/blocks/p2/children"]
+
+
+def test_rate_limited_write_is_retried_after_retry_after(monkeypatch):
+    sleeps = []
+    real_sleep = asyncio.sleep
+    async def fake_sleep(delay, *args):
+        sleeps.append(delay)
+        await real_sleep(0)
+    monkeypatch.setattr(asyncio, "sleep", fake_sleep)
+
+    client = FakeClient([_status_error(429, {"Retry-After": "7"})])
+    result = asyncio.run(_queue(client).request("POST", "/pages", {}))
+    assert result["id"] == "page-2"
+    assert len(client.calls) == 2
+    assert 7.0 in sleeps
+
+
+@pytest.mark.parametrize("error", [_status_error(500), _status_error(502), httpx.ReadTimeout("timed out")])
+def test_page_creation_is_not_repeated_when_it_may_have_been_applied(error):
+    client = FakeClient([error])
+    with pytest.raises(type(error)):
+        asyncio.run(_queue(client).request("POST", "/pages", {}))
+    assert len(client.calls) == 1
+
+
+def test_append_is_not_repeated_after_a_timeout():
+    client = FakeClient([httpx.ReadTimeout("timed out")])
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(_queue(client).request("PATCH", "/blocks/p1/children", _note("a"), coalesce_key="append:p1"))
+    assert len(client.calls) == 1
+
+
+def test_connection_failures_are_retried_for_any_write():
+    client = FakeClient([httpx.ConnectError("refused")])
+    asyncio.run(_queue(client).request("POST", "/pages", {}))
+    assert len(client.calls) == 2
+
+
+@pytest.mark.parametrize("error", [_status_error(502), httpx.ReadTimeout("timed out")])
+def test_idempotent_page_update_is_retried(error):
+    client = FakeClient([error])
+    asyncio.run(_queue(client).request("PATCH", "/pages/p1", {"archived": True}))
+    assert len(client.calls) == 2
+
+
+def test_gives_up_after_max_retries():
+    client = FakeClient([_status_error(429)] * 3)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(_queue(client, max_retries=2).request("POST", "/pages", {}))
+    assert len(client.calls) == 3
+
+
+def test_client_errors_are_not_retried():
+    client = FakeClient([_status_error(400)])
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(_queue(client).request("PATCH", "/pages/p1", {}))
+    assert len(client.calls) == 1
+
+
+def test_queue_restarts_on_a_new_loop():
+    client = FakeClient()
+    queue = _queue(client)
+    asyncio.run(queue.request("POST", "/pages", {}))
+    asyncio.run(queue.request("POST", "/pages", {}))
+    assert len(client.calls) == 2
+
+
+def test_queue_refuses_a_second_loop_while_running():
+    client = FakeClient()
+    queue = _queue(client)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(queue.request("POST", "/pages", {}))
+        with pytest.raises(RuntimeError):
+            asyncio.run(queue.request("POST", "/pages", {}))
+        loop.run_until_complete(queue.drain())
+    finally:
+        loop.close()
+
+
+def test_reads_are_retried_on_server_errors_and_timeouts():
+    client = FakeClient([_status_error(502), httpx.ReadTimeout("timed out")])
+    result = asyncio.run(_queue(client).read("POST", "/databases/db/query", {"page_size": 100}))
+    assert result["id"] == "page-3"
+    assert len(client.calls) == 3
@@ -0,0 +1,99 @@
+import json
+import logging
+import sqlite3
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    page_id TEXT PRIMARY KEY,
+    db_name TEXT NOT NULL,
+    title TEXT NOT NULL,
+    title_folded TEXT NOT NULL,
+    url TEXT,
+    properties TEXT NOT NULL,
+    last_edited_time TEXT
+);
+CREATE INDEX IF NOT EXISTS pages_title ON pages (title);
+CREATE INDEX IF NOT EXISTS pages_title_folded ON pages (title_folded);
+CREATE TABLE IF NOT EXISTS sync_state (
+    db_name TEXT PRIMARY KEY,
+    last_synced TEXT NOT NULL
+);
+"""
+
+
+def page_title(page: dict, property_name: str = "Name") -> str:
+    """Joins the plain text of a page's title property."""
+    return "".join(part.get("plain_text") or part.get("text", {}).get("content", "") for part in page.get("properties", {}).get(property_name, {}).get("title", []))
+
+
+class TitleIndex:
+    """Local SQLite mirror of title -> page_id/url/properties for the PARA databases."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def upsert_pages(self, db_name: str, pages: list[dict]) -> None:
+        """Stores Notion page objects; archived or trashed pages are dropped from the index."""
+        live = [page for page in pages if not page.get("archived") and not page.get("in_trash")]
+        gone = [(page["id"],) for page in pages if page.get("archived") or page.get("in_trash")]
+        rows = []
+        for page in live:
+            title = page_title(page)
+            rows.append((page["id"], db_name, title, title.casefold(), page.get("url"), json.dumps(page.get("properties", {})), page.get("last_edited_time")))
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.executemany("DELETE FROM pages WHERE page_id = ?", gone)
+
+    def remove(self, page_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE page_id = ?", (page_id,))
+
+    def page_ids(self, db_name: str) -> set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT page_id FROM pages WHERE db_name = ?", (db_name,))}
+
+    def lookup(self, title: str, db_names: list[str], match: str = "exact") -> dict | None:
+        """Finds a page by title in ``db_names`` (in priority order).
+
+        ``match`` is "exact", "casefold" (exact first, then case-insensitive) or "prefix"
+        (case-insensitive prefix, shortest title first).
+        """
+        if match == "casefold":
+            return self.lookup(title, db_names) or self._lookup("title_folded = ?", title.casefold(), db_names)
+        if match == "prefix":
+            escaped = title.casefold().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            return self._lookup("title_folded LIKE ? ESCAPE '\\'", escaped + "%", db_names, "length(title), ")
+        return self._lookup("title = ?", title, db_names)
+
+    def _lookup(self, condition: str, value: str, db_names: list[str], extra_order: str = "") -> dict | None:
+        if not db_names: return None
+        priority = " ".join(f"WHEN ? THEN {i}" for i in range(len(db_names)))
+        placeholders = ", ".join("?" for _ in db_names)
+        sql = (f"SELECT page_id, url, properties FROM pages WHERE {condition} AND db_name IN ({placeholders}) "
+               f"ORDER BY CASE db_name {priority} END, {extra_order}last_edited_time DESC LIMIT 1")
+        with self._lock:
+            row = self._conn.execute(sql, (value, *db_names, *db_names)).fetchone()
+        if not row: return None
+        return {"page_id": row[0], "url": row[1], "properties": json.loads(row[2])}
+
+    def last_synced(self, db_name: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT last_synced FROM sync_state WHERE db_name = ?", (db_name,)).fetchone()
+        return row[0] if row else None
+
+    def set_last_synced(self, db_name: str, timestamp: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (db_name, timestamp))
+
+    def clear(self, db_name: str) -> None:
+        """Forgets a database's pages and sync cursor so the next sync is a full crawl."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM pages WHERE db_name = ?", (db_name,))
+            self._conn.execute("DELETE FROM sync_state WHERE db_name = ?", (db_name,))
@@ -0,0 +1,213 @@
+import asyncio
+import codecs
+import hashlib
+import ipaddress
+import logging
+import socket
+import sqlite3
+import threading
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import httpx
+
+import metrics
+from ai_cache import AICache
+
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track where a click came from; they don't change the page.
+TRACKING_PARAMS = {"fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "ref", "ref_src", "si"}
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+USER_AGENT = "Mozilla/5.0 (compatible; PARA-AI link preview)"
+MAX_REDIRECTS = 5
+
+
+def canonical_url(url: str) -> str:
+    """Normalizes a URL for comparison: lower-case host without www/default port, no fragment,
+    no tracking parameters, sorted query and no trailing slash."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower() or "https"
+    host = (parts.hostname or "").lower().removeprefix("www.")
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)): host += f":{parts.port}"
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS)
+    path = parts.path.rstrip("/") or ""
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def _is_alias(url: str, other: str) -> bool:
+    """Whether ``other`` (where ``url`` redirected to, or the canonical URL its page declares) may
+    stand in for it: same host, and not a deeper page collapsed onto the site's root."""
+    requested, alias = urlsplit(canonical_url(url)), urlsplit(canonical_url(other))
+    return requested.netloc == alias.netloc and (bool(alias.path) or not requested.path)
+
+
+def dedup_keys(url: str, preview: dict | None = None) -> list[str]:
+    """Hashes identifying a link: its canonical URL, plus the page's final and declared canonical
+    URLs when they are aliases of it on the same site.
+
+    Page titles and descriptions aren't used; many sites give every page the same ones.
+    """
+    urls = {canonical_url(url)}
+    if preview:
+        urls.update(canonical_url(other) for other in (preview.get("final_url"), preview.get("canonical_url")) if other and _is_alias(url, other))
+    return [hashlib.sha256(f"url\x1f{other}".encode()).hexdigest() for other in sorted(urls)]
+
+
+async def check_public(url: str, allowed_hosts: frozenset[str] = frozenset()) -> None:
+    """Raises ``ValueError`` unless the URL is http(s) and its host resolves only to public addresses.
+
+    Keeps link previews from reaching loopback, private or link-local services (e.g. the metrics
+    endpoint or a cloud metadata address). Hosts in ``allowed_hosts`` are not checked.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"): raise ValueError(f"unsupported scheme {parts.scheme!r}")
+    host = (parts.hostname or "").lower()
+    if not host: raise ValueError("no host in URL")
+    if host in allowed_hosts: return
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, parts.port or 443, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise ValueError(f"can't resolve {host}: {e}") from e
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if not address.is_global or address.is_multicast: raise ValueError(f"{host} resolves to non-public address {address}")
+
+
+# --- Metadata Parsing ---
+class _HeadParser(HTMLParser):
+    """Collects <title>, OpenGraph/Twitter/description meta tags and rel=canonical until the head ends."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta: dict[str, str] = {}
+        self.title = ""
+        self.canonical: str | None = None
+        self.done = False
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        if tag == "title": self._in_title = True
+        elif tag == "meta":
+            name = (attrs.get("property") or attrs.get("name") or "").lower()
+            if name in ("og:title", "og:description", "og:site_name", "og:image", "og:url", "twitter:title", "twitter:description", "description") and attrs.get("content"):
+                self.meta.setdefault(name, attrs["content"].strip())
+        elif tag == "link" and "canonical" in attrs.get("rel", "").lower().split() and attrs.get("href"):
+            self.canonical = attrs["href"]
+        elif tag == "body": self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title": self._in_title = False
+        elif tag == "head": self.done = True
+
+    def handle_data(self, data):
+        if self._in_title: self.title += data
+
+    def preview(self, final_url: str) -> dict:
+        title = self.meta.get("og:title") or self.meta.get("twitter:title") or " ".join(self.title.split())
+        canonical = self.meta.get("og:url") or self.canonical
+        return {"title": title or None, "description": self.meta.get("og:description") or self.meta.get("twitter:description") or self.meta.get("description"),
+                "site_name": self.meta.get("og:site_name"), "image": urljoin(final_url, self.meta["og:image"]) if self.meta.get("og:image") else None,
+                "canonical_url": urljoin(final_url, canonical) if canonical else None, "final_url": final_url}
+
+
+# --- Unfurler ---
+class Unfurler:
+    """Fetches link previews: at most ``max_bytes`` of each page are streamed through an incremental
+    parser that stops at the end of <head>. Each fetch has a hard ``timeout``, at most ``per_host``
+    fetches run against one host at a time, and previews are cached by canonical URL.
+
+    Only public addresses are fetched; the URL and every redirect are checked with ``check_public``
+    (hosts in ``allowed_hosts`` are exempt).
+    """
+
+    def __init__(self, cache: AICache, timeout: float = 3.0, max_bytes: int = 32 * 1024, per_host: int = 2, allowed_hosts: list[str] | None = None):
+        self.cache = cache
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.per_host = per_host
+        self.allowed_hosts = frozenset(host.lower() for host in allowed_hosts or [])
+        self._client: httpx.AsyncClient | None = None
+        self._hosts: dict[str, list] = {}  # host -> [semaphore, callers using it]
+
+    async def unfurl(self, url: str) -> dict | None:
+        """Returns {"title", "description", "site_name", "image", "canonical_url", "final_url"}, or None if the page couldn't be read."""
+        key = hashlib.sha256(f"unfurl\x1f{canonical_url(url)}".encode()).hexdigest()
+        cached = self.cache.get(key)
+        if cached: return cached
+        host = urlsplit(url).hostname or ""
+        entry = self._hosts.setdefault(host, [asyncio.Semaphore(self.per_host), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                with metrics.span("unfurl", "fetch"):
+                    preview = await asyncio.wait_for(self._fetch(url), self.timeout)
+        except (httpx.HTTPError, asyncio.TimeoutError, ValueError) as e:
+            logger.info(f"Couldn't unfurl {url}: {e!r}")
+            return None
+        finally:
+            entry[1] -= 1
+            if not entry[1]: del self._hosts[host]
+        self.cache.set(key, preview)
+        return preview
+
+    async def _fetch(self, url: str) -> dict:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml"})
+        # Redirects are followed by hand so that every hop is checked before it is requested.
+        for _ in range(MAX_REDIRECTS + 1):
+            await check_public(url, self.allowed_hosts)
+            async with self._client.stream("GET", url) as response:
+                if response.is_redirect and response.headers.get("location"):
+                    url = urljoin(str(response.url), response.headers["location"])
+                    continue
+                response.raise_for_status()
+                return await self._read_head(response)
+        raise ValueError(f"more than {MAX_REDIRECTS} redirects")
+
+    async def _read_head(self, response: httpx.Response) -> dict:
+        final_url = str(response.url)
+        if response.headers.get("content-type", "text/html").split(";")[0].strip().lower() not in HTML_TYPES:
+            return {"title": None, "description": None, "site_name": None, "image": None, "canonical_url": None, "final_url": final_url}
+        try:
+            decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        parser, read = _HeadParser(), 0
+        async for chunk in response.aiter_bytes():
+            chunk = chunk[:self.max_bytes - read]
+            read += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if parser.done or read >= self.max_bytes: break
+        return parser.preview(final_url)
+
+    async def aclose(self) -> None:
+        if self._client is not None: await self._client.aclose()
+
+
+# --- Dedup Index ---
+class LinkIndex:
+    """SQLite map of link dedup keys to the Resources page each link was saved on."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS links (key TEXT PRIMARY KEY, page_id TEXT NOT NULL, url TEXT)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS links_page ON links (page_id)")
+
+    def lookup(self, keys: list[str]) -> dict | None:
+        if not keys: return None
+        with self._lock:
+            row = self._conn.execute(f"SELECT page_id, url FROM links WHERE key IN ({','.join('?' * len(keys))}) LIMIT 1", keys).fetchone()
+        return {"page_id": row[0], "url": row[1]} if row else None
+
+    def add(self, keys: list[str], page_id: str, url: str | None) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO links VALUES (?, ?, ?)", [(key, page_id, url) for key in keys])
+
+    def remove_page(self, page_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM links WHERE page_id = ?", (page_id,))
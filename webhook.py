@@ -0,0 +1,83 @@
+import asyncio
+import hmac
+import logging
+import signal
+
+from telegram import Update
+from telegram.ext import Application
+
+import http_server
+import metrics
+from http_server import Request, Response
+
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+
+def make_handler(application: Application, path: str, secret_token: str):
+    """HTTP handler that checks the secret token and queues the posted update(s) for the bot.
+
+    The body may hold one update or a JSON array of updates. Updates are put on
+    ``application.update_queue`` and acknowledged right away; handlers run afterwards.
+    Raises ``ValueError`` without a secret token, since anyone could then post updates.
+    """
+    if not secret_token: raise ValueError("A webhook secret token is required.")
+
+    async def handle(request: Request) -> Response:
+        if request.path != path: return Response.text("Not Found", status=404)
+        if request.method != "POST": return Response.text("Method Not Allowed", status=405)
+        # Compared as bytes: compare_digest refuses str with non-ASCII characters.
+        if not hmac.compare_digest(request.headers.get(SECRET_HEADER, "").encode(), secret_token.encode()):
+            logger.warning("Rejected webhook request with a missing or wrong secret token.")
+            return Response.text("Forbidden", status=403)
+        with metrics.span("webhook", "ack"):
+            try:
+                data = request.json()
+                updates = [Update.de_json(item, application.bot) for item in (data if isinstance(data, list) else [data])]
+            except (ValueError, TypeError, KeyError, AttributeError) as e:
+                logger.warning(f"Rejected malformed webhook body: {e}")
+                return Response.text("Bad Request", status=400)
+            for update in updates:
+                if update is not None: application.update_queue.put_nowait(update)
+        return Response(200)
+    return handle
+
+
+async def serve(application: Application, host: str, port: int, path: str, secret_token: str) -> asyncio.Server:
+    """Starts the webhook endpoint on the running loop; returns the server."""
+    server = await http_server.serve(make_handler(application, path, secret_token), host, port)
+    logger.info(f"Listening for webhook updates on http://{host}:{server.sockets[0].getsockname()[1]}{path}")
+    return server
+
+
+async def run(application: Application, host: str, port: int, path: str, secret_token: str, webhook_url: str | None,
+              max_connections: int = 40, on_startup=None, on_shutdown=None) -> None:
+    """Runs the bot on webhooks until SIGINT/SIGTERM, mirroring ``Application.run_polling``'s lifecycle.
+
+    ``webhook_url`` is registered with Telegram (with the secret token); leave it unset when the
+    webhook is managed elsewhere.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except NotImplementedError:
+            pass
+    await application.initialize()
+    if on_startup: await on_startup(application)
+    server = await serve(application, host, port, path, secret_token)
+    try:
+        if webhook_url:
+            await application.bot.set_webhook(webhook_url, secret_token=secret_token, max_connections=max_connections, allowed_updates=Update.ALL_TYPES)
+            logger.info(f"Registered webhook {webhook_url}")
+        await application.start()
+        await stop.wait()
+    finally:
+        server.close()
+        if application.running: await application.stop()
+        await application.shutdown()
+        if on_shutdown: await on_shutdown(application)
+
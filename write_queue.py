@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import httpx
+
+import metrics
+from notion_client import NotionClient
+
+
+logger = logging.getLogger(__name__)
+
+# Notion accepts at most 100 children per append request.
+MAX_APPEND_CHILDREN = 100
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class _WriteOp:
+    method: str
+    path: str
+    payload: dict | None
+    coalesce_key: str | None
+    futures: list[asyncio.Future] = field(default_factory=list)
+
+
+def _is_idempotent(method: str, path: str) -> bool:
+    """Whether sending the request twice is harmless; creating pages and appending blocks are not."""
+    return method in ("GET", "DELETE") or (method == "PATCH" and not path.endswith("/children"))
+
+
+def _is_retryable(error: httpx.HTTPError, idempotent: bool) -> bool:
+    # A 429 or a failure to connect means Notion never applied the request; a timeout or a 5xx
+    # may come after it did, so those are only retried when repeating the request is harmless.
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or (idempotent and error.response.status_code >= 500)
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)): return True
+    return idempotent and isinstance(error, httpx.TransportError)
+
+
+def _retry_after(error: httpx.HTTPError) -> float | None:
+    if not isinstance(error, httpx.HTTPStatusError): return None
+    try:
+        return float(error.response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+class NotionWriteQueue:
+    """Background queue for Notion writes with rate limiting, retries and append coalescing.
+
+    Writes wait on a shared token bucket and are retried with exponential backoff (honouring
+    ``Retry-After``): 429s and connection failures always, 5xx and timeouts only for writes that
+    are safe to repeat. Queued block appends to the same page are merged into one
+    ``blocks/{id}/children`` PATCH. The queue serves one event loop at a time.
+    """
+
+    def __init__(self, client: NotionClient, rate: float = 3.0, burst: float = 3.0, workers: int = 3,
+                 max_retries: int = 5, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.client = client
+        self.bucket = TokenBucket(rate, burst)
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._queue: deque[_WriteOp] = deque()
+        self._wakeup: asyncio.Condition | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._active = 0
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        running = bool(self._tasks) and not self._loop.is_closed() and not all(task.done() for task in self._tasks)
+        if running and self._loop is loop: return
+        # The workers, their condition, the bucket's lock and the callers' futures all belong to one loop.
+        if running: raise RuntimeError("The Notion write queue is already running on another event loop.")
+        if self._loop is not loop: self.bucket = TokenBucket(self.bucket.rate, self.bucket.capacity)
+        self._loop = loop
+        self._wakeup = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker(), name=f"notion-writer-{i}") for i in range(self.workers)]
+
+    async def submit(self, method: str, path: str, payload: dict | None = None, coalesce_key: str | None = None) -> asyncio.Future:
+        """Queues a write and returns a future for its JSON response; await it for the final result."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append(_WriteOp(method, path, payload, coalesce_key, [future]))
+        async with self._wakeup:
+            self._wakeup.notify()
+        return future
+
+    async def request(self, method: str, path: str, payload: dict | None = None, coalesce_key: str | None = None) -> dict:
+        """Queues a write and waits for it to finish."""
+        return await (await self.submit(method, path, payload, coalesce_key))
+
+    async def read(self, method: str, path: str, payload: dict | None = None, params: dict | None = None) -> dict:
+        """Sends a read straight away (not queued) under the same rate limit, retrying any retryable failure."""
+        self._ensure_started()
+        return await self._call(method, path, payload, params, idempotent=True)
+
+    def pending(self) -> int:
+        return len(self._queue) + self._active
+
+    async def drain(self, timeout: float = 10.0) -> None:
+        """Waits (up to ``timeout``) for queued writes to finish, then stops the workers."""
+        deadline = time.monotonic() + timeout
+        while self.pending() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self.pending(): logger.warning(f"Stopping Notion write queue with {self.pending()} write(s) unfinished.")
+        for task in self._tasks: task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _take(self) -> _WriteOp:
+        op = self._queue.popleft()
+        if op.coalesce_key is None: return op
+        children = list(op.payload.get("children", []))
+        merged = _WriteOp(op.method, op.path, {**op.payload, "children": children}, op.coalesce_key, list(op.futures))
+        for other in [queued for queued in self._queue if queued.coalesce_key == op.coalesce_key]:
+            other_children = other.payload.get("children", [])
+            if len(children) + len(other_children) > MAX_APPEND_CHILDREN: break
+            self._queue.remove(other)
+            children.extend(other_children)
+            merged.futures.extend(other.futures)
+        if len(merged.futures) > 1: logger.info(f"Coalesced {len(merged.futures)} writes to {op.path}")
+        return merged
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: bool(self._queue))
+                op = self._take()
+                self._active += 1
+            try:
+                result = await self._send(op)
+                for future in op.futures:
+                    if not future.done(): future.set_result(result)
+            except Exception as e:
+                for future in op.futures:
+                    if not future.done(): future.set_exception(e)
+            finally:
+                self._active -= 1
+
+    async def _send(self, op: _WriteOp) -> dict:
+        return await self._call(op.method, op.path, op.payload, None, _is_idempotent(op.method, op.path))
+
+    async def _call(self, method: str, path: str, payload: dict | None, params: dict | None, idempotent: bool) -> dict:
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                return await self.client.request(method, path, payload, params)
+            except httpx.HTTPError as e:
+                if attempt == self.max_retries or not _is_retryable(e, idempotent): raise
+                delay = _retry_after(e)
+                if delay is None: delay = min(self.max_delay, self.base_delay * 2 ** attempt) * (0.5 + random.random() / 2)
+                logger.warning(f"Notion {method} {path} failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                metrics.registry.retry("notion_api", f"{method} {metrics.route(path)}")
+                await asyncio.sleep(delay)